@@ -0,0 +1,133 @@
+"""Micro-benchmark for the codecs used to encode messages sent to and from the agent.
+
+Measures how long it takes to encode and decode a selection of typical messages using
+each of the available codecs, as well as the standard library's ``json`` module.
+
+$ python benchmarks/codec.py
+codec      message            size      dumps/s      loads/s
+stdlib     build            532302          718         1661
+json       build            532293         5033         2523
+stdlib     diagnostics      776176           44          120
+json       diagnostics      700671          450          125
+...
+"""
+
+# ruff: noqa: T201
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from esbonio.sphinx_agent import codecs
+from esbonio.sphinx_agent import types
+from esbonio.sphinx_agent.util import _serialize_message
+
+
+class StdlibCodec(codecs.JsonCodec):
+    """The standard library's json module, as used by the agent originally."""
+
+    name = "stdlib"
+
+    def dumps(self, obj, default=None):
+        return json.dumps(obj, default=default).encode("utf8")
+
+    def loads(self, data, object_hook=None):
+        return json.loads(data, object_hook=object_hook)
+
+
+def make_build_request(size: int) -> dict:
+    """A build request, containing the contents of an unsaved file."""
+    line = "This is a line of reStructuredText with some *inline* ``markup``.\n"
+    content = line * (size // len(line))
+
+    return dict(
+        jsonrpc="2.0",
+        id=1,
+        method="sphinx/build",
+        params=dict(content_overrides={"file:///project/index.rst": content}),
+    )
+
+
+def make_diagnostics(count: int) -> types.PartialBuildResult:
+    """A partial build result, reporting diagnostics for a number of files."""
+    diagnostics: dict[str, list[types.Diagnostic]] = {}
+
+    for idx in range(count):
+        diagnostics[f"file:///project/docs/page-{idx // 10}.rst"] = [
+            types.Diagnostic(
+                range=types.Range(
+                    start=types.Position(line=idx, character=0),
+                    end=types.Position(line=idx + 1, character=0),
+                ),
+                message=f"undefined label: 'label-{idx}'",
+                severity=types.DiagnosticSeverity.Warning,
+            )
+        ] * 10
+
+    return types.PartialBuildResult(
+        params=types.PartialBuildResultParams(diagnostics=diagnostics)
+    )
+
+
+def make_symbols(count: int) -> list[tuple]:
+    """A set of rows, as stored in the symbols table."""
+    return [
+        (idx, f"Section {idx}", 15, f"{idx}", idx // 10, idx, (idx, 0, idx + 1, 0))
+        for idx in range(count)
+    ]
+
+
+def object_hook(obj: dict):
+    """Stands in for the hook used to convert decoded objects into messages."""
+    return obj
+
+
+def measure(func, duration: float) -> float:
+    """Return the number of times per second the given function can be called."""
+    count = 0
+    start = time.perf_counter()
+
+    while (elapsed := time.perf_counter() - start) < duration:
+        func()
+        count += 1
+
+    return count / elapsed
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    cli.add_argument("-d", "--duration", type=float, default=0.5)
+    cli.add_argument("-n", "--count", type=int, default=5_000)
+    cli.add_argument("-s", "--override-size", type=int, default=512 * 1024)
+    args = cli.parse_args()
+
+    messages = {
+        "build": make_build_request(args.override_size),
+        "diagnostics": make_diagnostics(args.count),
+        "symbols": make_symbols(args.count),
+    }
+
+    available = [StdlibCodec(), *codecs.CODECS.values()]
+    print(f"{'codec':<10} {'message':<12} {'size':>10} {'dumps/s':>12} {'loads/s':>12}")
+
+    for name, message in messages.items():
+        for codec in available:
+            data = codec.dumps(message, default=_serialize_message)
+            dumps = measure(
+                lambda: codec.dumps(message, default=_serialize_message),  # noqa: B023
+                args.duration,
+            )
+            loads = measure(
+                lambda: codec.loads(data, object_hook=object_hook),  # noqa: B023
+                args.duration,
+            )
+
+            print(
+                f"{codec.name:<10} {name:<12} {len(data):>10} {dumps:>12.0f} "
+                f"{loads:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
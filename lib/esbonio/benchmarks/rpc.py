@@ -0,0 +1,111 @@
+"""Micro-benchmark for the sphinx agent's JSON-RPC message handling.
+
+Measures the number of messages per second the agent is able to read, decode and
+dispatch from its input stream.
+
+$ python benchmarks/rpc.py
+reader     messages        total  messages/s
+buffered      10000       0.498s       20069
+readline      10000       1.786s        5598
+"""
+
+# ruff: noqa: T201
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from esbonio.sphinx_agent.server import decode_message
+from esbonio.sphinx_agent.server import main_loop
+from esbonio.sphinx_agent.util import format_message
+
+CONTENT_LENGTH_PATTERN = re.compile(rb"^Content-Length: (\d+)\r\n$")
+
+
+def make_messages(count: int, override_size: int) -> bytes:
+    """Generate a stream of messages to process.
+
+    Every 10th message is a build request with a large content override, the rest are
+    small notifications.
+    """
+    messages = []
+
+    for idx in range(count):
+        if idx % 10 == 0:
+            params = dict(content_overrides={"file:///index.rst": "a" * override_size})
+            message = dict(jsonrpc="2.0", id=idx, method="sphinx/build", params=params)
+        else:
+            message = dict(jsonrpc="2.0", method="exit", params=None)
+
+        messages.append(format_message(message).encode("utf8"))
+
+    return b"".join(messages)
+
+
+def read_buffered(rfile) -> int:
+    """Process messages using the agent's main loop."""
+    count = 0
+
+    def dispatch(message, obj, handler):
+        nonlocal count
+        count += 1
+
+    main_loop(rfile, dispatch)
+    return count
+
+
+def read_lines(rfile) -> int:
+    """Process messages line by line, as the agent originally did."""
+    count = 0
+
+    async def loop():
+        nonlocal count
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=2)
+        content_length = 0
+
+        while header := await loop.run_in_executor(executor, rfile.readline):
+            if not content_length:
+                if match := CONTENT_LENGTH_PATTERN.fullmatch(header):
+                    content_length = int(match.group(1))
+
+            if content_length and not header.strip():
+                body = await loop.run_in_executor(executor, rfile.read, content_length)
+                decode_message(body)
+
+                count += 1
+                content_length = 0
+
+    asyncio.run(loop())
+    return count
+
+
+READERS = {"buffered": read_buffered, "readline": read_lines}
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    cli.add_argument("-n", "--count", type=int, default=10_000)
+    cli.add_argument("-s", "--override-size", type=int, default=64 * 1024)
+    args = cli.parse_args()
+
+    data = make_messages(args.count, args.override_size)
+    print(f"{'reader':<8} {'messages':>10} {'total':>12} {'messages/s':>11}")
+
+    for name, reader in READERS.items():
+        rfile = io.BufferedReader(io.BytesIO(data))  # type: ignore[arg-type]
+
+        start = time.perf_counter()
+        count = reader(rfile)
+        duration = time.perf_counter() - start
+
+        print(f"{name:<8} {count:>10} {duration:>11.3f}s {count / duration:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Benchmark the language server's interactions with a large Sphinx project.
+
+Generates a synthetic project (see ``synthetic.py``) and measures the time taken by
+the key operations performed by the language server, using the real
+``SubprocessSphinxClient`` and ``Project`` classes. Results are written as JSON so
+that they can be compared across commits.
+
+$ python benchmarks/suite.py --pages 200 -o before.json
+$ git switch my-branch
+$ python benchmarks/suite.py --pages 200 -o after.json --compare before.json
+benchmark                             median         min         max      before    change
+startup                              306.2ms     306.2ms     306.2ms     311.0ms     -1.5%
+full_build                         11083.9ms   11083.9ms   11083.9ms   11201.5ms     -1.0%
+incremental_build                    486.5ms     474.4ms     643.8ms     490.2ms     -0.8%
+...
+"""
+
+# ruff: noqa: T201
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+from lsprotocol.types import WorkspaceFolder
+from pygls.protocol import default_converter
+from pygls.workspace import Workspace
+from sphinx import __version__ as __sphinx_version__
+from synthetic import ProjectSpec
+from synthetic import add_arguments
+from synthetic import generate_project
+from synthetic import spec_from_args
+
+from esbonio.server import Uri
+from esbonio.server import __version__ as __esbonio_version__
+from esbonio.server.features.project_manager import Project
+from esbonio.server.features.sphinx_manager.client import ClientState
+from esbonio.server.features.sphinx_manager.client_subprocess import (
+    SubprocessSphinxClient,
+)
+from esbonio.server.features.sphinx_manager.config import SphinxConfig
+from esbonio.server.features.sphinx_support.roles import ObjectsProvider
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Awaitable
+    from typing import Any
+    from typing import TypeVar
+
+    T = TypeVar("T")
+
+
+logger = logging.getLogger("benchmarks")
+
+
+class Timings:
+    """Collects the time taken by each sample of each benchmark."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    async def measure(self, name: str, operation: Awaitable[T]) -> T:
+        """Record the time it takes for the given operation to complete."""
+        start = time.perf_counter()
+        result = await operation
+
+        self.samples.setdefault(name, []).append(time.perf_counter() - start)
+        return result
+
+    def summarize(self) -> dict[str, dict[str, Any]]:
+        """Return summary statistics for each benchmark."""
+        return {
+            name: {
+                "count": len(samples),
+                "min": min(samples),
+                "median": statistics.median(samples),
+                "mean": statistics.mean(samples),
+                "max": max(samples),
+                "samples": samples,
+            }
+            for name, samples in self.samples.items()
+        }
+
+
+def make_client(src_dir: pathlib.Path, build_dir: str) -> SubprocessSphinxClient:
+    """Return a client for the project in the given directory."""
+    src_uri = Uri.for_file(src_dir)
+    workspace = Workspace(
+        None, workspace_folders=[WorkspaceFolder(uri=str(src_uri), name="synthetic")]
+    )
+
+    config = SphinxConfig(
+        python_command=[sys.executable],
+        build_command=["sphinx-build", "-M", "html", str(src_dir), build_dir],
+    )
+    resolved = config.resolve(src_uri / "index.rst", workspace, logger)
+    if resolved is None:
+        raise RuntimeError("Unable to resolve Sphinx configuration")
+
+    client = SubprocessSphinxClient(resolved, logger=logger)
+
+    @client.feature("window/logMessage")
+    def _on_log(params): ...
+
+    @client.feature("$/progress")
+    def _on_progress(params): ...
+
+    @client.feature("sphinx/partialBuildResult")
+    def _on_partial_result(params): ...
+
+    return client
+
+
+async def run_benchmarks(
+    src_dir: pathlib.Path, spec: ProjectSpec, repeat: int, iterations: int
+) -> Timings:
+    """Run each of the benchmarks against the project in the given directory.
+
+    Parameters
+    ----------
+    src_dir
+       The project's source directory
+
+    spec
+       The shape of the project
+
+    repeat
+       The number of times to start an agent and build the project from scratch
+
+    iterations
+       The number of times to repeat the incremental benchmarks for each agent
+    """
+    timings = Timings()
+    page = src_dir / "pages" / f"page_{spec.pages // 2}.rst"
+    page_uri = Uri.for_file(page)
+    targets = ObjectsProvider(logger, None)  # type: ignore[arg-type]
+
+    for run in range(repeat):
+        print(f"Run {run + 1}/{repeat}", file=sys.stderr)
+
+        with tempfile.TemporaryDirectory() as build_dir:
+            client = make_client(src_dir, build_dir)
+            await timings.measure("startup", client.start())
+            if client.state != ClientState.Running:
+                raise RuntimeError(f"Unable to start client: {client.exception}")
+
+            await timings.measure("full_build", client.build())
+            project = Project(client.db, default_converter())
+
+            for idx in range(iterations):
+                # Simulate the user making an edit to a single (unsaved) file
+                overrides = {str(page_uri): f"{page.read_text()}\nEdit {idx}\n"}
+                await timings.measure(
+                    "incremental_build", client.build(content_overrides=overrides)
+                )
+
+                # Nothing changed, so this measures the overhead of a build request.
+                await timings.measure(
+                    "build_roundtrip", client.build(content_overrides=overrides)
+                )
+
+                await timings.measure(
+                    "document_symbols", project.get_document_symbols(page_uri)
+                )
+                await timings.measure(
+                    "workspace_symbols", project.get_workspace_symbols("Section 1")
+                )
+                await timings.measure("diagnostics", project.get_diagnostics())
+                await timings.measure("completion_roles", project.get_roles())
+                await timings.measure("completion_directives", project.get_directives())
+
+                db = await project.get_db()
+                for name, projects, obj_types in [
+                    ("completion_ref_targets", None, ["std:label"]),
+                    ("completion_intersphinx_targets", ["inv"], ["py:class"]),
+                ]:
+                    query, parameters = targets._prepare_target_query(
+                        projects, obj_types
+                    )
+                    await timings.measure(
+                        name, fetch_all(db.execute(query, parameters))
+                    )
+
+            await project.close()
+            await client.stop()
+
+    return timings
+
+
+async def fetch_all(cursor):
+    """Fetch all the results of the given query."""
+    return await (await cursor).fetchall()
+
+
+def get_metadata(spec: ProjectSpec, args: argparse.Namespace) -> dict[str, Any]:
+    """Return information about the environment the benchmarks were run in."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=pathlib.Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "esbonio": __esbonio_version__,
+        "sphinx": __sphinx_version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "iterations": args.iterations,
+        "project": dataclasses.asdict(spec),
+    }
+
+
+def report(results: dict[str, dict[str, Any]], baseline: dict[str, Any] | None):
+    """Print a summary of the results, comparing them with the baseline if given."""
+    headings = f"{'benchmark':<32} {'median':>11} {'min':>11} {'max':>11}"
+    if baseline is not None:
+        headings += f" {'before':>11} {'change':>9}"
+
+    print(headings)
+
+    for name, result in results.items():
+        line = (
+            f"{name:<32} {result['median'] * 1000:>9.1f}ms "
+            f"{result['min'] * 1000:>9.1f}ms {result['max'] * 1000:>9.1f}ms"
+        )
+
+        if baseline is not None and (before := baseline.get(name)) is not None:
+            change = (result["median"] - before["median"]) / before["median"]
+            line += f" {before['median'] * 1000:>9.1f}ms {change:>+9.1%}"
+
+        print(line)
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    cli.add_argument(
+        "-o", "--output", type=pathlib.Path, help="write the results to this file"
+    )
+    cli.add_argument(
+        "--compare", type=pathlib.Path, help="compare with the results in this file"
+    )
+    cli.add_argument(
+        "--project",
+        type=pathlib.Path,
+        help="generate the project in this directory, rather than a temporary one",
+    )
+    cli.add_argument("-r", "--repeat", type=int, default=3)
+    cli.add_argument("-n", "--iterations", type=int, default=5)
+    add_arguments(cli)
+
+    args = cli.parse_args()
+    spec = spec_from_args(args)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src_dir = generate_project(args.project or pathlib.Path(tmp_dir), spec)
+        timings = asyncio.run(
+            run_benchmarks(src_dir, spec, args.repeat, args.iterations)
+        )
+
+    results = timings.summarize()
+    output = {"metadata": get_metadata(spec, args), "results": results}
+
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2))
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+
+    report(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Generate synthetic Sphinx projects, for use in benchmarks.
+
+$ python benchmarks/synthetic.py --pages 1000 --modules 50 /tmp/synthetic
+Generated 1051 documents in /tmp/synthetic
+"""
+
+# ruff: noqa: S311, T201
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import pathlib
+import random
+import textwrap
+import zlib
+
+HEADINGS = "=-~^\"'`"
+"""The characters used to underline section titles, in order of depth."""
+
+
+@dataclasses.dataclass
+class ProjectSpec:
+    """Describes the shape of a synthetic project."""
+
+    pages: int = 100
+    """The number of pages in the project."""
+
+    sections: int = 3
+    """The number of top-level sections on each page."""
+
+    depth: int = 3
+    """How deeply sections are nested."""
+
+    xrefs: int = 10
+    """The number of cross-references on each page."""
+
+    modules: int = 10
+    """The number of Python modules documented with autodoc."""
+
+    inventory_size: int = 1000
+    """The number of objects in the intersphinx inventory."""
+
+    broken_refs: int = 20
+    """Every nth page includes a reference that cannot be resolved."""
+
+    seed: int = 0
+    """Seed for the random number generator, so that projects are reproducible."""
+
+    @property
+    def num_documents(self) -> int:
+        """The total number of documents in the project."""
+        return 1 + self.pages + self.modules
+
+
+def generate_project(path: pathlib.Path, spec: ProjectSpec) -> pathlib.Path:
+    """Generate a project with the given spec in the given directory.
+
+    Parameters
+    ----------
+    path
+       The directory to write the project to
+
+    spec
+       The shape of the project
+
+    Returns
+    -------
+    pathlib.Path
+       The source directory of the generated project
+    """
+    rng = random.Random(spec.seed)
+    path.mkdir(parents=True, exist_ok=True)
+
+    (path / "conf.py").write_text(make_conf(spec))
+    (path / "index.rst").write_text(make_index(spec))
+
+    pages = path / "pages"
+    pages.mkdir(exist_ok=True)
+    for idx in range(spec.pages):
+        (pages / f"page_{idx}.rst").write_text(make_page(idx, spec, rng))
+
+    api = path / "api"
+    package = path / "synthetic"
+    api.mkdir(exist_ok=True)
+    package.mkdir(exist_ok=True)
+
+    (package / "__init__.py").write_text("")
+    for idx in range(spec.modules):
+        (package / f"mod_{idx}.py").write_text(make_module(idx))
+        (api / f"mod_{idx}.rst").write_text(make_module_page(idx))
+
+    if spec.inventory_size > 0:
+        (path / "objects.inv").write_bytes(make_inventory(spec.inventory_size))
+
+    return path
+
+
+def make_conf(spec: ProjectSpec) -> str:
+    """Return the contents of the project's ``conf.py``."""
+    conf = textwrap.dedent(
+        """\
+        import pathlib
+        import sys
+
+        sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+        project = "Synthetic"
+        extensions = ["sphinx.ext.autodoc", "sphinx.ext.intersphinx"]
+        exclude_patterns = ["synthetic"]
+        """
+    )
+
+    if spec.inventory_size > 0:
+        conf += textwrap.dedent(
+            """\
+            intersphinx_mapping = {
+                "inv": ("https://synthetic.example.com/", "objects.inv"),
+            }
+            """
+        )
+
+    return conf
+
+
+def make_index(spec: ProjectSpec) -> str:
+    """Return the contents of the project's root document."""
+    return textwrap.dedent(
+        """\
+        Synthetic Project
+        =================
+
+        .. toctree::
+           :glob:
+
+           pages/*
+           api/*
+        """
+    )
+
+
+def make_page(idx: int, spec: ProjectSpec, rng: random.Random) -> str:
+    """Return the contents of the page with the given index."""
+    lines = [f".. _page-{idx}:", "", heading(f"Page {idx}", 0), ""]
+    lines.extend([make_paragraph(idx, spec, rng), ""])
+
+    for section in range(spec.sections):
+        for level in range(1, spec.depth + 1):
+            label = f"page-{idx}-{section}-{level}"
+            title = f"Section {idx}.{section}.{level}"
+            lines.extend([f".. _{label}:", "", heading(title, level), ""])
+            lines.extend([make_paragraph(idx, spec, rng), ""])
+
+    if spec.broken_refs > 0 and idx % spec.broken_refs == 0:
+        lines.extend([f"See :ref:`missing-label-{idx}`.", ""])
+
+    return "\n".join(lines)
+
+
+def make_paragraph(idx: int, spec: ProjectSpec, rng: random.Random) -> str:
+    """Return a paragraph of text, containing a share of the page's cross-references."""
+    per_section = max(spec.xrefs // max(spec.sections * spec.depth + 1, 1), 1)
+    words = ["Lorem ipsum dolor sit amet, consectetur adipiscing elit."]
+
+    for _ in range(per_section):
+        words.append(make_xref(spec, rng))
+
+    return textwrap.fill(" ".join(words), width=88)
+
+
+def make_xref(spec: ProjectSpec, rng: random.Random) -> str:
+    """Return a random cross-reference to another part of the project."""
+    choices = ["ref", "doc"]
+    if spec.modules > 0:
+        choices.append("func")
+
+    if spec.inventory_size > 0:
+        choices.append("class")
+
+    kind = rng.choice(choices)
+    page = rng.randrange(spec.pages)
+
+    if kind == "ref":
+        section = rng.randrange(spec.sections) if spec.sections > 0 else 0
+        level = rng.randint(1, spec.depth) if spec.depth > 0 else 0
+        label = f"page-{page}-{section}-{level}" if spec.depth > 0 else f"page-{page}"
+        return f":ref:`{label}`"
+
+    if kind == "doc":
+        return f":doc:`/pages/page_{page}`"
+
+    if kind == "func":
+        module = rng.randrange(spec.modules)
+        return f":py:func:`synthetic.mod_{module}.function_{rng.randrange(10)}`"
+
+    return f":py:class:`inv.Class{rng.randrange(spec.inventory_size)}`"
+
+
+def make_module(idx: int) -> str:
+    """Return the source code of the module with the given index."""
+    lines = [f'"""Synthetic module {idx}."""', ""]
+
+    for func in range(10):
+        lines.extend(
+            [
+                "",
+                f"def function_{func}(a: int, b: str = 'b') -> bool:",
+                f'    """Function {func} of module {idx}.',
+                "",
+                "    Parameters",
+                "    ----------",
+                "    a",
+                "       The first argument",
+                "",
+                "    b",
+                "       The second argument",
+                '    """',
+                "    return True",
+                "",
+            ]
+        )
+
+    for cls in range(2):
+        lines.extend(
+            [
+                "",
+                f"class Class{cls}:",
+                f'    """Class {cls} of module {idx}."""',
+                "",
+                "    def method(self) -> None:",
+                '        """A method."""',
+                "",
+            ]
+        )
+
+    return "\n".join(lines)
+
+
+def make_module_page(idx: int) -> str:
+    """Return the page documenting the module with the given index."""
+    return "\n".join(
+        [
+            heading(f"Module {idx}", 0),
+            "",
+            f".. automodule:: synthetic.mod_{idx}",
+            "   :members:",
+            "",
+        ]
+    )
+
+
+def make_inventory(size: int) -> bytes:
+    """Return an intersphinx inventory, containing the given number of objects."""
+    header = "\n".join(
+        [
+            "# Sphinx inventory version 2",
+            "# Project: Inventory",
+            "# Version: 1.0",
+            "# The remainder of this file is compressed using zlib.",
+            "",
+        ]
+    )
+    lines = [f"inv.Class{idx} py:class 1 api.html#$ -\n" for idx in range(size)]
+
+    return header.encode() + zlib.compress("".join(lines).encode())
+
+
+def heading(title: str, level: int) -> str:
+    """Return the given title, as a section heading at the given level."""
+    return f"{title}\n{HEADINGS[min(level, len(HEADINGS) - 1)] * len(title)}"
+
+
+def add_arguments(cli: argparse.ArgumentParser):
+    """Add the options used to control the shape of the project to the given cli."""
+    defaults = ProjectSpec()
+
+    for field in dataclasses.fields(ProjectSpec):
+        cli.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=int,
+            default=getattr(defaults, field.name),
+            help="(default: %(default)s)",
+        )
+
+
+def spec_from_args(args: argparse.Namespace) -> ProjectSpec:
+    """Return the project spec described by the given command line arguments."""
+    fields = dataclasses.fields(ProjectSpec)
+    return ProjectSpec(**{field.name: getattr(args, field.name) for field in fields})
+
+
+def main():
+    cli = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    cli.add_argument("path", type=pathlib.Path, help="the directory to write to")
+    add_arguments(cli)
+
+    args = cli.parse_args()
+    spec = spec_from_args(args)
+    generate_project(args.path, spec)
+
+    print(f"Generated {spec.num_documents} documents in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from .feature import LanguageFeature
 from .server import EsbonioLanguageServer
 from .server import EsbonioWorkspace
 from .server import __version__
+from .setup import LazyModule
 from .setup import create_language_server
 
 __all__ = (
@@ -23,6 +24,7 @@ __all__ = (
     "EsbonioWorkspace",
     "EventSource",
     "LanguageFeature",
+    "LazyModule",
     "Uri",
     "create_language_server",
 )
@@ -17,6 +17,7 @@ from . import Uri
 T = TypeVar("T")
 
 if typing.TYPE_CHECKING:
+    import asyncio
     from collections.abc import Awaitable
     from typing import Any
     from typing import Callable
@@ -235,8 +236,15 @@ class Configuration:
         # Once the server is ready, update all the subscriptions
         self.server.ready.add_done_callback(self._notify_subscriptions)
 
-    def _notify_subscriptions(self, *args):
-        """Notify subscriptions about configuration changes, if necessary."""
+    def _notify_subscriptions(self, *args) -> list[asyncio.Task]:
+        """Notify subscriptions about configuration changes, if necessary.
+
+        Returns
+        -------
+        list[asyncio.Task]
+           The tasks running any async callbacks.
+        """
+        tasks: list[asyncio.Task] = []
 
         for subscription, previous_value in self._subscriptions.items():
             value = self._get_config(
@@ -262,7 +270,7 @@ class Configuration:
             try:
                 ret = subscription.callback(change_event)
                 if inspect.iscoroutine(ret):
-                    self.server.run_task(ret)
+                    tasks.append(self.server.run_task(ret))
 
             except Exception:
                 self.logger.error(
@@ -271,6 +279,8 @@ class Configuration:
                     exc_info=True,
                 )
 
+        return tasks
+
     def get(self, section: str, spec: type[T], scope: Uri | None = None) -> T:
         """Get the requested configuration section.
 
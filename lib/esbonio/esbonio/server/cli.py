@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import argparse
 import logging
 import sys
@@ -5,13 +7,55 @@ import warnings
 from collections.abc import Sequence
 from logging.handlers import MemoryHandler
 from typing import Optional
+from typing import TextIO
+from typing import Union
 
+from lsprotocol import types
 from pygls.protocol import default_converter
 
+from esbonio.sphinx_agent.tracing import tracer
+
 from .server import EsbonioLanguageServer
 from .server import __version__
+from .setup import LazyModule
 from .setup import create_language_server
 
+# Order matters!
+# Modules that are not needed by every client are loaded on first use, their
+# features must be declared here so that they can be advertised to the client.
+DEFAULT_MODULES: list[Union[str, LazyModule]] = [
+    "esbonio.server.features.log",
+    "esbonio.server.features.tracing",
+    "esbonio.server.features.project_manager",
+    "esbonio.server.features.sphinx_manager",
+    LazyModule(
+        "esbonio.server.features.preview_manager",
+        methods=["view/scroll"],
+        commands=["esbonio.server.previewFile", "esbonio.server.scrollStats"],
+    ),
+    "esbonio.server.features.directives",
+    "esbonio.server.features.roles",
+    "esbonio.server.features.rst.directives",
+    "esbonio.server.features.rst.roles",
+    LazyModule(
+        "esbonio.server.features.myst.directives",
+        methods=[types.TEXT_DOCUMENT_COMPLETION],
+        trigger_characters=[".", "`", "/"],
+        languages={"markdown"},
+    ),
+    LazyModule(
+        "esbonio.server.features.myst.roles",
+        methods=[types.TEXT_DOCUMENT_COMPLETION],
+        trigger_characters=["{", "`", "<", "/"],
+        languages={"markdown"},
+    ),
+    "esbonio.server.features.sphinx_support.diagnostics",
+    "esbonio.server.features.sphinx_support.symbols",
+    "esbonio.server.features.sphinx_support.directives",
+    "esbonio.server.features.sphinx_support.roles",
+]
+"""The modules loaded by the language server."""
+
 
 def build_parser() -> argparse.ArgumentParser:
     """Return an argument parser with the default command line options required for
@@ -32,6 +76,11 @@ def build_parser() -> argparse.ArgumentParser:
         version=__version__,
         help="print the current version and exit.",
     )
+    cli.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="report the time taken to import and setup each module on stderr.",
+    )
 
     modules = cli.add_argument_group(
         "modules", "include/exclude language server modules."
@@ -58,35 +107,63 @@ def build_parser() -> argparse.ArgumentParser:
     return cli
 
 
+def report_startup(modules: Sequence[Union[str, LazyModule]], file: TextIO):
+    """Write the time taken to import and setup each module to the given file.
+
+    Import times are cumulative, so they include the time spent importing any
+    dependencies not already imported by a previous module.
+
+    Parameters
+    ----------
+    modules
+       The modules the server was created with
+
+    file
+       The file to write the report to
+    """
+    timings: dict[str, dict[str, float]] = {}
+    total = 0.0
+
+    for event in tracer.events:
+        if event.get("cat") != "startup":
+            continue
+
+        # Durations are recorded in microseconds.
+        duration = event["dur"] / 1000
+        if (module := event["args"].get("module")) is None:
+            total = duration
+            continue
+
+        phase = event["name"].split(":")[0]
+        timings.setdefault(module, {})[phase] = duration
+
+    print(f"{'module':<56} {'import':>10} {'setup':>10}", file=file)
+    for mod in modules:
+        if isinstance(mod, LazyModule):
+            print(f"{mod.name:<56} {'(deferred)':>21}", file=file)
+            continue
+
+        timing = timings.get(mod, {})
+        print(
+            f"{mod:<56} {timing.get('import', 0.0):>8.1f}ms "
+            f"{timing.get('setup', 0.0):>8.1f}ms",
+            file=file,
+        )
+
+    print(f"{'total':<56} {total:>19.1f}ms", file=file)
+
+
 def main(argv: Optional[Sequence[str]] = None):
     cli = build_parser()
     args = cli.parse_args(argv)
 
-    # Order matters!
     modules = [
-        "esbonio.server.features.log",
-        "esbonio.server.features.project_manager",
-        "esbonio.server.features.sphinx_manager",
-        "esbonio.server.features.preview_manager",
-        "esbonio.server.features.directives",
-        "esbonio.server.features.roles",
-        "esbonio.server.features.rst.directives",
-        "esbonio.server.features.rst.roles",
-        "esbonio.server.features.myst.directives",
-        "esbonio.server.features.myst.roles",
-        "esbonio.server.features.sphinx_support.diagnostics",
-        "esbonio.server.features.sphinx_support.symbols",
-        "esbonio.server.features.sphinx_support.directives",
-        "esbonio.server.features.sphinx_support.roles",
+        mod
+        for mod in [*DEFAULT_MODULES, *args.included_modules]
+        if (mod.name if isinstance(mod, LazyModule) else mod)
+        not in args.excluded_modules
     ]
 
-    for mod in args.included_modules:
-        modules.append(mod)
-
-    for mod in args.excluded_modules:
-        if mod in modules:
-            modules.remove(mod)
-
     # Ensure we can capture warnings.
     logging.captureWarnings(True)
 
@@ -100,6 +177,9 @@ def main(argv: Optional[Sequence[str]] = None):
         handlers=[MemoryHandler(999999, flushLevel=logging.CRITICAL)],
     )
 
+    if args.profile_startup:
+        tracer.enabled = True
+
     server = create_language_server(
         EsbonioLanguageServer,
         modules,
@@ -107,6 +187,10 @@ def main(argv: Optional[Sequence[str]] = None):
         converter_factory=default_converter,
     )
 
+    if args.profile_startup:
+        tracer.enabled = False
+        report_startup(modules, sys.stderr)
+
     if args.port:
         server.start_tcp("localhost", args.port)
     else:
@@ -1,3 +1,4 @@
+import os
 from typing import Any
 from typing import Optional
 from urllib.parse import urlencode
@@ -12,8 +13,10 @@ from esbonio.server.features.sphinx_manager import SphinxClient
 from esbonio.server.features.sphinx_manager import SphinxManager
 
 from .config import PreviewConfig
+from .preview import Page
 from .preview import PreviewServer
 from .preview import make_http_server
+from .preview import read_page
 from .webview import WebviewServer
 from .webview import make_ws_server
 
@@ -41,6 +44,9 @@ class PreviewManager(server.LanguageFeature):
         self.build_uri: Optional[Uri] = None
         """The uri of the build dir we are currently serving from."""
 
+        self.page: Optional[Page] = None
+        """A snapshot of the page we are currently displaying."""
+
         self.config = PreviewConfig()
         """The current configuration."""
 
@@ -132,8 +138,35 @@ class PreviewManager(server.LanguageFeature):
         if client.build_uri != self.preview.build_uri:
             return
 
-        self.logger.debug("Refreshing preview")
-        self.webview.reload()
+        previous, self.page = self.page, self._read_page(self.page)
+
+        # If we can't tell what changed, fallback to reloading the entire page.
+        if previous is None or self.page is None or self.build_path is None:
+            self.logger.debug("Refreshing preview")
+            self.webview.reload()
+            return
+
+        if self.page == previous:
+            self.logger.debug("Page '%s' unchanged, skipping refresh", self.build_path)
+            return
+
+        if not self.page.can_patch(previous):
+            self.logger.debug("Refreshing preview")
+            self.webview.reload()
+            return
+
+        self.logger.debug("Patching preview")
+        self.webview.patch(self.build_path, self.page.body)
+
+    def _read_page(self, previous: Optional[Page] = None) -> Optional[Page]:
+        """Take a snapshot of the page we are currently displaying."""
+        if self.build_uri is None or self.build_path is None:
+            return None
+
+        if (build_dir := self.build_uri.fs_path) is None:
+            return None
+
+        return read_page(os.path.join(build_dir, self.build_path), previous)
 
     async def scroll_view(self, uri: str, line: int):
         """Scroll the webview to the given line number."""
@@ -154,6 +187,9 @@ class PreviewManager(server.LanguageFeature):
         if (client := await self.sphinx.get_client(src_uri)) is None:
             return None
 
+        # Builds of the project being previewed should take priority.
+        self.sphinx.focus(src_uri)
+
         if (project := self.projects.get_project(src_uri)) is None:
             return None
 
@@ -172,6 +208,7 @@ class PreviewManager(server.LanguageFeature):
 
         self.build_path = build_path
         self.build_uri = self.preview.build_uri = client.build_uri
+        self.page = self._read_page()
 
         if (uri := await self.show_preview_uri()) is None:
             return None
@@ -228,3 +265,11 @@ def esbonio_setup(
     @esbonio.command("esbonio.server.previewFile")
     async def preview_file(ls: server.EsbonioLanguageServer, *args):
         return await manager.preview_file(args[0][0])
+
+    @esbonio.command("esbonio.server.scrollStats")
+    async def scroll_stats(ls: server.EsbonioLanguageServer, *args):
+        """Return the number of scroll messages sent and dropped in each direction."""
+        if manager.webview is None:
+            return None
+
+        return manager.webview.scroll_stats
@@ -1,29 +1,510 @@
 from __future__ import annotations
 
 import asyncio
+import collections
+import email.utils
+import functools
+import gzip
+import io
 import logging
+import os
+import pathlib
+import re
+import threading
 import typing
-from http.server import HTTPServer
+from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 
 from esbonio import server
 from esbonio.server import Uri
 
+try:
+    import brotli  # type: ignore[import-not-found,import-untyped,unused-ignore]
+except ImportError:
+    brotli = None
+
 if typing.TYPE_CHECKING:
     from typing import Any
+    from typing import Callable
+    from typing import Optional
 
     from .config import PreviewConfig
 
 
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+"""Content types that are worth compressing."""
+
+MIN_COMPRESS_SIZE = 1024
+"""Files smaller than this (in bytes) are not worth compressing."""
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+"""The default maximum number of bytes held by the asset cache."""
+
+STATIC_DIR = (
+    pathlib.Path(__file__).parent.parent.parent.parent / "sphinx_agent" / "static"
+).resolve()
+"""Directory containing the assets shipped with the sphinx agent."""
+
+WEBVIEW_JS = STATIC_DIR / "webview.js"
+"""The script that allows the webview to be controlled by the language server."""
+
+WEBVIEW_JS_PATH = "/_esbonio/webview.js"
+"""The url path at which ``webview.js`` is served."""
+
+END_BODY = re.compile(rb"</body\s*>", re.IGNORECASE)
+
+HEAD = re.compile(r"<head[^>]*>(.*)</head\s*>", re.IGNORECASE | re.DOTALL)
+BODY = re.compile(r"<body[^>]*>(.*)</body\s*>", re.IGNORECASE | re.DOTALL)
+SCRIPT = re.compile(r"<script(\s[^>]*)?>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+SCRIPT_TYPE = re.compile(
+    r"""\stype\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE
+)
+
+SCRIPT_TYPES = {
+    "",
+    "application/ecmascript",
+    "application/javascript",
+    "module",
+    "text/ecmascript",
+    "text/javascript",
+}
+"""Values of a ``<script>`` element's ``type`` attribute that cause it to be run.
+
+Scripts with any other type (e.g. ``application/json``) only hold data."""
+
+
+def find_scripts(html: str) -> tuple[str, ...]:
+    """Return the ``<script>`` elements in the given html that would be run by the
+    browser."""
+    scripts = []
+
+    for match in SCRIPT.finditer(html):
+        script_type = ""
+        if (attrs := match.group(1)) and (type_ := SCRIPT_TYPE.search(attrs)):
+            script_type = next(g for g in type_.groups() if g is not None)
+
+        if script_type.strip().lower() in SCRIPT_TYPES:
+            scripts.append(match.group(0))
+
+    return tuple(scripts)
+
+
+class Page:
+    """A snapshot of a html page in the build output."""
+
+    def __init__(self, path: str, stat: os.stat_result, head: str, body: str):
+        self.path = path
+        """The path to the page on disk."""
+
+        self.stat = (stat.st_mtime_ns, stat.st_size)
+        """The modification time and size of the page when the snapshot was taken."""
+
+        self.head = head
+        """The content of the page's ``<head>`` element."""
+
+        self.body = body
+        """The content of the page's ``<body>`` element."""
+
+        self.scripts = find_scripts(body)
+        """The executable ``<script>`` elements in the page's ``<body>``."""
+
+    def can_patch(self, previous: Page) -> bool:
+        """Return ``True`` if a view showing ``previous`` can be updated to show this
+        page by replacing the content of its ``<body>``.
+
+        Changes to the ``<head>`` may include new stylesheets, scripts etc. so the
+        page must be reloaded. The view re-runs inline scripts once the ``<body>`` has
+        been replaced, but the page must also be reloaded if the scripts themselves
+        have changed.
+        """
+        if self.path != previous.path or self.head != previous.head:
+            return False
+
+        return self.scripts == previous.scripts
+
+    def __eq__(self, other):
+        if not isinstance(other, Page):
+            return False
+
+        return (self.path, self.head, self.body) == (other.path, other.head, other.body)
+
+
+def read_page(path: str, previous: Page | None = None) -> Page | None:
+    """Take a snapshot of the html page at the given path.
+
+    Parameters
+    ----------
+    path
+       The path to the page
+
+    previous
+       A previous snapshot of the page. If the file has not been modified since,
+       ``previous`` is returned without reading the file.
+
+    Returns
+    -------
+    Page | None
+       The snapshot, or ``None`` if the page could not be read or parsed.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, "index.html")
+
+    try:
+        stat = os.stat(path)
+        if previous is not None and previous.path == path:
+            if previous.stat == (stat.st_mtime_ns, stat.st_size):
+                return previous
+
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if (head := HEAD.search(content)) is None or (body := BODY.search(content)) is None:
+        return None
+
+    return Page(path, stat, head.group(1), body.group(1))
+
+
+class Asset:
+    """A file held in memory, ready to be served."""
+
+    def __init__(
+        self,
+        path: str,
+        content: bytes,
+        stat: os.stat_result,
+        ctype: str,
+        version: str = "",
+    ):
+        self.path = path
+        """The path to the file on disk."""
+
+        self.content = content
+        """The file's content."""
+
+        self.content_type = ctype
+        """The file's content type."""
+
+        self.mtime_ns = stat.st_mtime_ns
+        """The time at which the file was last modified."""
+
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        """The value of the ``Last-Modified`` header."""
+
+        self.etag = _etag(stat, version)
+        """The value of the ``ETag`` header."""
+
+        self._encoded: dict[str, bytes] = {}
+        """Compressed versions of the content, indexed by encoding."""
+
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """The (approximate) number of bytes used by this asset."""
+        return len(self.content) + sum(len(c) for c in self._encoded.values())
+
+    @property
+    def compressible(self) -> bool:
+        """Indicates if this asset is worth compressing."""
+        ctype = self.content_type.split(";")[0].strip()
+        return ctype in COMPRESSIBLE_TYPES and len(self.content) >= MIN_COMPRESS_SIZE
+
+    def encode(self, encoding: str) -> bytes:
+        """Return the content of this asset, compressed with the given encoding."""
+        with self._lock:
+            if (content := self._encoded.get(encoding)) is not None:
+                return content
+
+            if encoding == "br" and brotli is not None:
+                content = brotli.compress(self.content, quality=5)
+            elif encoding == "gzip":
+                content = gzip.compress(self.content, compresslevel=6, mtime=0)
+            else:
+                raise ValueError(f"Unsupported encoding: {encoding!r}")
+
+            self._encoded[encoding] = content
+            return content
+
+
+class AssetCache:
+    """An in-memory cache of the files served by the preview server.
+
+    Entries are keyed by their path and invalidated as soon as the file's modification
+    time (or size) changes. Once the cache exceeds ``max_size`` bytes, the least
+    recently used entries are discarded.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        """The maximum number of bytes to hold in memory."""
+
+        self._assets: collections.OrderedDict[str, Asset] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        path: str,
+        content_type: Callable[[str], str],
+        transform: Callable[[str, bytes], bytes] | None = None,
+        version: str = "",
+    ) -> Asset:
+        """Return the asset for the given path, reading it from disk if necessary.
+
+        Parameters
+        ----------
+        path
+           The path of the file to return
+
+        content_type
+           Function used to determine the content type of the file
+
+        transform
+           Function called with the content type and content of the file when it is
+           read from disk, the result is what gets cached.
+
+        version
+           Identifies the output of ``transform``, the cached asset is discarded if
+           this changes, even if the file itself has not.
+
+        Raises
+        ------
+        OSError
+           If the file cannot be read
+        """
+        stat = os.stat(path)
+
+        with self._lock:
+            asset = self._assets.get(path)
+            if asset is not None and asset.etag == _etag(stat, version):
+                self._assets.move_to_end(path)
+                return asset
+
+        ctype = content_type(path)
+        with open(path, "rb") as f:
+            content, stat = f.read(), os.fstat(f.fileno())
+
+        if transform is not None:
+            content = transform(ctype, content)
+
+        asset = Asset(path, content, stat, ctype, version)
+
+        with self._lock:
+            self._assets[path] = asset
+            self._assets.move_to_end(path)
+            self._evict()
+
+        return asset
+
+    def clear(self):
+        """Clear the cache."""
+        with self._lock:
+            self._assets.clear()
+
+    def _evict(self):
+        """Discard entries until the cache fits within its size limit."""
+        total = sum(a.size for a in self._assets.values())
+
+        while total > self.max_size and len(self._assets) > 1:
+            _, asset = self._assets.popitem(last=False)
+            total -= asset.size
+
+
+def _etag(stat: os.stat_result, version: str = "") -> str:
+    """Return the ``ETag`` for a file with the given stats and version."""
+    if version:
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}-{version}"'
+
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
 class RequestHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, logger: logging.Logger, directory: str, **kwargs) -> None:
+    """Serves files from the build directory.
+
+    Files are served from an in-memory cache, support conditional requests via the
+    ``ETag`` and ``Last-Modified`` headers and, where supported by the client, are
+    compressed.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def __init__(
+        self,
+        *args,
+        logger: logging.Logger,
+        directory: str,
+        cache: AssetCache,
+        **kwargs,
+    ) -> None:
         self.logger = logger
+        self.cache = cache
         super().__init__(*args, directory=directory, **kwargs)
 
-    def translate_path(self, path: str) -> str:
-        result = super().translate_path(path)
-        # self.logger.debug("Translate: '%s' -> '%s'", path, result)
-        return result
+    def send_head(self) -> Optional[io.BufferedIOBase]:  # type: ignore[override]
+        if self.path.split("?", 1)[0] == WEBVIEW_JS_PATH:
+            return self._send_asset(str(WEBVIEW_JS), immutable=True)
+
+        path = self.translate_path(self.path)
+
+        if os.path.isdir(path):
+            # Let the base class handle redirects and directory listings
+            if not self.path.split("?", 1)[0].endswith("/"):
+                return super().send_head()  # type: ignore[return-value]
+
+            for index in ("index.html", "index.htm"):
+                if os.path.isfile(candidate := os.path.join(path, index)):
+                    path = candidate
+                    break
+            else:
+                return super().send_head()  # type: ignore[return-value]
+
+        if path.endswith("/") or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        return self._send_asset(path)
+
+    def _send_asset(
+        self, path: str, immutable: bool = False
+    ) -> Optional[io.BufferedIOBase]:
+        """Send the asset at the given path.
+
+        Parameters
+        ----------
+        path
+           The path of the file to send
+
+        immutable
+           If ``True``, allow the client to cache the asset without checking for
+           updates. Only use this for assets served from a versioned url.
+        """
+        # Pages include the version of webview.js they load, so their ETag must change
+        # whenever webview.js does.
+        version = "" if immutable else self._get_webview_version(path)
+        transform = functools.partial(self._inject_webview_js, version=version)
+
+        try:
+            asset = self.cache.get(path, self.guess_type, transform, version)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        if self._is_not_modified(asset):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_cache_headers(asset, immutable)
+            self.end_headers()
+            return None
+
+        content = asset.content
+        encoding = self._choose_encoding(asset)
+        if encoding is not None:
+            content = asset.encode(encoding)
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", asset.content_type)
+        self.send_header("Content-Length", str(len(content)))
+        if encoding is not None:
+            self.send_header("Content-Encoding", encoding)
+
+        if asset.compressible:
+            self.send_header("Vary", "Accept-Encoding")
+
+        self._send_cache_headers(asset, immutable)
+        self.end_headers()
+
+        return io.BytesIO(content)
+
+    def _send_cache_headers(self, asset: Asset, immutable: bool = False):
+        self.send_header("ETag", asset.etag)
+        self.send_header("Last-Modified", asset.last_modified)
+
+        if immutable:
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            # Allow the browser to cache content, but ensure it always checks for
+            # updates.
+            self.send_header("Cache-Control", "no-cache")
+
+    def _get_webview_version(self, path: str) -> str:
+        """Return the version of ``webview.js`` to inject into the given file.
+
+        If the file is not an html page, or ``webview.js`` cannot be found, this returns
+        an empty string.
+        """
+        if self.guess_type(path).split(";")[0].strip() != "text/html":
+            return ""
+
+        try:
+            return f"{WEBVIEW_JS.stat().st_mtime_ns:x}"
+        except OSError:
+            self.logger.exception("Unable to find '%s'", WEBVIEW_JS)
+            return ""
+
+    def _inject_webview_js(
+        self, content_type: str, content: bytes, *, version: str
+    ) -> bytes:
+        """Add a ``<script>`` tag loading the given version of ``webview.js`` to any
+        html pages.
+
+        Injecting the script at response time, rather than including it in the build,
+        keeps the build output unchanged and allows the browser to cache the script.
+        """
+        if not version or content_type.split(";")[0].strip() != "text/html":
+            return content
+
+        script = f'<script src="{WEBVIEW_JS_PATH}?v={version}"></script>'.encode()
+
+        # Insert the script before the last closing body tag, if there is one.
+        matches = list(END_BODY.finditer(content))
+        if len(matches) == 0:
+            return content + script
+
+        idx = matches[-1].start()
+        return content[:idx] + script + content[idx:]
+
+    def _is_not_modified(self, asset: Asset) -> bool:
+        """Determine if the client's copy of the given asset is up to date."""
+
+        if (etags := self.headers.get("If-None-Match")) is not None:
+            return any(e.strip() in {asset.etag, "*"} for e in etags.split(","))
+
+        if (since := self.headers.get("If-Modified-Since")) is not None:
+            try:
+                timestamp = email.utils.parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+
+            return int(asset.mtime_ns // 1_000_000_000) <= timestamp
+
+        return False
+
+    def _choose_encoding(self, asset: Asset) -> Optional[str]:
+        """Choose the encoding to use for the given asset, if any."""
+        if not asset.compressible:
+            return None
+
+        accepted = {
+            e.split(";")[0].strip()
+            for e in self.headers.get("Accept-Encoding", "").split(",")
+        }
+
+        if "br" in accepted and brotli is not None:
+            return "br"
+
+        if "gzip" in accepted:
+            return "gzip"
+
+        return None
 
     def log_message(self, format: str, *args: Any) -> None:
         self.logger.debug(format, *args)
@@ -40,6 +521,7 @@ class RequestHandlerFactory:
     def __init__(self, logger: logging.Logger, build_uri: Uri | None = None):
         self.logger = logger
         self.build_uri = build_uri
+        self.cache = AssetCache()
 
     def __call__(self, *args, **kwargs):
         if self.build_uri is None:
@@ -50,7 +532,13 @@ class RequestHandlerFactory:
                 "Unable to determine build dir from uri: '%s'", self.build_uri
             )
 
-        return RequestHandler(*args, logger=self.logger, directory=build_dir, **kwargs)
+        return RequestHandler(
+            *args,
+            logger=self.logger,
+            directory=build_dir,
+            cache=self.cache,
+            **kwargs,
+        )
 
 
 class PreviewServer:
@@ -75,7 +563,7 @@ class PreviewServer:
         self._future: asyncio.Future | None = None
         """The future representing the http server's "task"."""
 
-        self._server: HTTPServer | None = None
+        self._server: ThreadingHTTPServer | None = None
         """The http server itself."""
 
     def __await__(self):
@@ -98,6 +586,9 @@ class PreviewServer:
 
     @build_uri.setter
     def build_uri(self, value):
+        if value != self._handler_factory.build_uri:
+            self._handler_factory.cache.clear()
+
         self._handler_factory.build_uri = value
 
     async def start(self):
@@ -106,7 +597,9 @@ class PreviewServer:
         # Yes, this method does not need to be async. However, making it async means it
         # aligns well with the pattern we've established in other components.
 
-        self._server = HTTPServer(
+        # Each request is handled in its own thread, so that pages with many assets
+        # can be loaded concurrently.
+        self._server = ThreadingHTTPServer(
             (self.config.bind, self.config.http_port), self._handler_factory
         )
 
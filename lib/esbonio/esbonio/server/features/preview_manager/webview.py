@@ -16,11 +16,87 @@ from websockets.server import serve
 from esbonio import server
 
 if typing.TYPE_CHECKING:
+    from typing import Any
+    from typing import Callable
+
     from websockets import WebSocketServer
 
     from .config import PreviewConfig
 
 
+SCROLL_INTERVAL = 1 / 60
+"""The minimum time (in seconds) between scroll messages, roughly one per frame."""
+
+
+class Throttle:
+    """Limits how often a function is called.
+
+    Calls made while the function is waiting to be called are coalesced, so that
+    when the function is eventually called, it is called with the most recent
+    arguments. Any superseded calls are dropped.
+    """
+
+    def __init__(self, func: Callable[..., Any], interval: float):
+        self.func = func
+        """The function to call."""
+
+        self.interval = interval
+        """The minimum time (in seconds) between calls."""
+
+        self.sent = 0
+        """The number of times the function has been called."""
+
+        self.dropped = 0
+        """The number of calls that were dropped as they were superseded."""
+
+        self._pending: tuple[Any, ...] | None = None
+        """The arguments of the call waiting to be made, if any."""
+
+        self._handle: asyncio.TimerHandle | None = None
+        """The handle of the scheduled call, if any."""
+
+        self._last = float("-inf")
+        """When the function was last called."""
+
+    def __call__(self, *args: Any):
+        if self._pending is not None:
+            self.dropped += 1
+
+        self._pending = args
+        if self._handle is not None:
+            return
+
+        loop = asyncio.get_running_loop()
+        delay = self._last + self.interval - loop.time()
+
+        if delay <= 0:
+            self._flush()
+        else:
+            self._handle = loop.call_later(delay, self._flush)
+
+    def cancel(self):
+        """Cancel any pending call."""
+        if self._handle is not None:
+            self._handle.cancel()
+
+        if self._pending is not None:
+            self.dropped += 1
+
+        self._handle = None
+        self._pending = None
+
+    def _flush(self):
+        """Call the function with the most recent arguments."""
+        self._handle = None
+        if (args := self._pending) is None:
+            return
+
+        self._pending = None
+        self._last = asyncio.get_running_loop().time()
+        self.sent += 1
+        self.func(*args)
+
+
 class WebviewServer(JsonRPCServer):
     """The webview server controlls the webpage hosting the preview.
 
@@ -54,6 +130,12 @@ class WebviewServer(JsonRPCServer):
         self._current_uri: str | None = None
         """If set, indicates the current uri the editor and view are scrolling."""
 
+        self.scroll_view = Throttle(self._scroll_view, SCROLL_INTERVAL)
+        """Used to scroll the view, at most once per ``SCROLL_INTERVAL``."""
+
+        self.scroll_editor: Throttle | None = None
+        """Used to scroll the editor, at most once per ``SCROLL_INTERVAL``."""
+
     def __await__(self):
         """Makes the server await-able"""
         if self._startup_task is None:
@@ -79,6 +161,33 @@ class WebviewServer(JsonRPCServer):
         if self.connected:
             self.protocol.notify("view/reload", {})
 
+    def patch(self, path: str, body: str):
+        """Replace the body of the current view in place, preserving its scroll
+        position.
+
+        Parameters
+        ----------
+        path
+           The path of the page the new body belongs to. If the view is showing a
+           different page, it will be reloaded instead.
+
+        body
+           The new content of the page's ``<body>`` element
+        """
+        if self.connected:
+            self.protocol.notify("view/patch", {"path": path, "body": body})
+
+    @property
+    def scroll_stats(self) -> dict[str, int]:
+        """The number of scroll messages sent and dropped in each direction."""
+        editor = self.scroll_editor
+        return {
+            "viewSent": self.scroll_view.sent,
+            "viewDropped": self.scroll_view.dropped,
+            "editorSent": editor.sent if editor else 0,
+            "editorDropped": editor.dropped if editor else 0,
+        }
+
     def scroll(self, uri: str, line: int):
         """Called by the editor to scroll the current webview."""
         if not self.connected or self._view_in_control:
@@ -90,7 +199,12 @@ class WebviewServer(JsonRPCServer):
 
         self._current_uri = uri
         self._editor_in_control = asyncio.create_task(self.cooldown("editor"))
-        self.protocol.notify("view/scroll", {"uri": uri, "line": line})
+        self.scroll_view(uri, line)
+
+    def _scroll_view(self, uri: str, line: int):
+        """Send the given scroll position to the view."""
+        if self.connected:
+            self.protocol.notify("view/scroll", {"uri": uri, "line": line})
 
     async def cooldown(self, name: str):
         """Create a cooldown."""
@@ -137,6 +251,12 @@ class WebviewServer(JsonRPCServer):
             self.logger.debug("Connection lost")
             self._connected = False
 
+            self.scroll_view.cancel()
+            if self.scroll_editor is not None:
+                self.scroll_editor.cancel()
+
+            self.logger.debug("Scroll stats: %s", self.scroll_stats)
+
         async with serve(
             connection,
             host,
@@ -153,6 +273,21 @@ def make_ws_server(
 ) -> WebviewServer:
     server = WebviewServer(esbonio.logger, config)
 
+    def scroll_editor(uri: str, line: int):
+        """Scroll the editor to the given location."""
+        esbonio.window_show_document(
+            types.ShowDocumentParams(
+                uri=uri,
+                external=False,
+                selection=types.Range(
+                    start=types.Position(line=line - 1, character=0),
+                    end=types.Position(line=line, character=0),
+                ),
+            )
+        )
+
+    server.scroll_editor = Throttle(scroll_editor, SCROLL_INTERVAL)
+
     @server.feature("editor/scroll")
     def on_scroll(ls: WebviewServer, params):
         """Called by the webview to scroll the editor."""
@@ -165,15 +300,7 @@ def make_ws_server(
 
         server._view_in_control = asyncio.create_task(server.cooldown("view"))
 
-        esbonio.window_show_document(
-            types.ShowDocumentParams(
-                uri=params.uri,
-                external=False,
-                selection=types.Range(
-                    start=types.Position(line=params.line - 1, character=0),
-                    end=types.Position(line=params.line, character=0),
-                ),
-            )
-        )
+        if server.scroll_editor is not None:
+            server.scroll_editor(params.uri, params.line)
 
     return server
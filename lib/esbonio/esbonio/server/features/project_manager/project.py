@@ -8,6 +8,7 @@ import aiosqlite
 
 from esbonio.server import Uri
 from esbonio.sphinx_agent import types
+from esbonio.sphinx_agent.tracing import traced
 
 if typing.TYPE_CHECKING:
     from typing import Any
@@ -39,26 +40,30 @@ class Project:
     def load_as(self, o: str, t: type[T]) -> T:
         return self.converter.structure(json.loads(o), t)
 
+    @traced(category="project")
     async def get_src_uris(self) -> list[Uri]:
         """Return all known source uris."""
         db = await self.get_db()
 
-        query = "SELECT uri FROM files"
+        query = "SELECT DISTINCT uri FROM files"
         async with db.execute(query) as cursor:
             results = await cursor.fetchall()
             return [Uri.parse(s[0]) for s in results]
 
+    @traced(category="project")
     async def get_build_path(self, src_uri: Uri) -> str | None:
         """Get the build path associated with the given ``src_uri``."""
         db = await self.get_db()
 
-        query = "SELECT urlpath FROM files WHERE uri = ?"
+        # Prefer the file's own page over any pages that include it.
+        query = "SELECT urlpath FROM files WHERE uri = ? ORDER BY parent IS NOT NULL"
         async with db.execute(query, (str(src_uri.resolve()),)) as cursor:
             if (result := await cursor.fetchone()) is None:
                 return None
 
             return result[0]
 
+    @traced(category="project")
     async def get_config_value(self, name: str) -> Any | None:
         """Return the requested configuration value, if available."""
 
@@ -72,6 +77,7 @@ class Project:
         (value,) = row
         return json.loads(value)
 
+    @traced(category="project")
     async def get_directives(self) -> list[tuple[str, str | None]]:
         """Get the directives known to Sphinx."""
         db = await self.get_db()
@@ -80,6 +86,7 @@ class Project:
         cursor = await db.execute(query)
         return await cursor.fetchall()  # type: ignore[return-value]
 
+    @traced(category="project")
     async def get_role(self, name: str) -> types.Role | None:
         """Get the roles known to Sphinx."""
         db = await self.get_db()
@@ -90,6 +97,7 @@ class Project:
 
         return types.Role.from_db(self.load_as, *result) if result is not None else None
 
+    @traced(category="project")
     async def get_roles(self) -> list[tuple[str, str | None]]:
         """Get the roles known to Sphinx."""
         db = await self.get_db()
@@ -98,6 +106,7 @@ class Project:
         cursor = await db.execute(query)
         return await cursor.fetchall()  # type: ignore[return-value]
 
+    @traced(category="project")
     async def get_document_symbols(self, src_uri: Uri) -> list[types.Symbol]:
         """Get the symbols for the given file."""
         db = await self.get_db()
@@ -108,6 +117,7 @@ class Project:
         cursor = await db.execute(query, (str(src_uri.resolve()),))
         return await cursor.fetchall()  # type: ignore[return-value]
 
+    @traced(category="project")
     async def find_symbols(self, **kwargs) -> list[types.Symbol]:
         """Find symbols which match the given criteria."""
         db = await self.get_db()
@@ -130,6 +140,7 @@ class Project:
         cursor = await db.execute(query, tuple(parameters))
         return await cursor.fetchall()  # type: ignore[return-value]
 
+    @traced(category="project")
     async def get_workspace_symbols(
         self, query: str
     ) -> list[tuple[str, str, int, str, str, str]]:
@@ -155,6 +166,7 @@ WHERE
         cursor = await db.execute(sql_query, (query_str, query_str))
         return await cursor.fetchall()  # type: ignore[return-value]
 
+    @traced(category="project")
     async def get_diagnostics(self) -> dict[Uri, list[dict[str, Any]]]:
         """Get diagnostics for the project."""
         db = await self.get_db()
@@ -7,6 +7,7 @@ from .client import ClientState
 from .client import SphinxClient
 from .client_subprocess import make_subprocess_sphinx_client
 from .config import SphinxConfig
+from .config import SphinxManagerConfig
 from .manager import SphinxManager
 
 __all__ = [
@@ -14,6 +15,7 @@ __all__ = [
     "SphinxClient",
     "SphinxConfig",
     "SphinxManager",
+    "SphinxManagerConfig",
 ]
 
 
@@ -30,3 +32,90 @@ def esbonio_setup(server: EsbonioLanguageServer, project_manager: ProjectManager
                 continue
 
             await manager.restart_client(item["id"])
+
+    @server.command("esbonio.sphinx.resourceUsage")
+    async def resource_usage(ls: EsbonioLanguageServer, *args):
+        """Return the most recent resource usage sample for each client."""
+        results = []
+
+        for scope, client in manager.clients.items():
+            if client is None:
+                continue
+
+            usage = manager.resource_usage.get(client.id, None)
+            results.append(
+                {
+                    "id": client.id,
+                    "scope": scope,
+                    "state": client.state.name if client.state else None,
+                    "rss": usage.rss if usage else None,
+                    "cpuPercent": usage.cpu_percent if usage else None,
+                }
+            )
+
+        return results
+
+    @server.command("esbonio.sphinx.buildStats")
+    async def build_stats(ls: EsbonioLanguageServer, *args):
+        """Return the time spent in each event listener and transform during the most
+        recent build of each client."""
+        results = []
+
+        for scope, client in manager.clients.items():
+            if client is None or client.state != ClientState.Running:
+                continue
+
+            try:
+                stats = await client.get_build_stats()
+            except Exception:
+                ls.logger.error(
+                    "Unable to get build stats for %s", client, exc_info=True
+                )
+                continue
+
+            results.append(
+                {
+                    "id": client.id,
+                    "scope": scope,
+                    "listeners": [
+                        {
+                            "event": listener.event,
+                            "listener": listener.listener,
+                            "extension": listener.extension,
+                            "calls": listener.calls,
+                            "duration": listener.duration,
+                        }
+                        for listener in stats.listeners
+                    ],
+                    "transforms": [
+                        {
+                            "transform": transform.transform,
+                            "extension": transform.extension,
+                            "calls": transform.calls,
+                            "duration": transform.duration,
+                        }
+                        for transform in stats.transforms
+                    ],
+                }
+            )
+
+        return results
+
+    @server.command("esbonio.server.showBuildStats")
+    async def show_build_stats(ls: EsbonioLanguageServer, *args):
+        """Return statistics describing the most recent builds, oldest first."""
+        return [
+            {
+                "id": record.id,
+                "scope": record.scope,
+                "timestamp": record.timestamp,
+                "duration": record.summary.duration,
+                "phases": record.summary.phases,
+                "docsRead": record.summary.docs_read,
+                "docsWritten": record.summary.docs_written,
+                "diagnostics": record.summary.diagnostics,
+                "peakRssDelta": record.summary.peak_rss_delta,
+                "rowsWritten": record.summary.rows_written,
+            }
+            for record in manager.build_history
+        ]
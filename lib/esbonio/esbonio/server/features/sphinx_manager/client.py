@@ -47,6 +47,11 @@ class SphinxClient(Protocol):
         """The id of the Sphinx instance."""
         ...
 
+    @property
+    def pid(self) -> int | None:
+        """The process id of the Sphinx agent, if available."""
+        ...
+
     @property
     def db(self) -> pathlib.Path:
         """Connection to the associated database."""
@@ -91,9 +96,14 @@ class SphinxClient(Protocol):
         filenames: list[str] | None = None,
         force_all: bool = False,
         content_overrides: dict[str, str] | None = None,
+        priority: list[str] | None = None,
     ) -> types.BuildResult:
         """Trigger a Sphinx build."""
         ...
 
+    async def get_build_stats(self) -> types.BuildStats:
+        """Return statistics about the most recent build."""
+        ...
+
     async def stop(self):
         """Stop the client."""
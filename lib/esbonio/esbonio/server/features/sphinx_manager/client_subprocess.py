@@ -13,11 +13,14 @@ from uuid import uuid4
 
 import platformdirs
 from pygls.client import JsonRPCClient
+from pygls.exceptions import JsonRpcInternalError
 from pygls.protocol import JsonRPCProtocol
 
 from esbonio.server import EventSource
 from esbonio.server import Uri
+from esbonio.sphinx_agent import codecs
 from esbonio.sphinx_agent import types
+from esbonio.sphinx_agent.tracing import tracer
 
 from .client import ClientState
 from .config import SphinxConfig
@@ -29,12 +32,74 @@ if typing.TYPE_CHECKING:
     from .manager import SphinxManager
 
 
+logger = logging.getLogger(__name__)
 sphinx_logger = logging.getLogger("sphinx")
 
 
 class SphinxAgentProtocol(JsonRPCProtocol):
     """Describes the protocol spoken between the client below and the sphinx agent."""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.codec: codecs.JsonCodec = codecs.JSON
+        """The codec used to encode and decode messages.
+
+        Messages are encoded as JSON until a different codec has been negotiated as
+        part of the ``sphinx/createApp`` request.
+        """
+
+        self.messages = codecs.MessageBuffer()
+        """Holds data received from the agent, until a complete message is available."""
+
+    def reset(self):
+        """Reset the protocol, ready to talk to a new agent."""
+        self.codec = codecs.JSON
+        self.messages = codecs.MessageBuffer()
+
+    def _send_data(self, data):
+        """Send the given data to the agent, encoded using the current codec."""
+        if not data:
+            return
+
+        if self.transport is None:
+            logger.error("Unable to send data, no available transport!")
+            return
+
+        try:
+            # Propagate the current trace context (if any) with each request, so that
+            # the agent can record spans on our behalf.
+            if hasattr(data, "id") and hasattr(data, "method"):
+                if (context := tracer.context()) is not None:
+                    data = {**self._serialize_message(data), "trace": context}
+
+            body = self.codec.dumps(data, default=self._serialize_message)
+            header = (
+                f"Content-Length: {len(body)}\r\n"
+                f"Content-Type: {self.codec.content_type}\r\n\r\n"
+            ).encode()
+
+            self.transport.write(header + body)
+        except Exception as error:
+            logger.exception("Error sending data")
+            self._server._report_server_error(error, JsonRpcInternalError)
+
+    def _data_received(self, data: bytes):
+        """Handle data from the agent, which may contain any number of messages (or
+        parts of messages)."""
+        self.messages.feed(data)
+
+        while (body := self.messages.next_body()) is not None:
+            message = self.codec.loads(body, object_hook=self._deserialize_message)
+
+            # Switch codecs as soon as the agent tells us which one it has chosen, the
+            # very next message may be using it.
+            if isinstance(info := getattr(message, "result", None), types.SphinxInfo):
+                self.codec = codecs.CODECS.get(info.codec, codecs.JSON)
+                logger.debug("Using codec: '%s'", self.codec.name)
+
+            self._procedure_handler(message)
+
     def get_message_type(self, method: str) -> Any | None:
         return types.METHOD_TO_MESSAGE_TYPE.get(method, None)
 
@@ -86,6 +151,14 @@ class SubprocessSphinxClient(JsonRPCClient):
         self._stderr_forwarder: asyncio.Task | None = None
         """A task that forwards the server's stderr to the test process."""
 
+        self.progress_interval = 0.1
+        """The minimum time (in seconds) between progress reports sent by the agent."""
+
+        self._content: dict[str, tuple[int, str]] = {}
+        """The version and content of each override the agent has acknowledged."""
+
+        self.feature("sphinx/traceEvents")(record_trace_events)
+
     def __repr__(self):
         if self.state is None:
             return "SphinxClient<None>"
@@ -108,6 +181,14 @@ class SubprocessSphinxClient(JsonRPCClient):
     def converter(self):
         return self.protocol._converter
 
+    @property
+    def pid(self) -> int | None:
+        """The process id of the sphinx agent, if it is running."""
+        if self._server is None or self._server.returncode is not None:
+            return None
+
+        return self._server.pid
+
     @property
     def builder(self) -> str:
         """The sphinx application's builder name"""
@@ -207,6 +288,11 @@ class SubprocessSphinxClient(JsonRPCClient):
             command = get_start_command(self.config, self.logger)
             env = get_sphinx_env(self.config)
 
+            # A new agent always starts out speaking JSON and knows nothing of any
+            # content overrides.
+            self.protocol.reset()  # type: ignore[attr-defined]
+            self._content = {}
+
             self.logger.debug("Starting sphinx agent: %s", " ".join(command))
             await self.start_io(*command, env=env, cwd=self.config.cwd)
 
@@ -216,6 +302,8 @@ class SubprocessSphinxClient(JsonRPCClient):
                 context={
                     "cacheDir": platformdirs.user_cache_dir("esbonio", "swyddfa"),
                 },
+                codecs=codecs.available_codecs(),
+                progress_interval=self.progress_interval,
             )
             self.sphinx_info = await self.protocol.send_request_async(
                 "sphinx/createApp", params
@@ -259,23 +347,113 @@ class SubprocessSphinxClient(JsonRPCClient):
         filenames: list[str] | None = None,
         force_all: bool = False,
         content_overrides: dict[str, str] | None = None,
+        priority: list[str] | None = None,
     ) -> types.BuildResult:
-        """Trigger a Sphinx build."""
+        """Trigger a Sphinx build.
+
+        Rather than sending the full content of each override every time, only the
+        changes made since the content the agent last acknowledged are sent.
+        """
+        content_overrides = content_overrides or {}
+        content_deltas = {
+            uri: make_content_delta(self._content.get(uri), content)
+            for uri, content in content_overrides.items()
+        }
 
         params = types.BuildParams(
             filenames=filenames or [],
             force_all=force_all,
-            content_overrides=content_overrides or {},
+            content_deltas=content_deltas,
+            priority=priority or [],
         )
 
         self._building = True
         try:
-            result = await self.protocol.send_request_async("sphinx/build", params)
+            with tracer.span("SphinxClient.build", documents=len(content_deltas)):
+                result = await self.protocol.send_request_async("sphinx/build", params)
+        except Exception:
+            # We can no longer be sure what content the agent has.
+            self._content = {}
+            raise
         finally:
             self._building = False
 
+        self._content = {
+            uri: (content_deltas[uri].version, content)
+            for uri, content in content_overrides.items()
+        }
         return result
 
+    async def get_build_stats(self) -> types.BuildStats:
+        """Return statistics about the most recent build."""
+        return await self.protocol.send_request_async("sphinx/getBuildStats", None)
+
+
+def make_content_delta(
+    previous: tuple[int, str] | None, content: str
+) -> types.ContentDelta:
+    """Return the changes required to bring the agent's copy of a document up to date.
+
+    Parameters
+    ----------
+    previous
+       The version and content of the document, as last acknowledged by the agent.
+
+    content
+       The current content of the document.
+
+    Returns
+    -------
+    types.ContentDelta
+       The changes to send to the agent.
+    """
+    if previous is None:
+        return types.ContentDelta(
+            version=1, changes=[types.ContentChange(text=content)]
+        )
+
+    version, text = previous
+    if text == content:
+        return types.ContentDelta(version=version, base_version=version)
+
+    return types.ContentDelta(
+        version=version + 1,
+        base_version=version,
+        changes=[diff_content(text, content)],
+    )
+
+
+def diff_content(old: str, new: str) -> types.ContentChange:
+    """Return a single change that transforms ``old`` into ``new``.
+
+    The change covers all the lines between the longest common prefix and suffix of
+    both texts.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    limit = min(len(old_lines), len(new_lines))
+
+    start = 0
+    while start < limit and old_lines[start] == new_lines[start]:
+        start += 1
+
+    end = 0
+    while end < limit - start and old_lines[-1 - end] == new_lines[-1 - end]:
+        end += 1
+
+    return types.ContentChange(
+        text="".join(new_lines[start : len(new_lines) - end]),
+        range=types.Range(
+            start=types.Position(line=start, character=0),
+            end=types.Position(line=len(old_lines) - end, character=0),
+        ),
+    )
+
+
+def record_trace_events(params: types.TraceEventsParams):
+    """Add the events recorded by the agent to our own trace."""
+    tracer.add_events(params.events)
+
 
 async def forward_stderr(server: asyncio.subprocess.Process):
     if server.stderr is None:
@@ -305,6 +483,7 @@ def make_subprocess_sphinx_client(
        The configured client
     """
     client = SubprocessSphinxClient(config, logger=manager.logger)
+    client.progress_interval = manager.config.progress_interval
 
     @client.feature("window/logMessage")
     def _on_msg(ls: SubprocessSphinxClient, params):
@@ -314,6 +493,10 @@ def make_subprocess_sphinx_client(
     def _on_progress(ls: SubprocessSphinxClient, params):
         manager.report_progress(ls, params)
 
+    @client.feature("sphinx/partialBuildResult")
+    def _on_partial_result(ls: SubprocessSphinxClient, params):
+        manager.report_partial_result(ls, params)
+
     return client
 
 
@@ -39,6 +39,40 @@ def get_module_path(module: str) -> Optional[pathlib.Path]:
     return agent.parent.parent
 
 
+@attrs.define
+class SphinxManagerConfig:
+    """Configuration for the component managing the sphinx agent processes."""
+
+    idle_timeout: float = attrs.field(default=0)
+    """Stop agents that have not been used for this many seconds.
+
+    Stopped agents are restarted when next needed. If ``0``, agents are never stopped
+    for being idle."""
+
+    max_clients: int = attrs.field(default=0)
+    """The maximum number of agents allowed to run at once.
+
+    When exceeded, the least recently used agents are stopped. If ``0``, the number of
+    agents is unlimited."""
+
+    max_concurrent_builds: int = attrs.field(default=0)
+    """The maximum number of builds allowed to run at once, across all agents.
+
+    If ``0``, the limit is derived from the number of CPU cores and the number of
+    parallel jobs used by each build."""
+
+    sample_interval: float = attrs.field(default=30)
+    """How often, in seconds, to sample the resource usage of agent processes and
+    check for idle agents."""
+
+    progress_interval: float = attrs.field(default=0.1)
+    """The minimum time, in seconds, between the progress reports sent by each agent
+    during a build."""
+
+    build_history: int = attrs.field(default=100)
+    """The number of builds (across all agents) to keep statistics for."""
+
+
 @attrs.define
 class SphinxConfig:
     """Configuration for the sphinx agent subprocess."""
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+import collections
+import os
+import time
 import traceback
 import typing
 import uuid
@@ -15,6 +18,10 @@ from esbonio.sphinx_agent import types
 
 from .client import ClientState
 from .config import SphinxConfig
+from .config import SphinxManagerConfig
+from .resources import sample_process
+from .resources import select_idle_clients
+from .scheduler import BuildScheduler
 
 if typing.TYPE_CHECKING:
     from typing import Callable
@@ -22,6 +29,7 @@ if typing.TYPE_CHECKING:
     from esbonio.server.features.project_manager import ProjectManager
 
     from .client import SphinxClient
+    from .resources import ResourceUsage
 
     SphinxClientFactory = Callable[["SphinxManager", "SphinxConfig"], "SphinxClient"]
 
@@ -73,6 +81,23 @@ class ClientDestroyedNotification:
     """The client's id"""
 
 
+@attrs.define
+class BuildRecord:
+    """Statistics describing a completed build."""
+
+    id: str
+    """The id of the client that performed the build."""
+
+    scope: str
+    """The scope of the client that performed the build."""
+
+    summary: types.BuildSummary
+    """Statistics reported by the agent."""
+
+    timestamp: float = attrs.field(factory=time.time)
+    """When the build completed."""
+
+
 class SphinxManager(server.LanguageFeature):
     """Responsible for managing Sphinx application instances."""
 
@@ -106,9 +131,59 @@ class SphinxManager(server.LanguageFeature):
         self._progress_tokens: dict[str, str] = {}
         """Holds work done progress tokens."""
 
+        self.config = SphinxManagerConfig()
+        """The current configuration."""
+
+        self.resource_usage: dict[str, ResourceUsage] = {}
+        """The most recent resource usage sample for each client, indexed by id."""
+
+        self.build_history: collections.deque[BuildRecord] = collections.deque(
+            maxlen=self.config.build_history
+        )
+        """Statistics describing the most recent builds, oldest first."""
+
+        self._last_used: dict[str, float] = {}
+        """Records when the client at each scope was last used."""
+
+        self._idle_clients: set[str] = set()
+        """The scopes of clients that have been stopped to free up resources."""
+
+        self._waking: dict[str, asyncio.Task] = {}
+        """Holds tasks that are restarting a previously idle client."""
+
+        self._housekeeping: asyncio.Task | None = None
+        """The task responsible for sampling resource usage and stopping idle clients."""
+
+        self._focused_scope: str | None = None
+        """The scope containing the document the user is currently focused on."""
+
+        self._scheduler = BuildScheduler(self.logger, priority=self._build_priority)
+        """Limits the number of builds that can run at once."""
+
     def add_listener(self, event: str, handler):
         self._events.add_listener(event, handler)
 
+    def initialized(self, params: lsp.InitializedParams):
+        """Called once the initial handshake between client and server has finished."""
+        self.configuration.subscribe(
+            "esbonio.sphinx", SphinxManagerConfig, self.update_configuration
+        )
+
+    def update_configuration(
+        self, event: server.ConfigChangeEvent[SphinxManagerConfig]
+    ):
+        """Called when the user's configuration is updated."""
+        self.config = event.value
+        self._update_build_limit()
+
+        if (maxlen := max(self.config.build_history, 0)) != self.build_history.maxlen:
+            self.build_history = collections.deque(self.build_history, maxlen=maxlen)
+
+        if self._housekeeping is not None:
+            self._housekeeping.cancel()
+
+        self._housekeeping = asyncio.create_task(self._run_housekeeping())
+
     async def document_change(self, params: lsp.DidChangeTextDocumentParams):
         if (uri := Uri.parse(params.text_document.uri)) is None:
             return
@@ -117,6 +192,8 @@ class SphinxManager(server.LanguageFeature):
         if client is None:
             return
 
+        self.focus(uri)
+
         # Cancel any existing pending builds
         if (task := self._pending_builds.pop(client.id, None)) is not None:
             task.cancel()
@@ -139,6 +216,8 @@ class SphinxManager(server.LanguageFeature):
         if client is None:
             return
 
+        self.focus(uri)
+
         # Cancel any existing pending builds
         if (task := self._pending_builds.pop(client.id, None)) is not None:
             task.cancel()
@@ -148,6 +227,11 @@ class SphinxManager(server.LanguageFeature):
     async def shutdown(self, params: None):
         """Called when the server is instructed to ``shutdown``."""
 
+        if self._housekeeping is not None:
+            self._housekeeping.cancel()
+
+        self._scheduler.cancel()
+
         # Stop any existing clients.
         tasks = []
         for client in self.clients.values():
@@ -164,10 +248,51 @@ class SphinxManager(server.LanguageFeature):
         self._pending_builds.pop(app_id)
         await self.trigger_build(uri)
 
+    def focus(self, uri: Uri):
+        """Indicate that the user is currently focused on the given uri.
+
+        Builds for the project containing the focused document are given priority over
+        builds of other projects.
+        """
+        self._focused_scope = self.server.configuration.scope_for(uri)
+
+    def _build_priority(self, scope: str):
+        """Return the priority of a build for the given scope, lower values are built
+        first."""
+        return (scope != self._focused_scope, -self._last_used.get(scope, 0))
+
+    def _update_build_limit(self):
+        """Update the number of builds that are allowed to run at once."""
+        if (limit := self.config.max_concurrent_builds) <= 0:
+            num_jobs = [
+                client.sphinx_info.num_jobs
+                for client in self.clients.values()
+                if client is not None and client.sphinx_info is not None
+            ]
+            limit = (os.cpu_count() or 1) // max([1, *num_jobs])
+
+        self._scheduler.max_concurrent = max(limit, 1)
+        self.logger.debug("Max concurrent builds: %d", self._scheduler.max_concurrent)
+
     async def trigger_build(self, uri: Uri):
-        """Trigger a build for the relevant Sphinx application for the given uri."""
+        """Trigger a build for the relevant Sphinx application for the given uri.
+
+        The build is queued with the scheduler, which limits the number of builds that
+        run at once across all projects. If a build for the same project is already
+        waiting to start, the two will be coalesced into a single build.
+        """
         self.logger.debug("Triggering build")
 
+        client = await self.get_client(uri)
+        if client is None:
+            return
+
+        scope = self.server.configuration.scope_for(uri)
+        await self._scheduler.schedule(scope, partial(self._build, uri))
+
+    async def _build(self, uri: Uri):
+        """Build the relevant Sphinx application for the given uri."""
+
         client = await self.get_client(uri)
         if client is None:
             return
@@ -180,10 +305,19 @@ class SphinxManager(server.LanguageFeature):
             self.logger.debug("Skipping build, project is None")
             return
 
+        # Files may have been created, moved or deleted since the last build, changing
+        # how uris resolve.
+        Uri.clear_cache()
+
         # Pass through any unsaved content to the Sphinx agent.
         content_overrides: dict[str, str] = {}
         known_src_uris = await project.get_src_uris()
 
+        # Ask the agent to read the files the user has open first, starting with the
+        # file that triggered the build.
+        priority: list[str] = []
+        open_documents = self.server.workspace.text_documents
+
         for src_uri in known_src_uris:
             doc = self.server.workspace.get_text_document(str(src_uri))
             doc_version = doc.version or 0
@@ -192,10 +326,18 @@ class SphinxManager(server.LanguageFeature):
             if saved_version < doc_version:
                 content_overrides[str(src_uri)] = doc.source
 
+            if str(src_uri) in open_documents:
+                if src_uri == uri:
+                    priority.insert(0, str(src_uri))
+                else:
+                    priority.append(str(src_uri))
+
         await self.start_progress(client)
 
         try:
-            result = await client.build(content_overrides=content_overrides)
+            result = await client.build(
+                content_overrides=content_overrides, priority=priority
+            )
         except Exception as exc:
             self.server.window_show_message(
                 lsp.ShowMessageParams(message=f"{exc}", type=lsp.MessageType.Error)
@@ -204,9 +346,18 @@ class SphinxManager(server.LanguageFeature):
         finally:
             self.stop_progress(client)
 
+        if result.summary is not None:
+            scope = self.server.configuration.scope_for(uri)
+            self.record_build(BuildRecord(client.id, scope, result.summary))
+
         # Notify listeners.
         self._events.trigger("build", client, result)
 
+    def record_build(self, record: BuildRecord):
+        """Add the given record to the build history, discarding the oldest record
+        if necessary."""
+        self.build_history.append(record)
+
     async def restart_client(self, client_id: str):
         """Restart the client with the given id"""
         for client in self.clients.values():
@@ -216,6 +367,11 @@ class SphinxManager(server.LanguageFeature):
             if client.id != client_id:
                 continue
 
+            for scope, scope_client in self.clients.items():
+                if scope_client is client:
+                    self._idle_clients.discard(scope)
+                    self._last_used[scope] = time.monotonic()
+
             try:
                 await client.restart()
             except Exception:
@@ -256,8 +412,84 @@ class SphinxManager(server.LanguageFeature):
             self.logger.debug("No applicable client for uri: %s", uri)
             return None
 
+        self._last_used[scope] = time.monotonic()
+        if scope in self._idle_clients:
+            return await self._wake_client(scope, client)
+
         return await client
 
+    async def _wake_client(self, scope: str, client: SphinxClient) -> SphinxClient:
+        """Restart a client that was previously stopped for being idle.
+
+        Since the agent is started with the same configuration as before, Sphinx is able
+        to reload the project's environment from the pickle it left on disk, so only
+        documents that changed in the meantime need to be rebuilt.
+        """
+        if (task := self._waking.get(scope)) is None:
+            self.logger.info("Restarting idle client for scope '%s'", scope)
+            task = asyncio.create_task(client.restart())
+            self._waking[scope] = task
+
+        try:
+            return await task
+        finally:
+            self._waking.pop(scope, None)
+            self._idle_clients.discard(scope)
+
+    async def _run_housekeeping(self):
+        """Periodically sample resource usage and stop any idle clients."""
+        while True:
+            await asyncio.sleep(max(self.config.sample_interval, 1))
+
+            try:
+                self.sample_resource_usage()
+                await self.stop_idle_clients()
+            except Exception:
+                self.logger.error("Error in housekeeping task", exc_info=True)
+
+    def sample_resource_usage(self):
+        """Sample the resource usage of all running clients."""
+        for client in self.clients.values():
+            if client is None or (pid := client.pid) is None:
+                continue
+
+            previous = self.resource_usage.get(client.id, None)
+            if (usage := sample_process(pid, previous)) is None:
+                continue
+
+            self.resource_usage[client.id] = usage
+            self.logger.debug(
+                "%s: rss=%.1fMiB, cpu=%s%%",
+                client,
+                usage.rss / 2**20,
+                "-" if usage.cpu_percent is None else f"{usage.cpu_percent:.1f}",
+            )
+
+    async def stop_idle_clients(self):
+        """Stop any clients that are idle, or exceed the maximum number of clients."""
+        now = time.monotonic()
+        running = {
+            scope: self._last_used.get(scope, now)
+            for scope, client in self.clients.items()
+            if client is not None and client.state == ClientState.Running
+        }
+
+        idle = select_idle_clients(
+            running,
+            now,
+            idle_timeout=self.config.idle_timeout,
+            max_clients=self.config.max_clients,
+        )
+
+        for scope in idle:
+            if (client := self.clients.get(scope, None)) is None:
+                continue
+
+            self.logger.info("Stopping idle client for scope '%s': %s", scope, client)
+            self._idle_clients.add(scope)
+            self.resource_usage.pop(client.id, None)
+            await client.stop()
+
     async def _create_or_replace_client(
         self, uri: Uri, event: server.ConfigChangeEvent[SphinxConfig]
     ):
@@ -279,6 +511,7 @@ class SphinxManager(server.LanguageFeature):
             return
 
         # If there was a previous client, stop it.
+        self._idle_clients.discard(event.scope)
         if (previous_client := self.clients.pop(event.scope, None)) is not None:
             self.server.protocol.notify(
                 "sphinx/clientDestroyed",
@@ -320,6 +553,12 @@ class SphinxManager(server.LanguageFeature):
                     AppCreatedNotification(id=client.id, application=sphinx_info),
                 )
 
+            self._update_build_limit()
+
+            # Starting a client may take us over the limit of running clients.
+            if self.config.max_clients > 0:
+                self.server.run_task(self.stop_idle_clients())
+
         if new_state == ClientState.Errored:
             error = ""
             detail = ""
@@ -364,6 +603,12 @@ class SphinxManager(server.LanguageFeature):
             token, lsp.WorkDoneProgressEnd(message="Finished")
         )
 
+    def report_partial_result(
+        self, client: SphinxClient, result: types.PartialBuildResultParams
+    ):
+        """Called when the client reports results part way through a build."""
+        self._events.trigger("partial-build", client, result)
+
     def report_progress(self, client: SphinxClient, progress: types.ProgressParams):
         """Report progress done for the given client."""
 
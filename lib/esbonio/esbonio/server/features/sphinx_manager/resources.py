@@ -0,0 +1,159 @@
+"""Resource accounting for sphinx agent processes."""
+
+from __future__ import annotations
+
+import os
+import pathlib
+import time
+from typing import Optional
+
+import attrs
+
+try:
+    import psutil
+except ImportError:
+    psutil = None  # type: ignore[assignment]
+
+
+@attrs.define
+class ResourceUsage:
+    """A snapshot of the resources used by a sphinx agent process."""
+
+    pid: int
+    """The id of the process the sample was taken from."""
+
+    rss: int
+    """The resident set size of the process, in bytes."""
+
+    cpu_time: float
+    """The total (user + system) CPU time consumed by the process, in seconds."""
+
+    # Unable to use `float | None` syntax with cattrs when running Python 3.9
+    cpu_percent: Optional[float] = attrs.field(default=None)
+    """The CPU usage since the previous sample, as a percentage of a single core.
+
+    If ``None``, there was no previous sample to compare against."""
+
+    timestamp: float = attrs.field(factory=time.monotonic)
+    """When the sample was taken."""
+
+
+def sample_process(
+    pid: int, previous: ResourceUsage | None = None
+) -> ResourceUsage | None:
+    """Sample the resource usage of the process with the given ``pid``.
+
+    This uses ``psutil`` if it is available, otherwise it falls back to reading
+    ``/proc`` which is only supported on Linux.
+
+    **Note:** Only the given process is sampled, if the agent was launched via a wrapper
+    command (e.g. ``hatch run python``), the usage of any child processes is not
+    included.
+
+    Parameters
+    ----------
+    pid
+       The id of the process to sample
+
+    previous
+       The previous sample taken from this process (if any), used to compute the
+       current CPU usage.
+
+    Returns
+    -------
+    ResourceUsage | None
+       The resource usage of the process, or ``None`` if it could not be determined.
+    """
+    usage: ResourceUsage | None
+    try:
+        if psutil is not None:
+            usage = _sample_psutil(pid)
+        else:
+            usage = _sample_procfs(pid)
+    except Exception:
+        return None
+
+    if usage is None:
+        return None
+
+    if previous is not None and previous.pid == pid:
+        elapsed = usage.timestamp - previous.timestamp
+        if elapsed > 0:
+            usage.cpu_percent = 100 * (usage.cpu_time - previous.cpu_time) / elapsed
+
+    return usage
+
+
+def _sample_psutil(pid: int) -> ResourceUsage:
+    """Sample the given process using ``psutil``."""
+    process = psutil.Process(pid)
+    with process.oneshot():
+        rss = process.memory_info().rss
+        cpu = process.cpu_times()
+
+    return ResourceUsage(pid=pid, rss=rss, cpu_time=cpu.user + cpu.system)
+
+
+def _sample_procfs(pid: int) -> ResourceUsage | None:
+    """Sample the given process using the ``/proc`` filesystem."""
+    proc = pathlib.Path("/proc", str(pid))
+    if not proc.exists():
+        return None
+
+    # The process' name is in parentheses and can contain spaces, so only split the
+    # fields that come after it.
+    # See: https://man7.org/linux/man-pages/man5/proc_pid_stat.5.html
+    stat = (proc / "stat").read_text()
+    fields = stat[stat.rindex(")") + 2 :].split()
+
+    ticks = os.sysconf("SC_CLK_TCK")
+    utime, stime = int(fields[11]), int(fields[12])
+
+    # See: https://man7.org/linux/man-pages/man5/proc_pid_statm.5.html
+    statm = (proc / "statm").read_text().split()
+    rss = int(statm[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    return ResourceUsage(pid=pid, rss=rss, cpu_time=(utime + stime) / ticks)
+
+
+def select_idle_clients(
+    last_used: dict[str, float],
+    now: float,
+    idle_timeout: float = 0,
+    max_clients: int = 0,
+) -> list[str]:
+    """Select the clients that should be stopped to free up resources.
+
+    Parameters
+    ----------
+    last_used
+       A map of client scopes to the (monotonic) time they were last used.
+       Only clients that are currently running should be included.
+
+    now
+       The current (monotonic) time.
+
+    idle_timeout
+       Clients unused for longer than this number of seconds are selected.
+       If ``0``, clients are never considered idle.
+
+    max_clients
+       The maximum number of clients allowed to run at once, if exceeded the least
+       recently used clients are selected. If ``0``, the number of clients is unlimited.
+
+    Returns
+    -------
+    list[str]
+       The scopes of the clients to stop, least recently used first.
+    """
+    lru = sorted(last_used.keys(), key=lambda scope: last_used[scope])
+    selected: list[str] = []
+
+    if idle_timeout > 0:
+        selected.extend(s for s in lru if now - last_used[s] > idle_timeout)
+
+    if max_clients > 0:
+        remaining = [s for s in lru if s not in selected]
+        selected.extend(remaining[: max(0, len(remaining) - max_clients)])
+
+    return selected
@@ -0,0 +1,154 @@
+"""Coordinates builds across all Sphinx clients."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import typing
+
+import attrs
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Awaitable
+    from typing import Any
+    from typing import Callable
+
+    BuildFunction = Callable[[], Awaitable[Any]]
+    PriorityFunction = Callable[[str], Any]
+
+
+@attrs.define
+class QueuedBuild:
+    """A build waiting to be started."""
+
+    build: BuildFunction
+    """The function that performs the build."""
+
+    future: asyncio.Future
+    """Resolves with the result of the build."""
+
+    order: int
+    """Used to break ties between builds of equal priority, first come first served."""
+
+
+class BuildScheduler:
+    """Limits the number of builds that run at once across all Sphinx clients.
+
+    - Builds are identified by a key (e.g. the client's scope), at most one build per
+      key is allowed to run at a time.
+    - When a build is requested for a key that already has a build waiting in the queue
+      the two requests are coalesced into a single build.
+    - When a slot becomes free, the queued build with the lowest priority value is
+      started next.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger | None = None,
+        max_concurrent: int = 1,
+        priority: PriorityFunction | None = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        """The logger instance to use."""
+
+        self.max_concurrent = max_concurrent
+        """The maximum number of builds that may run at once."""
+
+        self.priority = priority or (lambda _: 0)
+        """Function used to compute the priority of a given key, lower values are
+        started first. It is evaluated each time a build is about to be started, so
+        priorities are always up to date."""
+
+        self._queued: dict[str, QueuedBuild] = {}
+        """Builds waiting to be started."""
+
+        self._running: dict[str, asyncio.Task] = {}
+        """Builds currently running."""
+
+        self._counter = itertools.count()
+        """Used to order builds of equal priority."""
+
+    @property
+    def queued(self) -> list[str]:
+        """The keys of all the builds waiting to be started."""
+        return list(self._queued.keys())
+
+    @property
+    def running(self) -> list[str]:
+        """The keys of all the builds currently running."""
+        return list(self._running.keys())
+
+    async def schedule(self, key: str, build: BuildFunction) -> Any:
+        """Schedule a build, returning its result once it completes.
+
+        If a build is already waiting in the queue for the given ``key``, it will be
+        replaced with the given ``build`` function and both callers will receive the
+        same result.
+
+        Parameters
+        ----------
+        key
+           Identifies the thing being built
+
+        build
+           A function that performs the build when called
+        """
+        if (queued := self._queued.get(key, None)) is not None:
+            self.logger.debug("Coalescing build for '%s'", key)
+            queued.build = build
+        else:
+            future = asyncio.get_running_loop().create_future()
+
+            # Callers may give up waiting on a build, ensure any errors are still
+            # retrieved to prevent asyncio from complaining.
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+            queued = QueuedBuild(build=build, future=future, order=next(self._counter))
+            self._queued[key] = queued
+
+        self._dispatch()
+        return await asyncio.shield(queued.future)
+
+    def _dispatch(self):
+        """Start as many of the queued builds as we are allowed to."""
+
+        while len(self._running) < max(self.max_concurrent, 1):
+            candidates = [k for k in self._queued.keys() if k not in self._running]
+            if len(candidates) == 0:
+                return
+
+            key = min(
+                candidates, key=lambda k: (self.priority(k), self._queued[k].order)
+            )
+            queued = self._queued.pop(key)
+
+            self.logger.debug("Starting build for '%s'", key)
+            task = asyncio.create_task(self._run(key, queued))
+            self._running[key] = task
+
+    async def _run(self, key: str, queued: QueuedBuild):
+        """Run the given build, and start the next one once it's finished."""
+        try:
+            result = await queued.build()
+            if not queued.future.done():
+                queued.future.set_result(result)
+        except BaseException as exc:
+            if not queued.future.done():
+                queued.future.set_exception(exc)
+
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+        finally:
+            self._running.pop(key, None)
+            self._dispatch()
+
+    def cancel(self):
+        """Cancel all running and queued builds."""
+        for queued in self._queued.values():
+            queued.future.cancel()
+
+        for task in self._running.values():
+            task.cancel()
+
+        self._queued.clear()
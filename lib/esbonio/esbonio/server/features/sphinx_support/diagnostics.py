@@ -3,6 +3,7 @@ from functools import partial
 from lsprotocol import types
 
 from esbonio.server import EsbonioLanguageServer
+from esbonio.server import Uri
 from esbonio.server.features.project_manager import ProjectManager
 from esbonio.server.features.sphinx_manager import SphinxClient
 from esbonio.server.features.sphinx_manager import SphinxManager
@@ -18,10 +19,13 @@ async def refresh_diagnostics(
     if (project := projects.get_project(client.src_uri)) is None:
         return
 
+    collection = await project.get_diagnostics()
+
+    # Don't clear the existing diagnostics until we have the new ones, so that the
+    # diagnostics reported so far remain available in the meantime.
     # TODO: Per-client id.
     server.clear_diagnostics("sphinx")
 
-    collection = await project.get_diagnostics()
     for uri, items in collection.items():
         diagnostics = [
             server.converter.structure(item, types.Diagnostic) for item in items
@@ -31,6 +35,32 @@ async def refresh_diagnostics(
     server.sync_diagnostics()
 
 
+def publish_partial_diagnostics(
+    server: EsbonioLanguageServer,
+    client: SphinxClient,
+    result,
+):
+    """Publish the diagnostics for files reported part way through a build.
+
+    Only the files included in the report are updated, the full set of diagnostics is
+    refreshed once the build completes.
+    """
+    uris = []
+    for uri_str, items in result.diagnostics.items():
+        diagnostics = [
+            server.converter.structure(
+                server.converter.unstructure(item), types.Diagnostic
+            )
+            for item in items
+        ]
+
+        uri = Uri.parse(uri_str)
+        server.set_diagnostics("sphinx", uri, diagnostics)
+        uris.append(uri)
+
+    server.sync_diagnostics(uris=uris)
+
+
 def esbonio_setup(
     server: EsbonioLanguageServer,
     sphinx_manager: SphinxManager,
@@ -39,3 +69,6 @@ def esbonio_setup(
     sphinx_manager.add_listener(
         "build", partial(refresh_diagnostics, server, project_manager)
     )
+    sphinx_manager.add_listener(
+        "partial-build", partial(publish_partial_diagnostics, server)
+    )
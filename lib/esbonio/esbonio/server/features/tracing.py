@@ -0,0 +1,86 @@
+"""Records a trace of the work done by the server and its Sphinx agents.
+
+The trace is written in Chrome's trace event format, which can be viewed in tools
+such as https://ui.perfetto.dev
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+from typing import Optional
+
+import attrs
+from lsprotocol import types
+
+from esbonio import server
+from esbonio.server import EsbonioLanguageServer
+from esbonio.sphinx_agent.tracing import tracer
+
+
+@attrs.define
+class TraceConfig:
+    """Configuration options for tracing."""
+
+    filepath: Optional[str] = attrs.field(default=None)
+    """If set, record a trace and write it to the given file on shutdown."""
+
+
+class TraceManager(server.LanguageFeature):
+    """Manages tracing for the server."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.filepath: Optional[pathlib.Path] = None
+        """The file to write the trace to."""
+
+    def initialized(self, params: types.InitializedParams):
+        self.server.configuration.subscribe(
+            "esbonio.trace", TraceConfig, self.update_configuration
+        )
+
+    def update_configuration(self, event: server.ConfigChangeEvent[TraceConfig]):
+        """Enable or disable tracing according to the given config."""
+        filepath = event.value.filepath
+
+        if filepath:
+            self.filepath = pathlib.Path(filepath).expanduser()
+            tracer.enabled = True
+            self.logger.info("Recording trace to: '%s'", self.filepath)
+        else:
+            self.filepath = None
+            tracer.enabled = False
+
+    def shutdown(self, params: None):
+        self.write_trace()
+
+    def write_trace(self) -> Optional[str]:
+        """Write all the events recorded so far to the configured file.
+
+        Returns
+        -------
+        Optional[str]
+           The path to the written file, or ``None`` if tracing is disabled.
+        """
+        if self.filepath is None:
+            return None
+
+        try:
+            self.filepath.parent.mkdir(parents=True, exist_ok=True)
+            self.filepath.write_text(json.dumps(tracer.export()))
+        except Exception:
+            self.logger.error("Unable to write trace", exc_info=True)
+            return None
+
+        return str(self.filepath)
+
+
+def esbonio_setup(server: EsbonioLanguageServer):
+    manager = TraceManager(server)
+    server.add_feature(manager)
+
+    @server.command("esbonio.server.writeTrace")
+    async def write_trace(ls: EsbonioLanguageServer, *args):
+        """Write the trace recorded so far to the configured file."""
+        return manager.write_trace()
@@ -22,10 +22,12 @@ from ._configuration import Configuration
 
 if typing.TYPE_CHECKING:
     from collections.abc import Coroutine
+    from collections.abc import Iterable
     from typing import Any
     from typing import Callable
 
     from .feature import LanguageFeature
+    from .setup import LazyModule
 
 __version__ = "1.0.0b8"
 T = TypeVar("T")
@@ -70,8 +72,26 @@ class EsbonioLanguageServer(LanguageServer):
 
         super().__init__(*args, **kwargs)
 
-        self._diagnostics: dict[tuple[str, Uri], list[types.Diagnostic]] = {}
-        """Where we store and manage diagnostics."""
+        self._diagnostics: dict[str, dict[Uri, list[types.Diagnostic]]] = {}
+        """Where we store and manage diagnostics, indexed by source and then uri."""
+
+        self._diagnostics_sources: dict[Uri, set[str]] = {}
+        """The sources that have reported diagnostics for each uri."""
+
+        self._diagnostics_changed: set[Uri] = set()
+        """The uris whose diagnostics have changed since they were last synced."""
+
+        self._published_diagnostics: dict[Uri, int] = {}
+        """Hashes of the diagnostics most recently published for each uri."""
+
+        self._diagnostics_index: dict[Uri, set[Uri]] = {}
+        """The uris in ``_diagnostics``, indexed by their fully resolved form."""
+
+        self._diagnostics_resolved: dict[Uri, Uri] = {}
+        """The resolved uri each uri in ``_diagnostics`` is currently indexed under."""
+
+        self._diagnostics_result_ids: dict[Uri, str] = {}
+        """The result id of the diagnostics for each fully resolved uri."""
 
         self._loaded_extensions: dict[str, Any] = {}
         """Record of server modules that have been loaded."""
@@ -79,6 +99,15 @@ class EsbonioLanguageServer(LanguageServer):
         self._features: dict[type[LanguageFeature], LanguageFeature] = {}
         """The collection of language features registered with the server."""
 
+        self._lazy_modules: dict[str, LazyModule] = {}
+        """Modules that will be loaded when first used, indexed by name."""
+
+        self._lazy_tasks: dict[str, asyncio.Task] = {}
+        """Tasks loading lazy modules, indexed by name."""
+
+        self._initialize_params: types.InitializeParams | None = None
+        """The params the client sent with the ``initialize`` request."""
+
         self._ready: asyncio.Future[bool] = asyncio.Future()
         """Indicates if the server is ready."""
 
@@ -142,6 +171,7 @@ class EsbonioLanguageServer(LanguageServer):
         )
 
         self.configuration.initialization_options = params.initialization_options
+        self._initialize_params = params
 
     async def initialized(self, params: types.InitializedParams):
         self.configuration.update_file_configuration()
@@ -239,13 +269,15 @@ class EsbonioLanguageServer(LanguageServer):
            If given, clear diagnostics from within just this uri. Otherwise, all
            diagnostics from the given source are cleared.
         """
+        if (by_uri := self._diagnostics.get(source, None)) is None:
+            return
 
-        for key in self._diagnostics.keys():
-            clear_source = source == key[0]
-            clear_uri = uri == key[1] or uri is None
-
-            if clear_source and clear_uri:
-                self._diagnostics[key] = []
+        # Keep an empty list around so that the change is sent to the client on the
+        # next sync.
+        uris = list(by_uri.keys()) if uri is None else [uri]
+        for uri_ in uris:
+            if uri_ in by_uri:
+                self.set_diagnostics(source, uri_, [])
 
     def add_diagnostics(self, source: str, uri: Uri, diagnostic: types.Diagnostic):
         """Add a diagnostic to the given source and uri.
@@ -259,8 +291,8 @@ class EsbonioLanguageServer(LanguageServer):
         diagnostic
            The diagnostic to add
         """
-        key = (source, uri)
-        self._diagnostics.setdefault(key, []).append(diagnostic)
+        self._diagnostics.setdefault(source, {}).setdefault(uri, []).append(diagnostic)
+        self._update_diagnostics_index(source, uri)
 
     def set_diagnostics(
         self, source: str, uri: Uri, diagnostics: list[types.Diagnostic]
@@ -276,7 +308,90 @@ class EsbonioLanguageServer(LanguageServer):
         diagnostics:
            The diagnostics themselves
         """
-        self._diagnostics[(source, uri)] = diagnostics
+        self._diagnostics.setdefault(source, {})[uri] = diagnostics
+        self._update_diagnostics_index(source, uri)
+
+    def get_diagnostics(self, uri: Uri) -> list[types.Diagnostic]:
+        """Return all the diagnostics associated with the given uri.
+
+        Parameters
+        ----------
+        uri
+           The fully resolved uri to get the diagnostics for
+
+        Returns
+        -------
+        list[types.Diagnostic]
+           The diagnostics from all sources associated with the uri.
+        """
+        items = DiagnosticList()
+        for original_uri in self._diagnostics_index.get(uri, set()):
+            items.extend(self._get_diagnostics(original_uri))
+
+        return items.data
+
+    def get_diagnostics_result_id(self, uri: Uri) -> str:
+        """Return an identifier for the current set of diagnostics for the given uri.
+
+        The identifier is derived from the diagnostics themselves, so it only changes
+        when the diagnostics do.
+
+        Parameters
+        ----------
+        uri
+           The fully resolved uri to get the result id for
+
+        Returns
+        -------
+        str
+           The result id
+        """
+        if (result_id := self._diagnostics_result_ids.get(uri, None)) is None:
+            digest = hash_diagnostics(self.get_diagnostics(uri))
+            result_id = f"{digest & 0xFFFFFFFFFFFFFFFF:016x}"
+            self._diagnostics_result_ids[uri] = result_id
+
+        return result_id
+
+    def _get_diagnostics(self, uri: Uri) -> DiagnosticList:
+        """Return the diagnostics from all sources for the given uri, exactly as it was
+        given to the server."""
+        items = DiagnosticList()
+        for source in self._diagnostics_sources.get(uri, set()):
+            items.extend(self._diagnostics[source][uri])
+
+        return items
+
+    def _update_diagnostics_index(self, source: str, uri: Uri):
+        """Update the diagnostics index after the diagnostics for the given source and
+        uri have changed."""
+        self._diagnostics_sources.setdefault(uri, set()).add(source)
+        self._diagnostics_changed.add(uri)
+
+        # Always resolve the uri (which is cached until ``Uri.clear_cache`` is called)
+        # as the filesystem may have changed since it was last indexed.
+        resolved = uri.resolve()
+        previous = self._diagnostics_resolved.get(uri, None)
+
+        if previous != resolved:
+            if previous is not None:
+                self._remove_from_diagnostics_index(previous, uri)
+
+            self._diagnostics_resolved[uri] = resolved
+            self._diagnostics_index.setdefault(resolved, set()).add(uri)
+
+        self._diagnostics_result_ids.pop(resolved, None)
+
+    def _remove_from_diagnostics_index(self, resolved: Uri, uri: Uri):
+        """Remove the given uri from the diagnostics index entry for ``resolved``."""
+        self._diagnostics_result_ids.pop(resolved, None)
+
+        if (uris := self._diagnostics_index.get(resolved, None)) is None:
+            return
+
+        uris.discard(uri)
+        if len(uris) == 0:
+            del self._diagnostics_index[resolved]
 
     def get_language_at(self, document: TextDocument, position: types.Position) -> str:
         """Return the language at the given location"""
@@ -290,10 +405,19 @@ class EsbonioLanguageServer(LanguageServer):
 
         return ""
 
-    def sync_diagnostics(self) -> None:
+    def sync_diagnostics(self, uris: Iterable[Uri] | None = None) -> None:
         """Update the client with the currently stored diagnostics.
 
         When the client supports the pull diagnostics model, this is a no-op.
+        Diagnostics are only published for uris where they have changed since they were
+        last published.
+
+        Parameters
+        ----------
+        uris
+           If given, only publish the diagnostics for these uris. Otherwise, the
+           diagnostics for every uri that has changed since the last sync are
+           published.
         """
         pull_support = get_capability(
             self.client_capabilities, "text_document.diagnostic", None
@@ -301,13 +425,25 @@ class EsbonioLanguageServer(LanguageServer):
         if pull_support is not None:
             return
 
-        uris = {uri for _, uri in self._diagnostics.keys()}
-        diagnostics = {uri: DiagnosticList() for uri in uris}
+        if uris is None:
+            uris, self._diagnostics_changed = self._diagnostics_changed, set()
+        else:
+            uris = set(uris)
+            self._diagnostics_changed -= uris
+
+        for uri in uris:
+            diag_list = self._get_diagnostics(uri)
 
-        for (_, uri), diags in self._diagnostics.items():
-            diagnostics[uri].extend(diags)
+            # Only publish the diagnostics if they have changed.
+            digest = hash_diagnostics(diag_list.data)
+            if self._published_diagnostics.get(uri, EMPTY_DIAGNOSTICS) == digest:
+                continue
+
+            if digest == EMPTY_DIAGNOSTICS:
+                self._published_diagnostics.pop(uri, None)
+            else:
+                self._published_diagnostics[uri] = digest
 
-        for uri, diag_list in diagnostics.items():
             self.logger.debug("Publishing %d diagnostics for: %s", len(diag_list), uri)
             self.text_document_publish_diagnostics(
                 types.PublishDiagnosticsParams(uri=str(uri), diagnostics=diag_list.data)
@@ -400,6 +536,18 @@ class EsbonioLanguageServer(LanguageServer):
             )
 
 
+def hash_diagnostics(diagnostics: list[types.Diagnostic]) -> int:
+    """Return a hash representing the given collection of diagnostics.
+
+    The order of the diagnostics does not affect the result.
+    """
+    # lsprotocol's types are not hashable, but their repr includes every field.
+    return hash(frozenset(repr(d) for d in diagnostics))
+
+
+EMPTY_DIAGNOSTICS = hash_diagnostics([])
+
+
 class DiagnosticList(collections.UserList):
     """A list type dedicated to holding diagnostics.
 
@@ -407,25 +555,41 @@ class DiagnosticList(collections.UserList):
     reported.
     """
 
+    def __init__(self, initlist=None):
+        super().__init__()
+
+        self._seen: set[tuple] = set()
+        """The keys of the diagnostics already in the list."""
+
+        self.extend(initlist or [])
+
     def append(self, item: types.Diagnostic):
         if not isinstance(item, types.Diagnostic):
             raise TypeError("Expected Diagnostic")
 
-        for existing in self.data:
-            fields = [
-                existing.range == item.range,
-                existing.message == item.message,
-                existing.severity == item.severity,
-                existing.code == item.code,
-                existing.source == item.source,
-            ]
+        start, end = item.range.start, item.range.end
+        key = (
+            start.line,
+            start.character,
+            end.line,
+            end.character,
+            item.message,
+            item.severity,
+            item.code,
+            item.source,
+        )
 
-            if all(fields):
-                # Item already added, nothing to do.
-                return
+        if key in self._seen:
+            # Item already added, nothing to do.
+            return
 
+        self._seen.add(key)
         self.data.append(item)
 
+    def extend(self, other):
+        for item in other:
+            self.append(item)
+
 
 def _get_setup_arguments(
     server: EsbonioLanguageServer, setup: Callable, modname: str
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import importlib
 import inspect
 import pathlib
@@ -7,16 +8,55 @@ import typing
 from collections.abc import Iterable
 from typing import Any
 
+import attrs
 from lsprotocol import types
 
+from esbonio.sphinx_agent.tracing import traced
+from esbonio.sphinx_agent.tracing import tracer
+
 from . import Uri
 
 if typing.TYPE_CHECKING:
+    from typing import Callable
+
     from .server import EsbonioLanguageServer
 
 
+@attrs.define
+class LazyModule:
+    """Declares a module that should only be loaded once the client makes use of one
+    of its features.
+
+    Since the module is not imported until it is needed, the features it provides
+    must be declared up front so that they can be advertised to the client.
+    """
+
+    name: str
+    """The name of the module to load."""
+
+    methods: list[str] = attrs.field(factory=list)
+    """The LSP methods, including any custom methods, handled by the module."""
+
+    commands: list[str] = attrs.field(factory=list)
+    """The commands provided by the module."""
+
+    trigger_characters: list[str] = attrs.field(factory=list)
+    """The characters that should trigger completion requests."""
+
+    languages: set[str] = attrs.field(factory=set)
+    """If set, only load the module when handling requests for these languages."""
+
+    @property
+    def custom_methods(self) -> list[str]:
+        """The methods that are not part of the LSP specification."""
+        return [m for m in self.methods if m not in types.METHOD_TO_TYPES]
+
+
 def create_language_server(
-    server_cls: type[EsbonioLanguageServer], modules: Iterable[str], *args, **kwargs
+    server_cls: type[EsbonioLanguageServer],
+    modules: Iterable[str | LazyModule],
+    *args,
+    **kwargs,
 ) -> EsbonioLanguageServer:
     """Create a new language server instance.
 
@@ -25,18 +65,23 @@ def create_language_server(
     server_cls:
        The class definition to create the server from.
     modules:
-       The list of modules that should be loaded.
+       The list of modules that should be loaded. Modules given as a
+       :class:`LazyModule` are only loaded once they are first used.
     args, kwargs:
        Any additional arguments that should be passed to the language server's
        constructor.
     """
-    server = server_cls(*args, **kwargs)
+    with tracer.span("create_language_server", "startup"):
+        server = server_cls(*args, **kwargs)
 
-    for module in modules:
-        _load_module(server, module)
+        for module in modules:
+            if isinstance(module, LazyModule):
+                _declare_module(server, module)
+            else:
+                _load_module(server, module)
 
-    _configure_lsp_methods(server)
-    _configure_completion(server)
+        _configure_lsp_methods(server)
+        _configure_completion(server)
 
     return server
 
@@ -45,11 +90,13 @@ def _configure_lsp_methods(server: EsbonioLanguageServer):
     """Configure method handlers for the portions of the LSP spec we support."""
 
     @server.feature(types.INITIALIZE)
+    @traced(types.INITIALIZE, "lsp")
     async def on_initialize(ls: EsbonioLanguageServer, params: types.InitializeParams):
         ls.initialize(params)
         await call_features(ls, "initialize", params)
 
     @server.feature(types.INITIALIZED)
+    @traced(types.INITIALIZED, "lsp")
     async def on_initialized(
         ls: EsbonioLanguageServer, params: types.InitializedParams
     ):
@@ -57,32 +104,41 @@ def _configure_lsp_methods(server: EsbonioLanguageServer):
         await call_features(ls, "initialized", params)
 
     @server.feature(types.SHUTDOWN)
+    @traced(types.SHUTDOWN, "lsp")
     async def on_shutdown(ls: EsbonioLanguageServer, params: None):
         ls.lsp_shutdown(params)
         await call_features(ls, "shutdown", params)
 
     @server.feature(types.TEXT_DOCUMENT_DID_CHANGE)
+    @traced(types.TEXT_DOCUMENT_DID_CHANGE, "lsp")
     async def on_document_change(
         ls: EsbonioLanguageServer, params: types.DidChangeTextDocumentParams
     ):
+        await load_lazy_modules(ls, types.TEXT_DOCUMENT_DID_CHANGE)
         await call_features(ls, "document_change", params)
 
     @server.feature(types.TEXT_DOCUMENT_DID_CLOSE)
+    @traced(types.TEXT_DOCUMENT_DID_CLOSE, "lsp")
     async def on_document_close(
         ls: EsbonioLanguageServer, params: types.DidCloseTextDocumentParams
     ):
+        await load_lazy_modules(ls, types.TEXT_DOCUMENT_DID_CLOSE)
         await call_features(ls, "document_close", params)
 
     @server.feature(types.TEXT_DOCUMENT_DID_OPEN)
+    @traced(types.TEXT_DOCUMENT_DID_OPEN, "lsp")
     async def on_document_open(
         ls: EsbonioLanguageServer, params: types.DidOpenTextDocumentParams
     ):
+        await load_lazy_modules(ls, types.TEXT_DOCUMENT_DID_OPEN)
         await call_features(ls, "document_open", params)
 
     @server.feature(types.TEXT_DOCUMENT_DID_SAVE)
+    @traced(types.TEXT_DOCUMENT_DID_SAVE, "lsp")
     async def on_document_save(
         ls: EsbonioLanguageServer, params: types.DidSaveTextDocumentParams
     ):
+        await load_lazy_modules(ls, types.TEXT_DOCUMENT_DID_SAVE)
         # Record the version number of the document
         doc = ls.workspace.get_text_document(params.text_document.uri)
         doc.saved_version = doc.version or 0  # type: ignore[attr-defined]
@@ -97,40 +153,62 @@ def _configure_lsp_methods(server: EsbonioLanguageServer):
             workspace_diagnostics=True,
         ),
     )
+    @traced(types.TEXT_DOCUMENT_DIAGNOSTIC, "lsp")
     async def on_document_diagnostic(
         ls: EsbonioLanguageServer, params: types.DocumentDiagnosticParams
     ):
         """Handle a ``textDocument/diagnostic`` request."""
         doc_uri = Uri.parse(params.text_document.uri).resolve()
-        items = []
+        result_id = ls.get_diagnostics_result_id(doc_uri)
 
-        for (_, uri), diags in ls._diagnostics.items():
-            if uri.resolve() == doc_uri:
-                items.extend(diags)
+        if params.previous_result_id == result_id:
+            return types.RelatedUnchangedDocumentDiagnosticReport(
+                result_id=result_id,
+                kind=types.DocumentDiagnosticReportKind.Unchanged,
+            )
 
-        # TODO: Detect no changes and send 'unchanged' responses
         return types.RelatedFullDocumentDiagnosticReport(
-            items=items,
+            items=ls.get_diagnostics(doc_uri),
+            result_id=result_id,
             kind=types.DocumentDiagnosticReportKind.Full,
         )
 
     @server.feature(types.WORKSPACE_DIAGNOSTIC)
+    @traced(types.WORKSPACE_DIAGNOSTIC, "lsp")
     async def on_workspace_diagnostic(
         ls: EsbonioLanguageServer, params: types.WorkspaceDiagnosticParams
     ):
         """Handle a ``workspace/diagnostic`` request."""
-        diagnostics: dict[Uri, list[types.Diagnostic]] = {}
+        previous = {
+            Uri.parse(p.uri).resolve(): p.value for p in params.previous_result_ids
+        }
+        reports: list[types.WorkspaceDocumentDiagnosticReport] = []
+
+        for uri in ls._diagnostics_index.keys():
+            result_id = ls.get_diagnostics_result_id(uri)
+            previous_id = previous.get(uri)
+
+            if previous_id == result_id:
+                reports.append(
+                    types.WorkspaceUnchangedDocumentDiagnosticReport(
+                        uri=str(uri),
+                        result_id=result_id,
+                        kind=types.DocumentDiagnosticReportKind.Unchanged,
+                    )
+                )
+                continue
 
-        for (_, uri), diags in ls._diagnostics.items():
-            diagnostics.setdefault(uri, []).extend(diags)
+            items = ls.get_diagnostics(uri)
+
+            # No need to tell the client about files it's never seen an issue with.
+            if len(items) == 0 and previous_id is None:
+                continue
 
-        # TODO: Detect no changes and send 'unchanged' responses
-        reports = []
-        for uri, items in diagnostics.items():
             reports.append(
                 types.WorkspaceFullDocumentDiagnosticReport(
                     uri=str(uri),
                     items=items,
+                    result_id=result_id,
                     kind=types.DocumentDiagnosticReportKind.Full,
                 )
             )
@@ -138,16 +216,20 @@ def _configure_lsp_methods(server: EsbonioLanguageServer):
         return types.WorkspaceDiagnosticReport(items=reports)
 
     @server.feature(types.TEXT_DOCUMENT_DOCUMENT_SYMBOL)
+    @traced(types.TEXT_DOCUMENT_DOCUMENT_SYMBOL, "lsp")
     async def on_document_symbol(
         ls: EsbonioLanguageServer, params: types.DocumentSymbolParams
     ):
+        await load_lazy_modules(ls, types.TEXT_DOCUMENT_DOCUMENT_SYMBOL)
         result = await return_first_result(ls, "document_symbol", params)
         return result
 
     @server.feature(types.WORKSPACE_SYMBOL)
+    @traced(types.WORKSPACE_SYMBOL, "lsp")
     async def on_workspace_symbol(
         ls: EsbonioLanguageServer, params: types.WorkspaceSymbolParams
     ):
+        await load_lazy_modules(ls, types.WORKSPACE_SYMBOL)
         result = await return_first_result(ls, "workspace_symbol", params)
         if len(result) == 0:
             return None
@@ -155,6 +237,7 @@ def _configure_lsp_methods(server: EsbonioLanguageServer):
         return result
 
     @server.feature(types.WORKSPACE_DID_CHANGE_CONFIGURATION)
+    @traced(types.WORKSPACE_DID_CHANGE_CONFIGURATION, "lsp")
     async def on_did_change_configuration(
         ls: EsbonioLanguageServer, params: types.DidChangeConfigurationParams
     ):
@@ -162,10 +245,16 @@ def _configure_lsp_methods(server: EsbonioLanguageServer):
         await ls.configuration.update_workspace_configuration()
 
     @server.feature(types.WORKSPACE_DID_CHANGE_WATCHED_FILES)
+    @traced(types.WORKSPACE_DID_CHANGE_WATCHED_FILES, "lsp")
     async def on_did_change_watched_files(
         ls: EsbonioLanguageServer, params: types.DidChangeWatchedFilesParams
     ):
         ls.logger.debug("%s: %s", types.WORKSPACE_DID_CHANGE_WATCHED_FILES, params)
+
+        # Files being created or deleted may change how uris resolve.
+        if any(event.type != types.FileChangeType.Changed for event in params.changes):
+            Uri.clear_cache()
+
         # TODO: Handle deleted files.
         paths = [pathlib.Path(Uri.parse(event.uri)) for event in params.changes]
         await ls.configuration.update_file_configuration(paths)
@@ -182,6 +271,9 @@ def _configure_completion(server: EsbonioLanguageServer):
 
         trigger_characters.update(feature.completion_trigger.characters)
 
+    for module in server._lazy_modules.values():
+        trigger_characters.update(module.trigger_characters)
+
     @server.feature(
         types.TEXT_DOCUMENT_COMPLETION,
         types.CompletionOptions(
@@ -189,36 +281,40 @@ def _configure_completion(server: EsbonioLanguageServer):
             resolve_provider=True,
         ),
     )
+    @traced(types.TEXT_DOCUMENT_COMPLETION, "lsp")
     async def on_completion(ls: EsbonioLanguageServer, params: types.CompletionParams):
         uri = params.text_document.uri
         pos = params.position
         doc = ls.workspace.get_text_document(uri)
         language = ls.get_language_at(doc, pos)
 
+        await load_lazy_modules(ls, types.TEXT_DOCUMENT_COMPLETION, language)
         items = []
 
         for cls, feature in ls:
             if not feature.completion_trigger:
                 continue
 
-            context = feature.completion_trigger(
-                uri=Uri.parse(uri),
-                params=params,
-                document=doc,
-                language=language,
-                client_capabilities=ls.client_capabilities,
-            )
+            name = f"{cls.__name__}"
+            with tracer.span(f"{name}.completion_trigger", "feature"):
+                context = feature.completion_trigger(
+                    uri=Uri.parse(uri),
+                    params=params,
+                    document=doc,
+                    language=language,
+                    client_capabilities=ls.client_capabilities,
+                )
 
             if context is None:
                 continue
 
             ls.logger.debug("%s", context)
-            name = f"{cls.__name__}"
 
             try:
-                result = feature.completion(context)
-                if inspect.isawaitable(result):
-                    result = await result
+                with tracer.span(f"{name}.completion", "feature"):
+                    result = feature.completion(context)
+                    if inspect.isawaitable(result):
+                        result = await result
             except Exception:
                 ls.logger.exception("Error in '%s.complete' handler", name)
                 continue
@@ -231,6 +327,7 @@ def _configure_completion(server: EsbonioLanguageServer):
             return types.CompletionList(is_incomplete=False, items=items)
 
     @server.feature(types.COMPLETION_ITEM_RESOLVE)
+    @traced(types.COMPLETION_ITEM_RESOLVE, "lsp")
     def on_completion_resolve(
         ls: EsbonioLanguageServer, item: types.CompletionItem
     ) -> types.CompletionItem:
@@ -254,9 +351,10 @@ async def call_features(ls: EsbonioLanguageServer, method: str, *args, **kwargs)
         try:
             impl = getattr(feature, method)
 
-            result = impl(*args, **kwargs)
-            if inspect.isawaitable(result):
-                await result
+            with tracer.span(f"{cls.__name__}.{method}", "feature"):
+                result = impl(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    await result
 
         except Exception:
             name = f"{cls.__name__}"
@@ -270,11 +368,12 @@ async def gather_results(ls: EsbonioLanguageServer, method: str, *args, **kwargs
         try:
             impl = getattr(feature, method)
 
-            result = impl(*args, **kwargs)
-            if inspect.isawaitable(result):
-                items = await result
-            else:
-                items = result
+            with tracer.span(f"{cls.__name__}.{method}", "feature"):
+                result = impl(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    items = await result
+                else:
+                    items = result
 
             if isinstance(items, list):
                 results.extend(items)
@@ -295,9 +394,10 @@ async def return_first_result(ls: EsbonioLanguageServer, method: str, *args, **k
         try:
             impl = getattr(feature, method)
 
-            result = impl(*args, **kwargs)
-            if inspect.isawaitable(result):
-                result = await result
+            with tracer.span(f"{cls.__name__}.{method}", "feature"):
+                result = impl(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
 
             if result is not None:
                 return result
@@ -307,14 +407,173 @@ async def return_first_result(ls: EsbonioLanguageServer, method: str, *args, **k
             ls.logger.error("Error in '%s.%s' handler", name, method, exc_info=True)
 
 
+async def load_lazy_modules(
+    ls: EsbonioLanguageServer, method: str, language: str | None = None
+):
+    """Load any lazy modules that handle the given method.
+
+    Parameters
+    ----------
+    ls
+       The language server
+
+    method
+       The LSP method about to be handled
+
+    language
+       If given, the language of the document the request concerns
+    """
+    for module in list(ls._lazy_modules.values()):
+        if method not in module.methods:
+            continue
+
+        if (
+            language is not None
+            and module.languages
+            and language not in module.languages
+        ):
+            continue
+
+        await load_lazy_module(ls, module.name)
+
+
+async def load_lazy_module(ls: EsbonioLanguageServer, name: str) -> bool:
+    """Load the lazy module with the given name, if it has not been loaded already.
+
+    Returns
+    -------
+    bool
+       ``True`` if the module is loaded, ``False`` if it could not be loaded.
+    """
+    if (task := ls._lazy_tasks.get(name)) is None:
+        if (module := ls._lazy_modules.get(name)) is None:
+            return name in ls._loaded_extensions
+
+        task = asyncio.create_task(_load_lazy_module(ls, module))
+        ls._lazy_tasks[name] = task
+
+    return await task
+
+
+async def _load_lazy_module(ls: EsbonioLanguageServer, module: LazyModule) -> bool:
+    """Load the given module, catching its features up with the rest of the server."""
+    ls.logger.debug("Loading module '%s' on first use", module.name)
+
+    # Remove the placeholders, so that the module can register the real handlers.
+    fm = ls.protocol.fm
+    commands = {c: fm.commands.pop(c) for c in module.commands if c in fm.commands}
+    features = {
+        m: fm.features.pop(m) for m in module.custom_methods if m in fm.features
+    }
+
+    existing = {cls for cls, _ in ls}
+    try:
+        _load_module(ls, module.name)
+    except Exception:
+        ls.logger.error("Unable to load module '%s'", module.name, exc_info=True)
+
+    if module.name not in ls._loaded_extensions:
+        # Put the placeholders back, so that loading the module is attempted again the
+        # next time it is needed.
+        fm.commands.update(commands)
+        fm.features.update(features)
+        ls._lazy_tasks.pop(module.name, None)
+        return False
+
+    lifecycle: list[tuple[str, Any]] = []
+    if ls._initialize_params is not None:
+        lifecycle.append(("initialize", ls._initialize_params))
+
+    if ls.ready.done():
+        lifecycle.append(("initialized", types.InitializedParams()))
+
+    for cls, feature in list(ls):
+        if cls in existing:
+            continue
+
+        for method, params in lifecycle:
+            try:
+                result = getattr(feature, method)(params)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                name = f"{cls.__name__}"
+                ls.logger.error("Error in '%s.%s' handler", name, method, exc_info=True)
+
+    # Ensure any new subscriptions have seen the current configuration before the
+    # module is asked to handle anything.
+    if ls.ready.done():
+        tasks = ls.configuration._notify_subscriptions()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    ls._lazy_modules.pop(module.name, None)
+    ls._lazy_tasks.pop(module.name, None)
+    return True
+
+
+def _declare_module(server: EsbonioLanguageServer, module: LazyModule):
+    """Declare a module that will be loaded once one of its features is used.
+
+    Placeholder handlers are registered for the module's commands and custom methods,
+    which load the module before forwarding the request to the real handler.
+    Standard LSP methods are handled by the handlers in ``_configure_lsp_methods``.
+    """
+    server._lazy_modules[module.name] = module
+
+    for command in module.commands:
+        _add_placeholder(
+            server, module, command, server.command, server.protocol.fm.commands
+        )
+
+    for method in module.custom_methods:
+        _add_placeholder(
+            server, module, method, server.feature, server.protocol.fm.features
+        )
+
+
+def _add_placeholder(
+    server: EsbonioLanguageServer,
+    module: LazyModule,
+    name: str,
+    register: Callable[[str], Callable],
+    handlers: dict[str, Callable],
+):
+    """Register a placeholder handler for the given command or method."""
+
+    @register(name)
+    async def placeholder(ls: EsbonioLanguageServer, *args):
+        if not await load_lazy_module(ls, module.name):
+            ls.logger.error(
+                "Unable to handle '%s', module '%s' could not be loaded",
+                name,
+                module.name,
+            )
+            return None
+
+        if (handler := handlers.get(name)) is None:
+            ls.logger.error(
+                "Unable to handle '%s', module '%s' did not provide it",
+                name,
+                module.name,
+            )
+            return None
+
+        result = handler(*args)
+        if inspect.isawaitable(result):
+            result = await result
+
+        return result
+
+
 def _load_module(server: EsbonioLanguageServer, modname: str):
     """Load an extension module by calling its ``esbonio_setup`` function, if it exists."""
 
-    try:
-        module = importlib.import_module(modname)
-    except ImportError:
-        server.logger.error("Unable to import module '%s'", modname, exc_info=True)
-        return None
+    with tracer.span(f"import: {modname}", "startup", module=modname):
+        try:
+            module = importlib.import_module(modname)
+        except ImportError:
+            server.logger.error("Unable to import module '%s'", modname, exc_info=True)
+            return None
 
     setup = getattr(module, "esbonio_setup", None)
     if setup is None:
@@ -323,4 +582,5 @@ def _load_module(server: EsbonioLanguageServer, modname: str):
         )
         return None
 
-    server.load_extension(modname, setup)
+    with tracer.span(f"setup: {modname}", "startup", module=modname):
+        server.load_extension(modname, setup)
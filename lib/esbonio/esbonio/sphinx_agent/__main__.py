@@ -1,5 +1,3 @@
-import asyncio
-
 from .server import main
 
-asyncio.run(main())
+main()
@@ -14,14 +14,17 @@ from sphinx.util.logging import NAMESPACE as SPHINX_LOG_NAMESPACE
 from . import types
 from .database import Database
 from .log import DiagnosticFilter
+from .stats import timings
 
 if typing.TYPE_CHECKING:
     from typing import IO
     from typing import Any
+    from typing import Callable
     from typing import Literal
 
     from docutils.nodes import Element
     from docutils.parsers.rst import Directive
+    from docutils.transforms import Transform
 
     RoleDefinition = tuple[str, Any, list[types.Role.TargetProvider]]
 
@@ -146,6 +149,10 @@ class Sphinx(_Sphinx):
         # the user with warning messages, so we will suppress these messages if the
         # retry counter has been set.
         self._esbonio_retry_count = 0
+
+        # The extensions currently being setup, used to attribute the time spent in
+        # event listeners and transforms to the extension that registered them.
+        self._esbonio_extensions: list[str] = []
         try_run_init(self, super().__init__, *args, **kwargs)
 
     def add_role(self, name: str, role: Any, override: bool = False):
@@ -158,6 +165,25 @@ class Sphinx(_Sphinx):
     def add_node(self, node: type[Element], override: bool = False, **kwargs):
         super().add_node(node, override or self._esbonio_retry_count > 0, **kwargs)
 
+    def connect(self, event: str, callback: Callable, priority: int = 500) -> int:
+        """Override Sphinx's implementation of ``connect`` so that we can record the
+        time spent in each event listener."""
+        listener = timings.time_listener(event, callback, self._current_extension)
+        return super().connect(event, listener, priority)
+
+    def add_transform(self, transform: type[Transform]) -> None:
+        timings.time_transform(transform, self._current_extension)
+        super().add_transform(transform)
+
+    def add_post_transform(self, transform: type[Transform]) -> None:
+        timings.time_transform(transform, self._current_extension)
+        super().add_post_transform(transform)
+
+    @property
+    def _current_extension(self) -> str | None:
+        """The name of the extension currently being setup, if any."""
+        return self._esbonio_extensions[-1] if self._esbonio_extensions else None
+
     def setup_extension(self, extname: str):
         """Override Sphinx's implementation of `setup_extension`
 
@@ -165,11 +191,14 @@ class Sphinx(_Sphinx):
         - Will suppress errors caused by missing extensions
         - Attempt to report errors where possible, as diagnostics
         """
+        self._esbonio_extensions.append(extname)
         try:
             super().setup_extension(extname)
         except Exception as exc:
             # Attempt to produce useful diagnostics.
             self._report_missing_extension(extname, exc)
+        finally:
+            self._esbonio_extensions.pop()
 
     def _report_missing_extension(self, extname: str, exc: Exception):
         """Check to see if the given exception corresponds to a missing extension.
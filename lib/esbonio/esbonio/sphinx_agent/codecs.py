@@ -0,0 +1,200 @@
+"""Codecs used to encode messages sent between the language server and the agent.
+
+Messages are always JSON-RPC messages, but if both sides have the necessary packages
+available, they can be encoded using a more efficient format. Which codec to use is
+negotiated as part of the ``sphinx/createApp`` request, until then all messages are
+encoded as JSON.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import typing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack  # type: ignore[import-not-found,import-untyped,unused-ignore]
+except ImportError:
+    msgpack = None
+
+if typing.TYPE_CHECKING:
+    from typing import Any
+    from typing import Callable
+    from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SEPARATORS = (",", ":")
+"""Used by the standard library, so that its output matches ``orjson``."""
+
+CONTENT_LENGTH_PATTERN = re.compile(rb"^Content-Length: (\d+)$", re.IGNORECASE)
+
+
+class JsonCodec:
+    """Encodes messages as JSON, using ``orjson`` if it is available."""
+
+    name = "json"
+    """The name of the codec."""
+
+    content_type = "application/vscode-jsonrpc; charset=utf-8"
+    """The content type of encoded messages."""
+
+    def dumps(self, obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        """Encode the given object.
+
+        Parameters
+        ----------
+        obj
+           The object to encode
+
+        default
+           Called to convert any objects the codec does not natively support.
+        """
+        if orjson is not None:
+            try:
+                return orjson.dumps(
+                    obj, default=default, option=orjson.OPT_NON_STR_KEYS
+                )
+            except TypeError:
+                # Fallback to the standard library, which supports a wider range of
+                # values e.g. integers larger than 64 bits.
+                pass
+
+        return json.dumps(
+            obj, default=default, separators=SEPARATORS, ensure_ascii=False
+        ).encode("utf8")
+
+    def loads(
+        self, data: bytes, object_hook: Optional[Callable[[dict], Any]] = None
+    ) -> Any:
+        """Decode the given data.
+
+        Parameters
+        ----------
+        data
+           The data to decode
+
+        object_hook
+           If given, called with every decoded object, from the inside out.
+        """
+        # Applying an object hook after the fact is slower than letting the standard
+        # library call it while decoding.
+        if orjson is None or object_hook is not None:
+            return json.loads(data, object_hook=object_hook)
+
+        return orjson.loads(data)
+
+
+class MsgpackCodec(JsonCodec):
+    """Encodes messages using MessagePack."""
+
+    name = "msgpack"
+
+    content_type = "application/msgpack"
+
+    def dumps(self, obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        return msgpack.packb(obj, default=default, use_bin_type=True)
+
+    def loads(
+        self, data: bytes, object_hook: Optional[Callable[[dict], Any]] = None
+    ) -> Any:
+        return msgpack.unpackb(
+            data, object_hook=object_hook, raw=False, strict_map_key=False
+        )
+
+
+class MessageBuffer:
+    """Splits a stream of data into messages.
+
+    Data can be fed into the buffer in chunks of any size, the body of each message is
+    extracted using its ``Content-Length`` header once it has been received in full.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        """Holds data that has been received, but not yet returned."""
+
+        self._frame: tuple[int, int] | None = None
+        """The start and end of the body of the message currently being read."""
+
+    def feed(self, data: bytes):
+        """Add the given data to the buffer."""
+        self._buffer += data
+
+    def next_body(self) -> bytes | None:
+        """Return the body of the next message, if it has been received in full."""
+
+        while self._frame is None:
+            idx = self._buffer.find(b"\r\n\r\n")
+            if idx < 0:
+                return None
+
+            headers = bytes(self._buffer[:idx])
+            if (content_length := self._get_content_length(headers)) is None:
+                # Skip anything we don't understand
+                logger.debug("Skipping invalid headers: %r", headers)
+                del self._buffer[: idx + 4]
+                continue
+
+            self._frame = (idx + 4, idx + 4 + content_length)
+
+        start, end = self._frame
+        if len(self._buffer) < end:
+            return None
+
+        body = bytes(self._buffer[start:end])
+        del self._buffer[:end]
+        self._frame = None
+
+        return body
+
+    def _get_content_length(self, headers: bytes) -> int | None:
+        """Extract the content length from the given headers, if possible."""
+        for header in headers.split(b"\r\n"):
+            if (match := CONTENT_LENGTH_PATTERN.fullmatch(header)) is not None:
+                return int(match.group(1))
+
+        return None
+
+
+JSON = JsonCodec()
+"""The default codec."""
+
+CODECS: dict[str, JsonCodec] = {JSON.name: JSON}
+"""All the codecs available in this environment, in order of preference."""
+
+if msgpack is not None:
+    CODECS = {MsgpackCodec.name: MsgpackCodec(), **CODECS}
+
+
+def available_codecs() -> list[str]:
+    """Return the names of all the codecs available in this environment, in order of
+    preference."""
+    return list(CODECS.keys())
+
+
+def negotiate(offered: list[str]) -> JsonCodec:
+    """Choose the codec to use from the given list of options.
+
+    Parameters
+    ----------
+    offered
+       The codecs supported by the other side, in order of preference
+
+    Returns
+    -------
+    JsonCodec
+       The first codec in ``offered`` that is also available in this environment.
+       Falls back to JSON if there is no such codec.
+    """
+    for name in offered:
+        if (codec := CODECS.get(name)) is not None:
+            return codec
+
+    return JSON
@@ -47,6 +47,9 @@ class Database:
 
         self._checked_tables: set[str] = set()
 
+        self.rows_written: dict[str, int] = {}
+        """The number of rows inserted into each table, since this was last cleared."""
+
     def _get_table(self, name: str) -> Table | None:
         """Get the table with the given name, if it exists."""
         # TODO: SQLite does not seem to like '?' syntax in this statement...
@@ -84,15 +87,7 @@ class Database:
 
         # TODO: Is there a way to pass the table name as a '?' parameter?
         base_query = f"DELETE FROM {table.name}"  # noqa: S608
-        where: list[str] = []
-        parameters: list[Any] = []
-
-        for param, value in kwargs.items():
-            if value is None:
-                where.append(f"{param} is null")
-            else:
-                where.append(f"{param} = ?")
-                parameters.append(value)
+        where, parameters = self._get_conditions(kwargs)
 
         if where:
             conditions = " AND ".join(where)
@@ -104,6 +99,48 @@ class Database:
         cursor.execute(query, tuple(parameters))
         self.db.commit()
 
+    def delete_values(self, table: Table, column: str, values: list[Any], **kwargs):
+        """Delete all rows from the given table where ``column`` matches any of the given
+        values.
+
+        Parameters
+        ----------
+        column
+           The name of the column to match against
+
+        values
+           The values to match
+
+        kwargs
+           Additional constraints to limit the rows that get deleted
+        """
+        if len(values) == 0:
+            return
+
+        where, parameters = self._get_conditions(kwargs)
+        conditions = " AND ".join([f"{column} = ?", *where])
+
+        # TODO: Is there a way to pass the table name as a '?' parameter?
+        query = f"DELETE FROM {table.name} WHERE {conditions}"  # noqa: S608
+
+        cursor = self.db.cursor()
+        cursor.executemany(query, [(value, *parameters) for value in values])
+        self.db.commit()
+
+    def _get_conditions(self, constraints: dict[str, Any]) -> tuple[list[str], list]:
+        """Convert the given constraints into SQL conditions and their parameters."""
+        where: list[str] = []
+        parameters: list[Any] = []
+
+        for param, value in constraints.items():
+            if value is None:
+                where.append(f"{param} is null")
+            else:
+                where.append(f"{param} = ?")
+                parameters.append(value)
+
+        return where, parameters
+
     def ensure_table(self, table: Table):
         """Ensure that the given table exists in the database.
 
@@ -140,3 +177,7 @@ class Database:
         placeholder = "(" + ",".join(["?" for _ in range(len(values[0]))]) + ")"
         cursor.executemany(f"INSERT INTO {table.name} VALUES {placeholder}", values)  # noqa: S608
         self.db.commit()
+
+        self.rows_written[table.name] = self.rows_written.get(table.name, 0) + len(
+            values
+        )
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import inspect
 import logging
+import os
 import sys
+import time
 import traceback
 import typing
 from typing import Callable
@@ -12,15 +14,26 @@ import sphinx.application
 from sphinx import __version__ as __sphinx_version__
 from sphinx.util.logging import NAMESPACE as SPHINX_LOG_NAMESPACE
 
+from .. import codecs
 from .. import types
 from ..app import Sphinx
 from ..config import SphinxConfig
+from ..log import clear_docstring_cache
+from ..patches import progress
+from ..stats import recorder
+from ..stats import timings
 from ..types import Uri
+from ..util import apply_changes
+from ..util import get_decoder
 from ..util import send_error
 from ..util import send_message
+from ..util import set_codec
 
 sphinx_logger = logging.getLogger(SPHINX_LOG_NAMESPACE)
 
+DIAGNOSTICS_INTERVAL = 0.5
+"""The minimum time (in seconds) between reports of diagnostics during a build."""
+
 # Inject our own 'core' extensions into Sphinx
 sphinx.application.builtin_extensions += (
     f"{__name__}.webview",
@@ -43,6 +56,27 @@ class SphinxHandler:
         self._content_overrides: dict[Uri, str] = {}
         """Holds any additional content to inject into a build."""
 
+        self._content_versions: dict[Uri, int] = {}
+        """The version of each of the content overrides."""
+
+        self._changed_content: set[Uri] = set()
+        """Files whose content has changed since the last successful build."""
+
+        self._priority: list[Uri] = []
+        """Files that should be read before any others during a build."""
+
+        self._unread_priority: set[str] = set()
+        """Prioritised docnames that have not yet been read."""
+
+        self._unreported: list[str] = []
+        """Docnames that have been read, but not yet reported to the client."""
+
+        self._last_report = 0.0
+        """When diagnostics were last reported to the client."""
+
+        self._pid = os.getpid()
+        """The id of the main agent process."""
+
         self._handlers: dict[str, tuple[type, Callable]] = self._register_handlers()
 
     def get(self, method: str) -> Optional[tuple[type, Callable]]:
@@ -75,6 +109,9 @@ class SphinxHandler:
         - the type annotation for that parameter must correspond with a ``XXXRequest``
           class definition from the ``types`` module.
 
+        The decoder for each request type is also prepared here, so that it is ready
+        by the time the first message arrives.
+
         Returns
         -------
         Dict[str, Tuple[Type, Callable]]
@@ -100,6 +137,7 @@ class SphinxHandler:
             ):
                 continue
 
+            get_decoder(request_type)
             handlers[request_type.method] = (request_type, method_func)
 
         return handlers
@@ -116,11 +154,17 @@ class SphinxHandler:
         sphinx_args = sphinx_config.to_application_args(params.context)
         self.app = Sphinx(**sphinx_args)
 
+        codec = codecs.negotiate(params.codecs)
+        progress.interval = params.progress_interval
+
         # Connect event handlers.
         # TODO: Sphinx 7.x has introduced a `include-read` event
         # See: https://github.com/sphinx-doc/sphinx/pull/11657
         self.app.connect("env-before-read-docs", self._cb_env_before_read_docs)
         self.app.connect("source-read", self._cb_source_read, priority=0)
+        self.app.connect("doctree-read", self._cb_doctree_read)
+        self.app.connect("env-updated", self._cb_env_updated)
+        recorder.setup(self.app)
 
         response = types.CreateApplicationResponse(
             id=request.id,
@@ -131,20 +175,95 @@ class SphinxHandler:
                 builder_name=self.app.builder.name,
                 src_dir=str(self.app.srcdir),
                 dbpath=str(self.app.esbonio.db.path),
+                num_jobs=self.app.parallel,
+                codec=codec.name,
             ),
             jsonrpc=request.jsonrpc,
         )
+
+        # The client will switch codecs as soon as it receives the response, so we
+        # have to be ready to decode messages before sending it. However, the response
+        # itself must be sent using the original codec.
+        set_codec(codec, send=False)
         send_message(response)
+        set_codec(codec, receive=False)
 
     def _cb_env_before_read_docs(self, app: Sphinx, env, docnames: list[str]):
-        """Used to add additional documents to the "to build" list."""
+        """Used to add additional documents to the "to build" list and move any
+        prioritised documents to the front of the queue."""
 
         is_building = set(docnames)
 
-        for docname in env.found_docs - is_building:
-            uri = Uri.for_file(env.doc2path(docname, base=True))
-            if uri in self._content_overrides:
+        # Sphinx is not aware of content that only exists in memory, so we have to
+        # ensure anything that changed (or was reverted) is read again.
+        for uri in self._changed_content:
+            docname = env.path2doc(uri)
+            if docname in env.found_docs and docname not in is_building:
                 docnames.append(docname)
+                is_building.add(docname)
+
+        prioritised: list[str] = []
+        for uri in self._priority:
+            docname = env.path2doc(uri)
+            if docname in is_building and docname not in prioritised:
+                prioritised.append(docname)
+
+        if len(prioritised) == 0:
+            return
+
+        first = set(prioritised)
+        remaining = [d for d in docnames if d not in first]
+        docnames[:] = prioritised + remaining
+
+        self._unread_priority = first
+
+    def _cb_doctree_read(self, app: Sphinx, doctree):
+        """Report the diagnostics of files as they are read.
+
+        Reports are batched and sent at most once every ``DIAGNOSTICS_INTERVAL``
+        seconds, except for prioritised files which are reported as soon as they have
+        all been read.
+        """
+
+        # Documents read by parallel worker processes are not able to notify the client
+        if os.getpid() != self._pid:
+            return
+
+        docname = app.env.docname
+        self._unreported.append(docname)
+
+        if docname in self._unread_priority:
+            self._unread_priority.discard(docname)
+            if len(self._unread_priority) == 0:
+                self._report_diagnostics(app)
+                return
+
+        if time.monotonic() - self._last_report >= DIAGNOSTICS_INTERVAL:
+            self._report_diagnostics(app)
+
+    def _cb_env_updated(self, app: Sphinx, env):
+        """Report the diagnostics of any remaining files at the end of the read
+        phase."""
+        if len(self._unreported) > 0:
+            self._report_diagnostics(app)
+
+    def _report_diagnostics(self, app: Sphinx):
+        """Send the diagnostics of all unreported files to the client."""
+        app.esbonio.log.process_pending()
+
+        diagnostics: dict[str, list[types.Diagnostic]] = {}
+        for docname in self._unreported:
+            uri = Uri.for_file(app.env.doc2path(docname, base=True))
+            diagnostics[str(uri)] = list(app.esbonio.diagnostics.get(uri, set()))
+
+        self._unreported = []
+        self._last_report = time.monotonic()
+
+        send_message(
+            types.PartialBuildResult(
+                params=types.PartialBuildResultParams(diagnostics=diagnostics)
+            )
+        )
 
     def _cb_source_read(self, app: Sphinx, docname: str, source):
         """Called whenever sphinx reads a file from disk."""
@@ -160,17 +279,26 @@ class SphinxHandler:
             send_error(id=request.id, code=-32803, message="Sphinx app not initialized")
             return
 
-        self._content_overrides = {
-            Uri.parse(p): content
-            for p, content in request.params.content_overrides.items()
-        }
+        # The filesystem may have changed since the last build.
+        Uri.clear_cache()
+        clear_docstring_cache()
+
+        self._priority = [Uri.parse(p) for p in request.params.priority]
+        self._unread_priority = set()
+        self._unreported = []
+        self._last_report = time.monotonic()
+        timings.reset()
 
         try:
+            self._update_content(request.params)
+
+            recorder.start(self.app)
             self.app.build()
+            self._changed_content = set()
 
             response = types.BuildResponse(
                 id=request.id,
-                result=types.BuildResult(),
+                result=types.BuildResult(summary=recorder.finish(self.app)),
                 jsonrpc=request.jsonrpc,
             )
             send_message(response)
@@ -184,6 +312,52 @@ class SphinxHandler:
         finally:
             self.app._warncount = 0
 
+    def _update_content(self, params: types.BuildParams):
+        """Update the content overrides to use during the build.
+
+        Documents that have not changed since the previous build are left as they are,
+        avoiding the need to (re)send the full content of each document every time.
+        """
+        overrides: dict[Uri, str] = {}
+        versions: dict[Uri, int] = {}
+
+        for path, content in params.content_overrides.items():
+            overrides[Uri.parse(path)] = content
+
+        for path, delta in params.content_deltas.items():
+            uri = Uri.parse(path)
+            content = self._content_overrides.get(uri, "")
+            full_update = len(delta.changes) > 0 and delta.changes[0].range is None
+
+            if (
+                not full_update
+                and self._content_versions.get(uri) != delta.base_version
+            ):
+                raise ValueError(
+                    f"Unable to update '{uri}', expected version {delta.base_version} "
+                    f"found version {self._content_versions.get(uri)}"
+                )
+
+            overrides[uri] = apply_changes(content, delta.changes)
+            versions[uri] = delta.version
+
+        previous = self._content_overrides
+        for uri in previous.keys() | overrides.keys():
+            if previous.get(uri) != overrides.get(uri):
+                self._changed_content.add(uri)
+
+        self._content_overrides = overrides
+        self._content_versions = versions
+
+    def get_build_stats(self, request: types.GetBuildStatsRequest):
+        """Return statistics about the most recent build."""
+        response = types.GetBuildStatsResponse(
+            id=request.id,
+            result=timings.to_stats(),
+            jsonrpc=request.jsonrpc,
+        )
+        send_message(response)
+
     def notify_exit(self, request: types.ExitNotification):
         """Sent from the client to signal that the agent should exit."""
         sys.exit(0)
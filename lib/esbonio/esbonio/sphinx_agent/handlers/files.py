@@ -20,6 +20,7 @@ FILES_TABLE = Database.Table(
         Database.Column(name="uri", dtype="TEXT"),
         Database.Column(name="docname", dtype="TEXT"),
         Database.Column(name="urlpath", dtype="TEXT"),
+        Database.Column(name="parent", dtype="TEXT"),
     ],
 )
 
@@ -86,34 +87,87 @@ def dump_config(app: Sphinx, *args):
     app.esbonio.db.insert_values(CONFIG_TABLE, values)
 
 
-def build_file_mapping(app: Sphinx, exc: Exception | None):
-    """Given a Sphinx application, return a mapping of all known source files to their
-    corresponding output files."""
+class FileMapping:
+    """Maintains the mapping of source files to their corresponding output files."""
+
+    def __init__(self):
+        self.outdated: set[str] = set()
+        """Docnames whose entries need updating."""
+
+        self.initialized = False
+        """Indicates if the full mapping has been built."""
+
+    def purge_doc(self, app: Sphinx, env, docname: str):
+        """Called when a document is removed, or about to be re-read."""
+        self.outdated.add(docname)
+
+    def update(self, app: Sphinx, exc: Exception | None):
+        """Update the mapping once a build has finished."""
 
+        if not self.initialized:
+            build_file_mapping(app, exc)
+            self.initialized = True
+        else:
+            update_file_mapping(app, self.outdated)
+
+        self.outdated.clear()
+
+
+def get_file_entries(app: Sphinx, docname: str) -> list[tuple[str, str, str, Any]]:
+    """Return the entries in the files table associated with the given document.
+
+    This includes the document itself, along with any files it includes.
+    """
     env = app.env
     builder = app.builder
-    files: list[tuple[str, str, str]] = []
+    files: list[tuple[str, str, str, Any]] = []
 
-    for docname in env.found_docs:
-        uri = Uri.for_file(env.doc2path(docname)).resolve()
-        build_uri = builder.get_target_uri(docname)
+    build_uri = builder.get_target_uri(docname)
 
-        files.append((str(uri), docname, build_uri))
+    if docname in env.found_docs:
+        uri = Uri.for_file(env.doc2path(docname)).resolve()
+        files.append((str(uri), docname, build_uri, None))
 
     # Don't forget any included files.
-    # TODO: How best to handle files included in multiple documents?
-    for parent_doc, included_docs in env.included.items():
-        for docname in included_docs:
-            uri = Uri.for_file(env.doc2path(docname)).resolve()
-            build_uri = builder.get_target_uri(parent_doc)
+    for included_doc in env.included.get(docname, set()):
+        uri = Uri.for_file(env.doc2path(included_doc)).resolve()
+        files.append((str(uri), included_doc, build_uri, docname))
 
-            files.append((str(uri), docname, build_uri))
+    return files
+
+
+def build_file_mapping(app: Sphinx, exc: Exception | None):
+    """Given a Sphinx application, return a mapping of all known source files to their
+    corresponding output files."""
+
+    files: list[tuple[str, str, str, Any]] = []
+    for docname in app.env.found_docs:
+        files.extend(get_file_entries(app, docname))
 
     app.esbonio.db.clear_table(FILES_TABLE)
     app.esbonio.db.insert_values(FILES_TABLE, files)
 
 
+def update_file_mapping(app: Sphinx, docnames: set[str]):
+    """Update the entries in the files table for the given docnames."""
+
+    if len(docnames) == 0:
+        return
+
+    files: list[tuple[str, str, str, Any]] = []
+    for docname in docnames:
+        files.extend(get_file_entries(app, docname))
+
+    db = app.esbonio.db
+    db.delete_values(FILES_TABLE, "docname", list(docnames), parent=None)
+    db.delete_values(FILES_TABLE, "parent", list(docnames))
+    db.insert_values(FILES_TABLE, files)
+
+
 def setup(app: Sphinx):
+    mapping = FileMapping()
+
     app.connect("config-inited", init_db)
     app.connect("builder-inited", dump_config)
-    app.connect("build-finished", build_file_mapping)
+    app.connect("env-purge-doc", mapping.purge_doc)
+    app.connect("build-finished", mapping.update)
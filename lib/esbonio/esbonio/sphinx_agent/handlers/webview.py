@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import pathlib
+import json
 import typing
 
 from docutils import nodes
@@ -13,8 +13,9 @@ from ..log import source_to_uri_and_linum
 if typing.TYPE_CHECKING:
     from sphinx.application import Sphinx
 
+    from ..types import Uri
+
 
-STATIC_DIR = (pathlib.Path(__file__).parent.parent / "static").resolve()
 ALLOWED_MODULES = {"docutils.nodes", "sphinx.addnodes"}
 
 
@@ -46,19 +47,24 @@ def has_source(node):
 
 
 class source_locations(nodes.General, nodes.Element):
-    """Index of all known source locations."""
+    """Index of all known source locations.
+
+    To keep the index compact, each source uri is only stored once in the ``uris``
+    table. For each marker, ``sources`` holds the index of its uri in that table and
+    ``lines`` holds the difference between its line number and that of the previous
+    marker.
+    """
 
 
 def visit_source_locations(self, node):
-    source_index: dict[int, tuple[str, int]] = node["index"]
+    index = dict(uris=node["uris"], sources=node["sources"], lines=node["lines"])
 
-    self.body.append('<div id="esbonio-marker-index" style="display: none">\n')
-    for idx, (uri, linum) in source_index.items():
-        self.body.append(
-            f'  <span data-id="{idx}" data-uri="{uri}" data-line="{linum}"></span>\n'
-        )
+    # Ensure the index cannot prematurely close the script tag.
+    data = json.dumps(index, separators=(",", ":")).replace("</", "<\\/")
 
-    self.body.append("</div>")
+    self.body.append(
+        f'<script type="application/json" id="esbonio-marker-index">{data}</script>'
+    )
 
 
 def depart_source_locations(self, node): ...
@@ -76,17 +82,33 @@ class SourceLocationTransform(Transform):
         current_line = 0
         current_source = None
 
-        source_index = {}
+        uris: dict[str, int] = {}
+        sources: list[int] = []
+        lines: list[int] = []
+        previous_linum = 0
+
+        # The line number of a node is always at a fixed offset from the line number
+        # reported by docutils, so we only need to resolve each source once.
+        locations: dict[str | None, tuple[Uri | None, int | None]] = {}
         source_nodes = self.document.traverse(condition=has_source)
 
-        for idx, node in enumerate(source_nodes):
+        for node in source_nodes:
             if node.line > current_line or node.source != current_source:
-                uri, linum = source_to_uri_and_linum(f"{node.source}:{node.line}")
+                if (location := locations.get(node.source)) is None:
+                    location = source_to_uri_and_linum(f"{node.source}:0")
+                    locations[node.source] = location
 
-                if uri is None or linum is None:
+                uri, offset = location
+                if uri is None or offset is None:
                     continue
 
-                source_index[idx] = (str(uri), linum)
+                linum = offset + (node.line or 0)
+                idx = len(sources)
+
+                sources.append(uris.setdefault(str(uri), len(uris)))
+                lines.append(linum - previous_linum)
+                previous_linum = linum
+
                 node["classes"].extend(["esbonio-marker", f"esbonio-marker-{idx}"])
 
                 # Use the source and line reported by docutils.
@@ -94,17 +116,15 @@ class SourceLocationTransform(Transform):
                 current_line = node.line
                 current_source = node.source
 
-        self.document.children.append(source_locations("", index=source_index))
+        self.document.children.append(
+            source_locations("", uris=list(uris), sources=sources, lines=lines)
+        )
 
 
 def setup(app: Sphinx):
-    # Inline the JS code we need to enable sync scrolling.
-    #
-    # Yes this "bloats" every page in the generated docs, but is generally more robust
-    # see: https://github.com/swyddfa/esbonio/issues/810
-    webview_js = STATIC_DIR / "webview.js"
-    app.add_js_file(None, body=webview_js.read_text())
-
+    # Note: The JS code we need to enable sync scrolling (``static/webview.js``) is not
+    # included in the build. Instead the preview server injects it into each page as it
+    # is served.
     app.add_node(
         source_locations, html=(visit_source_locations, depart_source_locations)
     )
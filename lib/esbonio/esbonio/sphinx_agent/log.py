@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 import inspect
 import logging
 import os
@@ -7,6 +8,9 @@ import pathlib
 import sys
 import typing
 
+from sphinx.util import logging as sphinx_logging_module
+from sphinx.util.logging import NAMESPACE as SPHINX_LOG_NAMESPACE
+
 from . import types
 from .types import Uri
 from .util import logger
@@ -31,6 +35,43 @@ class DiagnosticFilter(logging.Filter):
 
         self.app = app
 
+    def process_pending(self):
+        """Process any warnings that Sphinx is currently holding back.
+
+        While reading source files, Sphinx buffers warnings until the end of the read
+        phase. Calling this method ensures that the diagnostics for any files read so
+        far are available immediately.
+
+        Records are only copied, so they will still be processed as normal once Sphinx
+        releases them.
+        """
+        translator = sphinx_logging_module.WarningLogRecordTranslator(self.app)
+        suppress_warnings = getattr(self.app.config, "suppress_warnings", [])
+
+        for handler in logging.getLogger(SPHINX_LOG_NAMESPACE).handlers:
+            if not isinstance(handler, sphinx_logging_module.MemoryHandler):
+                continue
+
+            # Remember which records we've already seen.
+            offset = getattr(handler, "_esbonio_offset", 0)
+            records = handler.buffer[offset:]
+            handler._esbonio_offset = offset + len(records)  # type: ignore[attr-defined]
+
+            for record in records:
+                if record.levelno < logging.WARNING:
+                    continue
+
+                type_ = getattr(record, "type", "")
+                subtype = getattr(record, "subtype", "")
+                if sphinx_logging_module.is_suppressed_warning(
+                    type_, subtype, suppress_warnings
+                ):
+                    continue
+
+                pending = copy.copy(record)
+                translator.filter(pending)  # type: ignore[arg-type]
+                self.filter(pending)
+
     def filter(self, record: logging.LogRecord) -> bool:
         conditions = [
             "sphinx" not in record.name,
@@ -135,14 +176,81 @@ def _get_location_path(location: str) -> tuple[str, list[str]]:
     return path, parts
 
 
+_MODULE_INDEX: dict[str, str | None] = {}
+"""Maps docstring targets to the name of their containing module."""
+
+_DOCSTRING_CACHE: dict[str, tuple[float | None, int | None]] = {}
+"""Caches the line number at which a docstring starts, along with the modification
+time of its containing module, indexed by target."""
+
+
+def clear_docstring_cache():
+    """Clear the index of module names.
+
+    Should be called before each build, as new modules may have been imported. Cached
+    docstring locations are kept, as they are invalidated whenever the containing
+    module is modified.
+    """
+    _MODULE_INDEX.clear()
+
+
+def _get_module_name(target: str) -> str | None:
+    """Return the name of the module containing the given target."""
+
+    if (name := _MODULE_INDEX.get(target, "")) != "":
+        return name
+
+    # The containing module will be the longest prefix of target that is also a module.
+    name = None
+    parts = target.split(".")
+
+    for idx in range(len(parts), 0, -1):
+        if (candidate := ".".join(parts[:idx])) in sys.modules:
+            name = candidate
+            break
+
+    _MODULE_INDEX[target] = name
+    return name
+
+
+def _get_module_mtime(module: ModuleType) -> float | None:
+    """Return the modification time of the given module's source, if known."""
+    if (filename := getattr(module, "__file__", None)) is None:
+        return None
+
+    try:
+        return os.stat(filename).st_mtime
+    except OSError:
+        return None
+
+
 def _get_docstring_linum(target: str, offset: str) -> int | None:
-    # The containing module will be the longest substring we can find in target
-    candidates = [m for m in sys.modules.keys() if target.startswith(m)] + [""]
-    module = sys.modules.get(sorted(candidates, key=len, reverse=True)[0], None)
+    if (name := _get_module_name(target)) is None:
+        return None
 
-    if module is None:
+    if (module := sys.modules.get(name, None)) is None:
         return None
 
+    # Only the entry for the current version of the module is kept, older entries are
+    # replaced as soon as the module is modified.
+    mtime = _get_module_mtime(module)
+    cached = _DOCSTRING_CACHE.get(target)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _get_docstring_start(module, target))
+        _DOCSTRING_CACHE[target] = cached
+
+    if (start := cached[1]) is None:
+        return None
+
+    try:
+        return start + int(offset)
+    except ValueError:
+        return None
+
+
+def _get_docstring_start(module: ModuleType, target: str) -> int | None:
+    """Return the line number at which the docstring of the given target starts."""
+
     obj: ModuleType | Any | None = module
     dotted_name = target.replace(module.__name__ + ".", "")
 
@@ -156,7 +264,7 @@ def _get_docstring_linum(target: str, offset: str) -> int | None:
 
         # Correct off by one error for docstrings that don't start with a newline.
         nl = (obj.__doc__ or "").startswith("\n")
-        return line + int(offset) - (not nl)
+        return line - (not nl)
     except Exception:
         logger.debug("Unable to determine diagnostic location\n%s", exc_info=True)
         return None
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import contextlib
 import functools
 import logging
+import time
 from collections.abc import Iterable
 from collections.abc import Iterator
+from collections.abc import Sized
 from types import TracebackType
 from typing import Any
 from typing import Callable
@@ -11,10 +14,57 @@ from typing import Optional
 from typing import TypeVar
 
 from . import types
+from .stats import recorder
+from .tracing import tracer
 from .util import send_message
 
 T = TypeVar("T")
 
+PROGRESS_INTERVAL = 0.1
+"""The default minimum time (in seconds) between progress reports."""
+
+
+class ProgressReporter:
+    """Sends progress reports to the client, at a limited rate."""
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL):
+        self.interval = interval
+        """The minimum time (in seconds) between reports."""
+
+        self._last_report = float("-inf")
+        """When progress was last reported."""
+
+    def report(
+        self, message: str, percentage: Optional[int] = None, force: bool = False
+    ):
+        """Report progress to the client.
+
+        Parameters
+        ----------
+        message
+           The message to report
+
+        percentage
+           If known, the percentage of the work that has been done
+
+        force
+           If ``True``, send the report even if the previous report was sent less than
+           ``interval`` seconds ago.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+
+        self._last_report = now
+
+        # Progress is frequent and not urgent, so let it be batched with other messages
+        params = types.ProgressParams(message=message, percentage=percentage)
+        send_message(types.ProgressMessage(params=params), flush=False)
+
+
+progress = ProgressReporter()
+"""Used to report the progress of a build to the client."""
+
 
 def patch_sphinx():
     """Monkey patch parts of Sphinx with our own implementations."""
@@ -27,6 +77,47 @@ def patch_sphinx():
     display.status_iterator = status_iterator
     display.progress_message = progress_message  # type: ignore
 
+    from sphinx.events import EventManager
+
+    EventManager.emit = traced_emit(EventManager.emit)  # type: ignore[method-assign]
+
+    from sphinx.environment import BuildEnvironment
+
+    BuildEnvironment.get_and_resolve_doctree = timed_resolve(  # type: ignore[method-assign]
+        BuildEnvironment.get_and_resolve_doctree
+    )
+
+
+def traced_emit(emit: Callable[..., list]) -> Callable[..., list]:
+    """Wrap Sphinx's ``EventManager.emit`` method, recording a span for each event
+    emitted while tracing is enabled."""
+
+    @functools.wraps(emit)
+    def wrapper(self, name: str, *args: Any, **kwargs: Any) -> list:
+        if not tracer.enabled:
+            return emit(self, name, *args, **kwargs)
+
+        with tracer.span(f"event: {name}", "sphinx"):
+            return emit(self, name, *args, **kwargs)
+
+    return wrapper
+
+
+def timed_resolve(resolve: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap Sphinx's ``BuildEnvironment.get_and_resolve_doctree`` method, recording
+    the time spent resolving doctrees during a build."""
+
+    @functools.wraps(resolve)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return resolve(*args, **kwargs)
+        finally:
+            recorder.docs_resolved += 1
+            recorder.resolve_time += time.perf_counter() - start
+
+    return wrapper
+
 
 def status_iterator(
     iterable: Iterable[T],
@@ -51,19 +142,31 @@ def status_iterator(
         stringify_func = display_chunk
 
     logger = logging.getLogger(NAMESPACE)
-    send_message(types.ProgressMessage(params=types.ProgressParams(message=summary)))
+
+    if length == 0 and isinstance(iterable, Sized):
+        length = len(iterable)
+
+    progress.report(summary, percentage=0 if length > 0 else None, force=True)
 
     if verbosity == 0:
         logger.info(summary)
 
     percentage = " "
-    for i, item in enumerate(iterable, start=1):
-        if verbosity > 0:
+    with tracer.span(summary.strip(), "sphinx", length=length):
+        for i, item in enumerate(iterable, start=1):
             if length > 0:
-                percentage = f" [{int((i / length) * 100): >3d}%] "
-            logger.info(f"{summary}{percentage}{stringify_func(item)}")
+                done = (i * 100) // length
+                percentage = f" [{done: >3d}%] "
+                progress.report(
+                    f"{summary.rstrip()} {i}/{length}",
+                    percentage=done,
+                    force=i == length,
+                )
+
+            if verbosity > 0:
+                logger.info(f"{summary}{percentage}{stringify_func(item)}")
 
-        yield item
+            yield item
 
 
 class progress_message:
@@ -71,11 +174,15 @@ class progress_message:
 
     def __init__(self, message: str, *, nonl: bool = True) -> None:
         self.message = message
+        self._spans: list[contextlib.AbstractContextManager] = []
 
     def __enter__(self) -> None:
-        send_message(
-            types.ProgressMessage(params=types.ProgressParams(message=self.message))
-        )
+        progress.report(self.message)
+
+        # Instances can be used as decorators, so this may be entered more than once
+        span = tracer.span(self.message, "sphinx")
+        span.__enter__()
+        self._spans.append(span)
 
     def __exit__(
         self,
@@ -83,6 +190,8 @@ class progress_message:
         val: Optional[BaseException],
         tb: Optional[TracebackType],
     ) -> bool:
+        self._spans.pop().__exit__(typ, val, tb)
+
         from sphinx.locale import __
         from sphinx.util.logging import NAMESPACE
 
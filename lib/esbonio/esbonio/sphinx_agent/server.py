@@ -1,16 +1,16 @@
 from __future__ import annotations
 
-import asyncio
-import dataclasses
 import json
 import logging
+import os
 import re
 import sys
 import threading
 import traceback
 import typing
-from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 from typing import Any
+from typing import Callable
 from typing import TypeVar
 
 # This has to be called here before any imports from sphinx are made.
@@ -19,96 +19,218 @@ from .patches import patch_sphinx
 
 patch_sphinx()
 
+from .codecs import MessageBuffer
 from .handlers import SphinxHandler  # type: ignore
+from .tracing import tracer
+from .types import TraceEvents
+from .types import TraceEventsParams
+from .util import decode
+from .util import get_decoder
 from .util import send_error
+from .util import send_message
 
 HANDLERS = SphinxHandler()
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 64 * 1024
+"""The maximum number of bytes to read from stdin at once."""
+
+ID_PATTERN = re.compile(rb'"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*")')
+"""Used to recover the id of a message that could not be parsed."""
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
 
 T = TypeVar("T")
 
 
 def parse_message(obj: dict, cls: type[T]) -> T:
     """Convert a raw dict into the given type"""
+    return get_decoder(cls)(obj)  # type: ignore[arg-type]
 
-    if dataclasses.is_dataclass(cls):
-        kwargs = {}
-        fields = typing.get_type_hints(cls)
 
-        for key, value in obj.items():
-            kwargs[key] = parse_message(value, fields[key])
+class InvalidMessageError(Exception):
+    """Raised when a message cannot be handled."""
 
-        return cls(**kwargs)  # type: ignore[return-value]
+    def __init__(self, code: int, message: str, id: int | str | None = None):
+        super().__init__(message)
 
-    return obj  # type: ignore[return-value]
+        self.code = code
+        """The JSON-RPC error code."""
 
+        self.id = id
+        """The id of the message, if known."""
 
-def handle_message(data: bytes):
-    message = json.loads(data.decode("utf8"))
 
+def decode_message(data: bytes) -> tuple[dict, Any, Callable]:
+    """Decode the given message, returning the raw message, the parsed message and
+    the handler responsible for it.
+
+    Raises
+    ------
+    InvalidMessageError
+       If the message cannot be decoded, or there is no handler for it.
+    """
+    try:
+        message = decode(data)
+    except Exception as exc:
+        raise InvalidMessageError(
+            PARSE_ERROR, f"Parse error: {exc}", find_id(data)
+        ) from exc
+
+    if not isinstance(message, dict):
+        raise InvalidMessageError(INVALID_REQUEST, "Invalid message")
+
+    msg_id = message.get("id", None)
     method = message.get("method", None)
     if not method:
-        # TODO: Return a valid JSON-RPC error
-        raise TypeError("Invalid message")
+        raise InvalidMessageError(INVALID_REQUEST, "Invalid message", msg_id)
 
     result = HANDLERS.get(method)
     if result is None:
-        # TODO: Return a valid JSON-RPC error
-        raise TypeError(f"Unknown method: '{method}'")
+        raise InvalidMessageError(
+            METHOD_NOT_FOUND, f"Unknown method: '{method}'", msg_id
+        )
 
     type_, handler = result
-    obj: Any = parse_message(message, type_)
     try:
-        handler(obj)
+        obj: Any = parse_message(message, type_)
+    except Exception as exc:
+        raise InvalidMessageError(
+            INVALID_PARAMS, f"Invalid params: {exc}", msg_id
+        ) from exc
+
+    return message, obj, handler
+
+
+def find_id(data: bytes) -> int | str | None:
+    """Attempt to find the id of the given (unparsable) message."""
+    if (match := ID_PATTERN.search(data)) is None:
+        return None
+
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def reject_message(error: InvalidMessageError):
+    """Reply to a request that could not be handled with the given error."""
+    if error.id is not None:
+        send_error(id=error.id, code=error.code, message=f"{error}")
+
+
+def dispatch_message(message: dict, obj: Any, handler: Callable):
+    """Call the given handler with the given message.
+
+    If the message includes a trace context, the handler is traced and the recorded
+    events are sent back to the client.
+    """
+    context = message.get("trace")
+
+    try:
+        with tracer.remote_span(context, message.get("method", "")):
+            handler(obj)
     except Exception as e:
-        msg_id = message.get("id", None)
+        msg_id = message.get("id")
         if msg_id is not None:
             send_error(
                 id=msg_id,
-                code=-32603,
+                code=INTERNAL_ERROR,
                 message=f"{e}",
                 data=dict(traceback=traceback.format_exc()),
             )
 
+    if context is not None:
+        send_message(TraceEvents(params=TraceEventsParams(events=tracer.drain())))
+
 
-async def main_loop(loop, executor, stop_event, rfile, proxy):
-    """Originally taken from ``pygls``"""
+def handle_message(data: bytes):
+    dispatch_message(*decode_message(data))
+
+
+class MessageReader:
+    """Reads JSON-RPC messages from a stream.
+
+    Rather than reading the stream line by line, data is read in large chunks and
+    split into messages using the ``Content-Length`` header of each message.
+    """
 
-    CONTENT_LENGTH_PATTERN = re.compile(rb"^Content-Length: (\d+)\r\n$")
+    def __init__(self, rfile: typing.BinaryIO, chunk_size: int = CHUNK_SIZE):
+        self.rfile = rfile
+        """The stream to read from."""
 
-    # Initialize message buffer
-    content_length = 0
+        self.chunk_size = chunk_size
+        """The maximum number of bytes to read at once."""
 
-    while not stop_event.is_set() and not rfile.closed:
-        # Read a header line
-        header = await loop.run_in_executor(executor, rfile.readline)
-        if not header:
-            break
+        self._messages = MessageBuffer()
+        """Holds data that has been read, but not yet returned."""
 
-        # Extract content length if possible
-        if not content_length:
-            match = CONTENT_LENGTH_PATTERN.fullmatch(header)
-            if match:
-                content_length = int(match.group(1))
-                logger.debug("Content length: %s", content_length)
+    def __iter__(self):
+        return self
 
-        # Check if all headers have been read (as indicated by an empty line \r\n)
-        if content_length and not header.strip():
-            # Read body
-            body = await loop.run_in_executor(executor, rfile.read, content_length)
-            if not body:
-                break
+    def __next__(self) -> bytes:
+        while (body := self._messages.next_body()) is None:
+            if self.rfile.closed or not (chunk := self._read()):
+                raise StopIteration
 
-            proxy(body)
+            self._messages.feed(chunk)
 
-            # Reset the buffer
-            content_length = 0
+        return body
 
+    def _read(self) -> bytes:
+        """Read whatever data is currently available, up to ``chunk_size`` bytes."""
+        if (read1 := getattr(self.rfile, "read1", None)) is not None:
+            return read1(self.chunk_size)
 
-async def main():
-    loop = asyncio.get_running_loop()
-    event = threading.Event()
-    executor = ThreadPoolExecutor(max_workers=2)
+        return self.rfile.read(self.chunk_size)
 
-    await main_loop(loop, executor, event, sys.stdin.buffer, handle_message)
+
+def read_messages(rfile: typing.BinaryIO, queue: Queue):
+    """Read messages from the given stream, decode them and add them to the given
+    queue.
+
+    Messages that cannot be decoded are queued to be rejected, so that the error is
+    sent from the same thread as every other message. Once the stream is closed,
+    ``None`` is added to the queue.
+    """
+    try:
+        for body in MessageReader(rfile):
+            try:
+                queue.put(decode_message(body))
+            except InvalidMessageError as exc:
+                logger.error("Unable to decode message", exc_info=True)
+                queue.put(({"id": exc.id}, exc, reject_message))
+            except Exception:
+                logger.error("Unable to decode message", exc_info=True)
+    finally:
+        queue.put(None)
+
+
+def main_loop(rfile: typing.BinaryIO, dispatch: Callable = dispatch_message):
+    """Process messages from the given stream until it is closed.
+
+    Messages are read and decoded in a dedicated thread, so that incoming messages
+    are ready and waiting while the current message is being handled. Handlers are
+    run in the calling thread.
+    """
+    queue: Queue = Queue()
+    reader = threading.Thread(
+        target=read_messages, args=(rfile, queue), name="reader", daemon=True
+    )
+    reader.start()
+
+    while (item := queue.get()) is not None:
+        dispatch(*item)
+
+
+def main():
+    tracer.process_name = f"sphinx-agent ({os.getpid()})"
+
+    # Read from the underlying (unbuffered) file, the reader thread would otherwise hold
+    # the lock on ``sys.stdin.buffer`` preventing the interpreter from shutting down.
+    main_loop(sys.stdin.buffer.raw)  # type: ignore[union-attr]
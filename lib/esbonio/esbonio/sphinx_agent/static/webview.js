@@ -50,12 +50,45 @@ function syncScrollPosition() {
         return
     }
 
-    // TODO: Rate limits.
     sendMessage(
         { jsonrpc: "2.0", method: "editor/scroll", params: { uri: uri, line: line } }
     )
 }
 
+/** @type {[string, number][] | undefined} */
+let markerIndex
+
+/**
+ * Get the source locations of all the markers in the page.
+ *
+ * The index is embedded in the page as a JSON object containing a table of uris,
+ * the index into that table for each marker and the difference in line number between
+ * each marker and the one before it.
+ *
+ * @returns {[string, number][] | undefined} - The uri and line number of each marker
+ */
+function getMarkerIndex() {
+    if (markerIndex) {
+        return markerIndex
+    }
+
+    const element = document.getElementById("esbonio-marker-index")
+    if (!element) {
+        console.debug("Unable to find marker index")
+        return
+    }
+
+    const index = JSON.parse(element.textContent)
+    let line = 0
+
+    markerIndex = index.lines.map((delta, idx) => {
+        line += delta
+        return [index.uris[index.sources[idx]], line]
+    })
+
+    return markerIndex
+}
+
 /**
  * Get the uri and line number of the given marker
  *
@@ -70,15 +103,13 @@ function getMarkerLocation(marker) {
     }
 
     const markerId = match[1]
-    const location = document.querySelector(`#esbonio-marker-index span[data-id="${markerId}"]`)
+    const location = (getMarkerIndex() || [])[parseInt(markerId)]
     if (!location) {
         console.debug(`Unable to locate source for marker id: '${markerId}'`)
         return
     }
 
-    const uri = location.dataset.uri
-    const line = parseInt(location.dataset.line)
-    return [uri, line]
+    return location
 }
 
 /**
@@ -111,12 +142,8 @@ function findEditorScrollTarget() {
  */
 function scrollViewTo(uri, linum) {
 
-    // Select all the markers with the given uri.
-    const markers = Array.from(
-        document.querySelectorAll(`#esbonio-marker-index span[data-uri="${uri}"]`)
-    )
-
-    if (!markers) {
+    const index = getMarkerIndex()
+    if (!index) {
         return
     }
 
@@ -132,9 +159,13 @@ function scrollViewTo(uri, linum) {
     /** @type {number} */
     let previousLine
 
-    for (let marker of markers) {
-        let markerId = marker.dataset.id
-        let markerLine = parseInt(marker.dataset.line)
+    for (let markerId = 0; markerId < index.length; markerId++) {
+        // Only consider markers with the given uri.
+        let [markerUri, markerLine] = index[markerId]
+        if (markerUri !== uri) {
+            continue
+        }
+
         let element = document.querySelector(`.esbonio-marker-${markerId}`)
 
         // Only consider markers that correspond with an element currently in the DOM
@@ -216,6 +247,66 @@ function renderLineMarkers() {
     document.body.append(markerStyle)
 }
 
+const SCRIPT_TYPES = new Set([
+    "",
+    "application/ecmascript",
+    "application/javascript",
+    "module",
+    "text/ecmascript",
+    "text/javascript",
+])
+
+/**
+ * Re-create the inline scripts within the given element, so that they are run.
+ *
+ * Scripts inserted via ``innerHTML`` are never run by the browser. Scripts loaded from
+ * a ``src`` are not re-created, since the server reloads the page if any of them change.
+ */
+function runInlineScripts(element) {
+    for (const old of element.querySelectorAll("script:not([src])")) {
+        let type = (old.getAttribute("type") || "").trim().toLowerCase()
+        if (!SCRIPT_TYPES.has(type)) {
+            continue
+        }
+
+        let script = document.createElement("script")
+        for (const attr of old.attributes) {
+            script.setAttribute(attr.name, attr.value)
+        }
+
+        script.textContent = old.textContent
+        old.replaceWith(script)
+    }
+}
+
+/**
+ * Replace the content of the page in place, preserving the current scroll position.
+ *
+ * If the page being shown is not the one that was patched, reload instead.
+ */
+function patchView(path, body) {
+    let currentPath = decodeURIComponent(window.location.pathname).replace(/^\//, "")
+    if (currentPath !== path) {
+        console.debug(`Showing '${currentPath}', not '${path}', reloading page...`)
+        window.location.reload()
+        return
+    }
+
+    const x = window.scrollX
+    const y = window.scrollY
+
+    document.body.innerHTML = body
+    runInlineScripts(document.body)
+    markerIndex = undefined
+    if (showMarkers) {
+        renderLineMarkers()
+    }
+
+    rewriteInternalLinks(wsUrl)
+
+    window.scrollTo(x, y)
+}
+
 const queryParams = new URLSearchParams(window.location.search);
 const showMarkers = queryParams.has("show-markers")
 const wsUrl = queryParams.get("ws");
@@ -233,12 +324,47 @@ function sendMessage(data) {
     socket.send(msg);
 }
 
+/**
+ * Coalesce calls to the given function, so that it is called at most once per frame
+ * with the most recent arguments.
+ *
+ * @param {Function} func - The function to call
+ * @returns {Function}
+ */
+function throttle(func) {
+    let pending
+
+    const throttled = (...args) => {
+        if (pending) {
+            throttled.dropped += 1
+            pending = args
+            return
+        }
+
+        pending = args
+        window.requestAnimationFrame(() => {
+            let args = pending
+            pending = undefined
+            throttled.sent += 1
+            func(...args)
+        })
+    }
+
+    throttled.sent = 0
+    throttled.dropped = 0
+    return throttled
+}
+
+const syncScroll = throttle(syncScrollPosition)
+const scrollView = throttle(scrollViewTo)
+
 const handlers = {
     "view/reload": function (params) {
         console.debug("Reloading page...")
         window.location.reload()
     },
-    "view/scroll": (params) => { scrollViewTo(params.uri, params.line) }
+    "view/patch": (params) => { patchView(params.path, params.body) },
+    "view/scroll": (params) => { scrollView(params.uri, params.line) }
 }
 
 function handle(message) {
@@ -266,7 +392,7 @@ function handle(message) {
 }
 
 window.addEventListener("scroll", (event) => {
-    syncScrollPosition()
+    syncScroll()
 })
 
 // Connection opened
@@ -277,6 +403,14 @@ socket.addEventListener("open", (event) => {
     setTimeout(syncScrollPosition, 50)
 });
 
+socket.addEventListener("close", (event) => {
+    console.debug("Disconnected.")
+    connected = false
+
+    console.debug(`Scroll messages sent: ${syncScroll.sent}, dropped: ${syncScroll.dropped}`)
+    console.debug(`Scroll requests handled: ${scrollView.sent}, dropped: ${scrollView.dropped}`)
+});
+
 // Listen for messages
 socket.addEventListener("message", (event) => {
     handle(JSON.parse(event.data))
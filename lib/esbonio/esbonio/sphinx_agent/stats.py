@@ -0,0 +1,266 @@
+"""Records statistics about the most recent build.
+
+Used to find out where the time goes during a build e.g. which extension's event
+listeners or transforms are the slowest.
+"""
+
+from __future__ import annotations
+
+import functools
+import sys
+import time
+import typing
+
+from . import types
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None  # type: ignore[assignment]
+
+if typing.TYPE_CHECKING:
+    from typing import Any
+    from typing import Callable
+    from typing import Optional
+
+    from .app import Sphinx
+
+
+class HandlerTimings:
+    """Records the time spent in each event listener and transform.
+
+    Note that listeners and transforms that are called from within parallel worker
+    processes (e.g. when reading documents in parallel) are not recorded.
+    """
+
+    def __init__(self):
+        self.listeners: dict[tuple[str, str], list[Any]] = {}
+        """The extension, number of calls and total time spent in each listener,
+        indexed by ``(event, listener)``."""
+
+        self.transforms: dict[str, list[Any]] = {}
+        """The extension, number of calls and total time spent in each transform,
+        indexed by name."""
+
+    def reset(self):
+        """Discard all recorded timings."""
+        for timing in [*self.listeners.values(), *self.transforms.values()]:
+            timing[1:] = [0, 0.0]
+
+    def time_listener(
+        self, event: str, callback: Callable, extension: Optional[str]
+    ) -> Callable:
+        """Return a version of the given event listener that records the time spent
+        calling it.
+
+        Parameters
+        ----------
+        event
+           The event the listener is connected to
+
+        callback
+           The listener
+
+        extension
+           The extension that connected the listener, if known
+        """
+        name = get_name(callback)
+        timing = self.listeners.setdefault(
+            (event, name), [extension or get_module(callback), 0, 0.0]
+        )
+
+        @functools.wraps(callback)
+        def listener(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                timing[1] += 1
+                timing[2] += time.perf_counter() - start
+
+        return listener
+
+    def time_transform(self, transform: type, extension: Optional[str]):
+        """Record the time spent applying the given transform.
+
+        Since transforms are registered as classes, this replaces the ``apply``
+        method of the given class.
+
+        Parameters
+        ----------
+        transform
+           The transform class
+
+        extension
+           The extension that registered the transform, if known
+        """
+        name = get_name(transform)
+        timing = self.transforms.setdefault(
+            name, [extension or get_module(transform), 0, 0.0]
+        )
+
+        if getattr(transform.__dict__.get("apply"), "esbonio_timed", False):
+            return
+
+        apply = transform.apply  # type: ignore[attr-defined]
+        if getattr(apply, "esbonio_timed", False):
+            # Inherited from another transform, don't count the time twice.
+            apply = apply.__wrapped__
+
+        @functools.wraps(apply)
+        def timed_apply(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return apply(self, *args, **kwargs)
+            finally:
+                timing[1] += 1
+                timing[2] += time.perf_counter() - start
+
+        timed_apply.esbonio_timed = True  # type: ignore[attr-defined]
+        transform.apply = timed_apply  # type: ignore[attr-defined]
+
+    def to_stats(self) -> types.BuildStats:
+        """Return the recorded timings, slowest first."""
+        listeners = [
+            types.ListenerStats(
+                event=event,
+                listener=listener,
+                extension=extension,
+                calls=calls,
+                duration=duration,
+            )
+            for (event, listener), (
+                extension,
+                calls,
+                duration,
+            ) in self.listeners.items()
+            if calls > 0
+        ]
+        transforms = [
+            types.TransformStats(
+                transform=transform,
+                extension=extension,
+                calls=calls,
+                duration=duration,
+            )
+            for transform, (extension, calls, duration) in self.transforms.items()
+            if calls > 0
+        ]
+
+        listeners.sort(key=lambda s: s.duration, reverse=True)
+        transforms.sort(key=lambda s: s.duration, reverse=True)
+
+        return types.BuildStats(listeners=listeners, transforms=transforms)
+
+
+class BuildRecorder:
+    """Records statistics describing a build.
+
+    The build is split into phases by listening for the events Sphinx emits at the
+    boundaries between them.
+    """
+
+    def __init__(self):
+        self.resolve_time = 0.0
+        """The time (in seconds) spent resolving doctrees."""
+
+        self.docs_resolved = 0
+        """The number of doctrees resolved."""
+
+        self._docs_read = 0
+        """The number of documents read."""
+
+        self._marks: dict[str, float] = {}
+        """When each phase boundary was reached."""
+
+        self._peak_rss: Optional[int] = None
+        """The peak RSS at the start of the build."""
+
+    def setup(self, app: Sphinx):
+        """Connect the event listeners used to detect phase boundaries."""
+        app.connect("env-before-read-docs", self._on_read_start, priority=999)
+        app.connect("env-updated", self._on_read_end, priority=999)
+        app.connect("build-finished", self._on_write_end, priority=0)
+
+    def start(self, app: Sphinx):
+        """Called at the start of a build."""
+        self.resolve_time = 0.0
+        self.docs_resolved = 0
+        self._docs_read = 0
+        self._peak_rss = get_peak_rss()
+
+        app.esbonio.db.rows_written.clear()
+        self._marks = {"start": time.perf_counter()}
+
+    def finish(self, app: Sphinx) -> types.BuildSummary:
+        """Called at the end of a successful build, returns the build's statistics."""
+        end = time.perf_counter()
+        marks = self._marks
+
+        start = marks["start"]
+        read_start = marks.get("read_start", start)
+        read_end = marks.get("read_end", read_start)
+        write_end = marks.get("write_end", end)
+        write = max(write_end - read_end - self.resolve_time, 0.0)
+
+        peak_rss = get_peak_rss()
+        if peak_rss is not None and self._peak_rss is not None:
+            peak_rss_delta: Optional[int] = peak_rss - self._peak_rss
+        else:
+            peak_rss_delta = None
+
+        return types.BuildSummary(
+            duration=end - start,
+            phases={
+                "outdated": read_start - start,
+                "read": read_end - read_start,
+                "resolve": self.resolve_time,
+                "write": write,
+                "commit": end - write_end,
+            },
+            docs_read=self._docs_read,
+            docs_written=self.docs_resolved,
+            diagnostics=sum(len(d) for d in app.esbonio.diagnostics.values()),
+            peak_rss_delta=peak_rss_delta,
+            rows_written=dict(app.esbonio.db.rows_written),
+        )
+
+    def _on_read_start(self, app: Sphinx, env, docnames: list[str]):
+        self._marks["read_start"] = time.perf_counter()
+        self._docs_read = len(docnames)
+
+    def _on_read_end(self, app: Sphinx, env):
+        self._marks["read_end"] = time.perf_counter()
+
+    def _on_write_end(self, app: Sphinx, exc):
+        self._marks["write_end"] = time.perf_counter()
+
+
+def get_peak_rss() -> Optional[int]:
+    """Return the peak resident set size of this process in bytes, if available."""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in bytes on macOS, kilobytes everywhere else
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_module(obj: Any) -> str:
+    """Return the name of the module the given function or class is defined in."""
+    return getattr(obj, "__module__", None) or "<unknown>"
+
+
+def get_name(obj: Any) -> str:
+    """Return the fully qualified name of the given function or class."""
+    name = getattr(obj, "__qualname__", None) or repr(obj)
+    return f"{get_module(obj)}.{name}"
+
+
+timings = HandlerTimings()
+"""Records the time spent in event listeners and transforms during a build."""
+
+recorder = BuildRecorder()
+"""Records statistics describing the current build."""
@@ -0,0 +1,276 @@
+"""A minimal tracing facility, shared by the language server and the agent.
+
+Spans are recorded as events in Chrome's trace event format, which can be viewed in
+tools such as https://ui.perfetto.dev
+
+Tracing is disabled by default, in which case the overhead of recording a span is
+minimal. When the language server sends a request to the agent from within a
+span, the trace context is attached to the message. The agent then records spans
+while handling the request and sends them back to the language server, so that both
+processes appear in the same trace.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
+import inspect
+import itertools
+import os
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import Any
+    from typing import Callable
+    from typing import Optional
+    from typing import TypeVar
+
+    F = TypeVar("F", bound=Callable[..., Any])
+
+
+MAX_EVENTS = 1_000_000
+"""The maximum number of events to hold in memory, older events are discarded."""
+
+_CURRENT_SPAN: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "esbonio_span", default=None
+)
+"""The id of the span the current code is running within."""
+
+
+class Tracer:
+    """Records spans, as Chrome trace events."""
+
+    def __init__(self, process_name: str, max_events: int = MAX_EVENTS):
+        self.enabled = False
+        """If ``True``, record spans."""
+
+        self.process_name = process_name
+        """The name to give this process in traces."""
+
+        self.events: collections.deque[dict[str, Any]] = collections.deque(
+            maxlen=max_events
+        )
+        """The recorded events."""
+
+        self._ids = itertools.count(1)
+        """Used to generate span ids."""
+
+        self._tracks: dict[int, str] = {}
+        """The tracks (threads or asyncio tasks) we have recorded events for."""
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, category: str = "esbonio", **args: Any
+    ) -> Iterator[dict[str, Any]]:
+        """Record the time spent within the context manager as a span.
+
+        Parameters
+        ----------
+        name
+           The name of the span
+
+        category
+           The category of the span
+
+        args
+           Additional values to attach to the span. Callers can also add values to
+           the dictionary returned by the context manager.
+        """
+        if not self.enabled:
+            yield args
+            return
+
+        span_id = f"{os.getpid()}:{next(self._ids)}"
+        args["parent"] = _CURRENT_SPAN.get()
+
+        token = _CURRENT_SPAN.set(span_id)
+
+        # Timestamps must be comparable across processes, so they are taken from the
+        # wall clock. The duration is measured with a monotonic clock.
+        timestamp = time.time_ns()
+        start = time.perf_counter_ns()
+
+        try:
+            yield args
+        finally:
+            duration = time.perf_counter_ns() - start
+            _CURRENT_SPAN.reset(token)
+
+            args["id"] = span_id
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": timestamp / 1000,
+                    "dur": duration / 1000,
+                    "pid": os.getpid(),
+                    "tid": self._get_track(),
+                    "args": args,
+                }
+            )
+
+    def context(self) -> Optional[dict[str, Any]]:
+        """Return the context to propagate to the agent, if tracing is enabled."""
+        if not self.enabled:
+            return None
+
+        flow_id = next(self._ids) + (os.getpid() << 32)
+        self._flow_event("s", flow_id)
+
+        return {"parent": _CURRENT_SPAN.get(), "flow": flow_id}
+
+    @contextlib.contextmanager
+    def remote_span(
+        self, context: Optional[dict[str, Any]], name: str, category: str = "rpc"
+    ) -> Iterator[None]:
+        """Record a span on behalf of the (remote) process that sent the given trace
+        context.
+
+        If ``context`` is ``None``, no spans are recorded.
+        """
+        if context is None:
+            yield
+            return
+
+        enabled, self.enabled = self.enabled, True
+        token = _CURRENT_SPAN.set(context.get("parent"))
+        try:
+            with self.span(name, category):
+                if (flow_id := context.get("flow")) is not None:
+                    self._flow_event("f", flow_id)
+
+                yield
+        finally:
+            _CURRENT_SPAN.reset(token)
+            self.enabled = enabled
+
+    def add_events(self, events: list[dict[str, Any]]):
+        """Add events recorded by another process."""
+        self.events.extend(events)
+
+    def drain(self) -> list[dict[str, Any]]:
+        """Remove and return all recorded events, including the metadata required to
+        label processes and tracks."""
+        events = self._metadata_events()
+        while self.events:
+            events.append(self.events.popleft())
+
+        return events
+
+    def export(self) -> dict[str, Any]:
+        """Return the recorded events, in a form ready to be written to a JSON file."""
+        events = self._metadata_events()
+        events.extend(self.events)
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _flow_event(self, phase: str, flow_id: int):
+        """Record a flow event, linking spans across processes."""
+        event = {
+            "name": "rpc",
+            "cat": "rpc",
+            "ph": phase,
+            "id": flow_id,
+            "ts": time.time_ns() / 1000,
+            "pid": os.getpid(),
+            "tid": self._get_track(),
+        }
+        if phase == "f":
+            event["bp"] = "e"
+
+        self.events.append(event)
+
+    def _get_track(self) -> int:
+        """Return the id of the track to record the current span on.
+
+        Each asyncio task gets its own track, since they can run concurrently.
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        if task is not None:
+            track, name = id(task), task.get_name()
+        else:
+            thread = threading.current_thread()
+            track, name = threading.get_ident(), thread.name
+
+        self._tracks.setdefault(track, name)
+        return track
+
+    def _metadata_events(self) -> list[dict[str, Any]]:
+        """Return the events used to give names to this process and its tracks."""
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": self.process_name},
+            }
+        ]
+
+        for track, name in self._tracks.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": track,
+                    "args": {"name": name},
+                }
+            )
+
+        return events
+
+
+tracer = Tracer(process_name=f"esbonio ({os.getpid()})")
+"""The tracer for this process."""
+
+
+def traced(name: Optional[str] = None, category: str = "esbonio") -> Callable[[F], F]:
+    """Decorator that records each call to the decorated function as a span.
+
+    Parameters
+    ----------
+    name
+       The name of the span, defaults to the function's qualified name.
+
+    category
+       The category of the span
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+
+                with tracer.span(span_name, category):
+                    return await func(*args, **kwargs)
+
+            return typing.cast("F", async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+
+            with tracer.span(span_name, category):
+                return func(*args, **kwargs)
+
+        return typing.cast("F", wrapper)
+
+    return decorator
@@ -161,6 +161,13 @@ class CreateApplicationParams:
     context: dict[str, str] = dataclasses.field(default_factory=dict)
     """The context in which to resolve config variables."""
 
+    codecs: list[str] = dataclasses.field(default_factory=list)
+    """The codecs the client is able to use to encode messages, in order of
+    preference."""
+
+    progress_interval: float = dataclasses.field(default=0.1)
+    """The minimum time (in seconds) between progress reports."""
+
 
 @dataclasses.dataclass
 class CreateApplicationRequest:
@@ -197,6 +204,12 @@ class SphinxInfo:
     dbpath: str
     """The filepath the database is stored in."""
 
+    num_jobs: int = dataclasses.field(default=1)
+    """The number of parallel jobs used when building the project."""
+
+    codec: str = dataclasses.field(default="json")
+    """The codec used to encode all subsequent messages."""
+
 
 @dataclasses.dataclass
 class CreateApplicationResponse:
@@ -209,6 +222,38 @@ class CreateApplicationResponse:
     jsonrpc: str = dataclasses.field(default="2.0")
 
 
+@dataclasses.dataclass
+class ContentChange:
+    """A change to the content of a document.
+
+    Modelled after LSP's ``TextDocumentContentChangeEvent``, however positions are
+    expressed in terms of the lines returned by :meth:`python:str.splitlines` and
+    characters are counted in unicode code points.
+    """
+
+    text: str
+    """The new text for the given range."""
+
+    range: Optional[Range] = None
+    """The range of the document to replace. If ``None``, ``text`` is taken to be the
+    full content of the document."""
+
+
+@dataclasses.dataclass
+class ContentDelta:
+    """The changes made to a document since the version the agent last acknowledged."""
+
+    version: int
+    """The version of the document, once the changes have been applied."""
+
+    base_version: int = 0
+    """The version of the document the changes should be applied to."""
+
+    changes: list[ContentChange] = dataclasses.field(default_factory=list)
+    """The changes to apply, in order. If empty, the document has not changed since
+    ``base_version``."""
+
+
 @dataclasses.dataclass
 class BuildParams:
     """Parameters of a ``sphinx/build`` request."""
@@ -218,6 +263,55 @@ class BuildParams:
     force_all: bool = False
 
     content_overrides: dict[str, str] = dataclasses.field(default_factory=dict)
+    """The full content of any unsaved documents."""
+
+    content_deltas: dict[str, ContentDelta] = dataclasses.field(default_factory=dict)
+    """Changes to unsaved documents, relative to the content the agent already has.
+
+    Any document that appears in neither ``content_overrides`` nor ``content_deltas``
+    is read from disk.
+    """
+
+    priority: list[str] = dataclasses.field(default_factory=list)
+    """URIs of files that should be read before any others, e.g. the files the user
+    currently has open."""
+
+
+@dataclasses.dataclass
+class BuildSummary:
+    """Statistics describing a single build."""
+
+    duration: float = 0.0
+    """The total time (in seconds) taken by the build."""
+
+    phases: dict[str, float] = dataclasses.field(default_factory=dict)
+    """The time (in seconds) spent in each phase of the build.
+
+    - ``outdated``: finding the documents that need to be read
+    - ``read``: reading the outdated documents
+    - ``resolve``: resolving references in the documents to be written
+    - ``write``: writing the output files
+    - ``commit``: finishing the build, including committing esbonio's database
+    """
+
+    docs_read: int = 0
+    """The number of documents read."""
+
+    docs_written: int = 0
+    """The number of documents written."""
+
+    diagnostics: int = 0
+    """The number of diagnostics in the project, after the build."""
+
+    # Unable to use `int | None` syntax with cattrs when running Python 3.9
+    peak_rss_delta: Optional[int] = None
+    """How much the agent's peak resident set size grew during the build, in bytes.
+
+    If ``None``, the peak RSS is not available on this platform.
+    """
+
+    rows_written: dict[str, int] = dataclasses.field(default_factory=dict)
+    """The number of rows written to each table in esbonio's database."""
 
 
 @dataclasses.dataclass
@@ -227,6 +321,9 @@ class BuildResult:
     diagnostics: dict[str, list[Diagnostic]] = dataclasses.field(default_factory=dict)
     """Any diagnostics associated with the project."""
 
+    summary: Optional[BuildSummary] = None
+    """Statistics describing the build."""
+
 
 @dataclasses.dataclass
 class BuildRequest:
@@ -252,6 +349,103 @@ class BuildResponse:
     jsonrpc: str = dataclasses.field(default="2.0")
 
 
+@dataclasses.dataclass
+class ListenerStats:
+    """The time spent in an event listener during a build."""
+
+    event: str
+    """The name of the event."""
+
+    listener: str
+    """The name of the listener."""
+
+    extension: str
+    """The extension that connected the listener."""
+
+    calls: int
+    """The number of times the listener was called."""
+
+    duration: float
+    """The total time (in seconds) spent in the listener."""
+
+
+@dataclasses.dataclass
+class TransformStats:
+    """The time spent applying a transform during a build."""
+
+    transform: str
+    """The name of the transform."""
+
+    extension: str
+    """The extension that registered the transform."""
+
+    calls: int
+    """The number of times the transform was applied."""
+
+    duration: float
+    """The total time (in seconds) spent applying the transform."""
+
+
+@dataclasses.dataclass
+class BuildStats:
+    """Statistics about the most recent build."""
+
+    listeners: list[ListenerStats] = dataclasses.field(default_factory=list)
+    """The time spent in each event listener, slowest first."""
+
+    transforms: list[TransformStats] = dataclasses.field(default_factory=list)
+    """The time spent in each transform, slowest first."""
+
+
+@dataclasses.dataclass
+class GetBuildStatsRequest:
+    """A ``sphinx/getBuildStats`` request."""
+
+    id: Union[int, str]
+
+    params: None
+
+    method: str = "sphinx/getBuildStats"
+
+    jsonrpc: str = dataclasses.field(default="2.0")
+
+
+@dataclasses.dataclass
+class GetBuildStatsResponse:
+    """A ``sphinx/getBuildStats`` response."""
+
+    id: Union[int, str]
+
+    result: BuildStats
+
+    jsonrpc: str = dataclasses.field(default="2.0")
+
+
+@dataclasses.dataclass
+class PartialBuildResultParams:
+    """Parameters of a ``sphinx/partialBuildResult`` notification."""
+
+    diagnostics: dict[str, list[Diagnostic]] = dataclasses.field(default_factory=dict)
+    """The diagnostics associated with the files read since the last notification."""
+
+
+@dataclasses.dataclass
+class PartialBuildResult:
+    """A ``sphinx/partialBuildResult`` notification.
+
+    Sent periodically during the read phase of a build with the diagnostics of the
+    files read so far, so that the client does not have to wait for the entire build
+    to finish. The files listed in ``BuildParams.priority`` are reported as soon as
+    they have all been read.
+    """
+
+    params: PartialBuildResultParams
+
+    method: str = "sphinx/partialBuildResult"
+
+    jsonrpc: str = dataclasses.field(default="2.0")
+
+
 @dataclasses.dataclass
 class LogMessageParams:
     """Parameters of a ``window/logMessage`` notification."""
@@ -290,6 +484,29 @@ class ProgressMessage:
     jsonrpc: str = dataclasses.field(default="2.0")
 
 
+@dataclasses.dataclass
+class TraceEventsParams:
+    """Parameters of a ``sphinx/traceEvents`` notification."""
+
+    events: list[dict[str, Any]] = dataclasses.field(default_factory=list)
+    """The events recorded while handling a traced request."""
+
+
+@dataclasses.dataclass
+class TraceEvents:
+    """A ``sphinx/traceEvents`` notification.
+
+    Sent after handling a request that included a trace context, so that the client
+    can include the spans recorded by the agent in its own trace.
+    """
+
+    params: TraceEventsParams
+
+    method: str = "sphinx/traceEvents"
+
+    jsonrpc: str = dataclasses.field(default="2.0")
+
+
 @dataclasses.dataclass
 class ExitNotification:
     """An ``exit`` notification"""
@@ -305,9 +522,15 @@ METHOD_TO_MESSAGE_TYPE = {
     BuildRequest.method: BuildRequest,
     ExitNotification.method: ExitNotification,
     CreateApplicationRequest.method: CreateApplicationRequest,
+    GetBuildStatsRequest.method: GetBuildStatsRequest,
+    PartialBuildResult.method: PartialBuildResult,
+    TraceEvents.method: TraceEvents,
 }
 METHOD_TO_RESPONSE_TYPE = {
     BuildRequest.method: BuildResponse,
     ExitNotification.method: None,
     CreateApplicationRequest.method: CreateApplicationResponse,
+    GetBuildStatsRequest.method: GetBuildStatsResponse,
+    PartialBuildResult.method: None,
+    TraceEvents.method: None,
 }
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
 import os
 import pathlib
 import re
@@ -13,13 +14,22 @@ IS_WIN = os.name == "nt"
 SCHEME = re.compile(r"^[a-zA-Z][a-zA-Z\d+.-]*$")
 RE_DRIVE_LETTER_PATH = re.compile(r"^(\/?)([a-zA-Z]:)")
 
+CACHE_SIZE = 4096
+"""The maximum number of entries held by each of the uri caches."""
+
 
 # TODO: Look into upstreaming this into pygls
 #       - if it works out
 #       - when pygls drops 3.7 (Uri uses the := operator)
 @dataclasses.dataclass(frozen=True)
 class Uri:
-    """Helper class for working with URIs."""
+    """Helper class for working with URIs.
+
+    Since uris are immutable, the results of :meth:`parse`, :meth:`for_file` and
+    :meth:`resolve` are cached.
+    """
+
+    __slots__ = ("scheme", "authority", "path", "query", "fragment")
 
     scheme: str
 
@@ -82,6 +92,13 @@ class Uri:
 
         return hash((self.scheme, self.authority, path, self.query, self.fragment))
 
+    def __reduce__(self):
+        # Frozen dataclasses with __slots__ cannot be unpickled by setting attributes.
+        return (
+            self.__class__,
+            (self.scheme, self.authority, self.path, self.query, self.fragment),
+        )
+
     def __fspath__(self):
         """Return the file system representation of this uri.
 
@@ -122,6 +139,7 @@ class Uri:
         )
 
     @classmethod
+    @functools.lru_cache(maxsize=CACHE_SIZE)
     def parse(cls, uri: str) -> Uri:
         """Parse the given uri from its string representation."""
         scheme, authority, path, _, query, fragment = parse.urlparse(uri)
@@ -134,19 +152,28 @@ class Uri:
         )
 
     def resolve(self) -> Uri:
-        """Return the fully resolved version of this Uri."""
+        """Return the fully resolved version of this Uri.
 
-        # This operation only makes sense for file uris
-        if self.scheme != "file":
-            return Uri.parse(str(self))
+        Results are cached, use :meth:`clear_cache` to discard them if the filesystem
+        changes e.g. a symlink is created or removed.
+        """
+        return _resolve(self)
 
-        return Uri.for_file(pathlib.Path(self).resolve())
+    @staticmethod
+    def clear_cache():
+        """Clear the cache of resolved uris."""
+        _resolve.cache_clear()
 
     @classmethod
     def for_file(cls, filepath: Union[str, os.PathLike[str]]) -> Uri:
         """Create a uri based on the given filepath."""
+        return cls._for_file(os.fspath(filepath))
+
+    @classmethod
+    @functools.lru_cache(maxsize=CACHE_SIZE)
+    def _for_file(cls, fpath: str) -> Uri:
+        """Create a uri based on the given filepath."""
 
-        fpath = os.fspath(filepath)
         if IS_WIN:
             fpath = fpath.replace("\\", "/")
 
@@ -289,6 +316,17 @@ class Uri:
         return "".join(parts)
 
 
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _resolve(uri: Uri) -> Uri:
+    """Return the fully resolved version of the given uri."""
+
+    # This operation only makes sense for file uris
+    if uri.scheme != "file":
+        return Uri.parse(str(uri))
+
+    return Uri.for_file(pathlib.Path(uri).resolve())
+
+
 def _replace_chars(segment: str) -> str:
     """Replace a certain subset of characters in a uri segment"""
     return segment.replace("#", "%23").replace("?", "%3F")
@@ -1,19 +1,101 @@
+from __future__ import annotations
+
 import dataclasses
+import functools
 import json
 import logging
 import pathlib
 import sys
+import threading
+import time
+import typing
 from typing import Any
+from typing import Callable
+from typing import Optional
 from typing import Union
 
 from sphinx.locale import _TranslationProxy
 
+from . import codecs
+
+if typing.TYPE_CHECKING:
+    from .types import ContentChange
+    from .types import Position
+
 logger = logging.getLogger("esbonio.sphinx_agent")
 
 
+@functools.lru_cache(maxsize=None)
+def get_decoder(cls: type) -> Callable[[Any], Any]:
+    """Return a function that converts a raw (JSON) value into an instance of the
+    given type.
+
+    Decoders are cached, so the (potentially expensive) type introspection only
+    happens once per type.
+    """
+    origin = typing.get_origin(cls)
+    args = typing.get_args(cls)
+
+    if origin is list and (item := get_decoder(args[0])) is not _identity:
+
+        def decode_list(obj: list):
+            return [item(value) for value in obj]
+
+        return decode_list
+
+    if origin is dict and (item := get_decoder(args[1])) is not _identity:
+
+        def decode_dict(obj: dict):
+            return {key: item(value) for key, value in obj.items()}
+
+        return decode_dict
+
+    options = [arg for arg in args if arg is not type(None)]
+    if origin is Union and len(options) == 1:
+        if (item := get_decoder(options[0])) is not _identity:
+
+            def decode_optional(obj: Any):
+                return None if obj is None else item(obj)
+
+            return decode_optional
+
+    if not dataclasses.is_dataclass(cls):
+        return _identity
+
+    decoders = {
+        name: get_decoder(type_) for name, type_ in typing.get_type_hints(cls).items()
+    }
+
+    def decode(obj: dict):
+        # Ignore any fields we don't know about e.g. the trace context of a request.
+        return cls(
+            **{
+                key: decoders[key](value)
+                for key, value in obj.items()
+                if key in decoders
+            }
+        )
+
+    return decode
+
+
+def _identity(obj: Any) -> Any:
+    return obj
+
+
+@functools.lru_cache(maxsize=None)
+def _get_field_names(cls: type) -> tuple[str, ...]:
+    """Return the names of the fields of the given dataclass."""
+    return tuple(f.name for f in dataclasses.fields(cls))
+
+
 def _serialize_message(obj):
     if dataclasses.is_dataclass(obj):
-        return dataclasses.asdict(obj)  # type: ignore[call-overload]
+        # Unlike ``dataclasses.asdict`` this does not recurse into (and copy) the
+        # values of each field, any nested values are serialized as the json module
+        # comes across them.
+        names = _get_field_names(type(obj))  # type: ignore[arg-type]
+        return {name: getattr(obj, name) for name in names}
 
     if isinstance(obj, (_TranslationProxy, pathlib.Path)):
         return str(obj)
@@ -24,13 +106,80 @@ def _serialize_message(obj):
     return obj
 
 
+_ENCODER = json.JSONEncoder(
+    default=_serialize_message, separators=codecs.SEPARATORS, ensure_ascii=False
+)
+
+FLUSH_INTERVAL = 0.05
+"""The maximum time (in seconds) an unflushed message waits before being sent."""
+
+_CODECS: dict[str, codecs.JsonCodec] = {"send": codecs.JSON, "receive": codecs.JSON}
+"""The codecs used to encode outgoing and decode incoming messages."""
+
+
+def apply_changes(text: str, changes: list[ContentChange]) -> str:
+    """Apply the given changes to ``text``, in order.
+
+    Parameters
+    ----------
+    text
+       The text to change
+
+    changes
+       The changes to apply
+
+    Returns
+    -------
+    str
+       The resulting text
+    """
+    for change in changes:
+        if change.range is None:
+            text = change.text
+            continue
+
+        lines = text.splitlines(keepends=True)
+        start = _get_offset(lines, change.range.start)
+        end = _get_offset(lines, change.range.end)
+
+        text = text[:start] + change.text + text[end:]
+
+    return text
+
+
+def _get_offset(lines: list[str], position: Position) -> int:
+    """Convert the given position into an offset into the text ``lines`` came from."""
+    return sum(len(line) for line in lines[: position.line]) + position.character
+
+
 def as_json(data: Any) -> str:
-    return json.dumps(data, default=_serialize_message)
+    """Encode the given data as JSON.
+
+    The output is the same, whether or not ``orjson`` is available.
+    """
+    if codecs.orjson is None:
+        return _ENCODER.encode(data)
+
+    return codecs.JSON.dumps(data, default=_serialize_message).decode("utf8")
+
+
+def set_codec(codec: codecs.JsonCodec, *, send: bool = True, receive: bool = True):
+    """Set the codec used to encode and/or decode messages."""
+    if send:
+        _CODECS["send"] = codec
+
+    if receive:
+        _CODECS["receive"] = codec
+
+
+def decode(data: bytes) -> Any:
+    """Decode the given (incoming) message."""
+    return _CODECS["receive"].loads(data)
 
 
 def format_message(data: Any) -> str:
     content = as_json(data)
-    content_length = len(content)
+    content_length = len(content.encode("utf8"))
 
     return f"Content-Length: {content_length}\r\n\r\n{content}"
 
@@ -45,7 +194,62 @@ def send_error(id: Union[str, int], code: int, message: str, data=None):
     )
 
 
-def send_message(data: Any):
-    content = format_message(data).encode("utf8")
-    sys.stdout.buffer.write(content)
-    sys.stdout.flush()
+def send_message(data: Any, *, flush: bool = True):
+    """Send the given message to the client.
+
+    Parameters
+    ----------
+    data
+       The message to send
+
+    flush
+       If ``False``, the message is allowed to wait in the output buffer for up to
+       ``FLUSH_INTERVAL`` seconds, so that it can be written along with any other
+       messages sent in that time.
+    """
+    codec = _CODECS["send"]
+    content = codec.dumps(data, default=_serialize_message)
+    header = (
+        f"Content-Length: {len(content)}\r\n"
+        f"Content-Type: {codec.content_type}\r\n\r\n"
+    ).encode()
+
+    stdout = sys.stdout.buffer
+    stdout.write(header)
+    stdout.write(content)
+
+    if flush:
+        sys.stdout.flush()
+    else:
+        _DELAYED_FLUSH.schedule()
+
+
+class DelayedFlush:
+    """Flushes stdout from a background thread, shortly after it has been written to."""
+
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        """How long (in seconds) to wait before flushing."""
+
+        self._pending = threading.Event()
+        """Set when there is data waiting to be flushed."""
+
+        self._thread: Optional[threading.Thread] = None
+        """The thread doing the flushing."""
+
+    def schedule(self):
+        """Ensure that stdout is flushed within the next ``interval`` seconds."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="flush", daemon=True)
+            self._thread.start()
+
+        self._pending.set()
+
+    def _run(self):
+        while self._pending.wait():
+            time.sleep(self.interval)
+            self._pending.clear()
+            sys.stdout.flush()
+
+
+_DELAYED_FLUSH = DelayedFlush()
@@ -67,6 +67,52 @@ async def test_myst_document_diagnostic(client: LanguageClient, uri_for):
     assert len(client.diagnostics) == 0, "Server should not publish diagnostics"
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_document_diagnostic_unchanged(client: LanguageClient, uri_for):
+    """Ensure that the server indicates when a document's diagnostics have not
+    changed."""
+
+    workspace_uri = uri_for("workspaces", "demo")
+    test_uri = workspace_uri / "rst" / "diagnostics.rst"
+    params = types.DocumentDiagnosticParams(
+        text_document=types.TextDocumentIdentifier(uri=str(test_uri))
+    )
+
+    report = await client.text_document_diagnostic_async(params)
+    assert report.kind == "full"
+    assert report.result_id is not None
+
+    params.previous_result_id = report.result_id
+    report = await client.text_document_diagnostic_async(params)
+    assert report.kind == "unchanged"
+    assert report.result_id == params.previous_result_id
+
+    params.previous_result_id = "not-a-result-id"
+    report = await client.text_document_diagnostic_async(params)
+    assert report.kind == "full"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_workspace_diagnostic_unchanged(client: LanguageClient):
+    """Ensure that the server indicates when diagnostics across the workspace have
+    not changed."""
+    report = await client.workspace_diagnostic_async(
+        types.WorkspaceDiagnosticParams(previous_result_ids=[])
+    )
+    assert len(report.items) > 0
+    assert all(item.kind == "full" for item in report.items)
+
+    previous_result_ids = [
+        types.PreviousResultId(uri=item.uri, value=item.result_id)
+        for item in report.items
+    ]
+    report = await client.workspace_diagnostic_async(
+        types.WorkspaceDiagnosticParams(previous_result_ids=previous_result_ids)
+    )
+    assert len(report.items) == len(previous_result_ids)
+    assert all(item.kind == "unchanged" for item in report.items)
+
+
 @pytest.mark.asyncio(loop_scope="session")
 async def test_workspace_diagnostic(client: LanguageClient, uri_for):
     """Ensure that we can get diagnostics for the whole workspace correctly."""
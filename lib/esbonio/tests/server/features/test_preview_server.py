@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import pathlib
+import re
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+import pytest_asyncio
+
+from esbonio.server import Uri
+from esbonio.server.features.preview_manager import PreviewManager
+from esbonio.server.features.preview_manager import preview as preview_module
+from esbonio.server.features.preview_manager.config import PreviewConfig
+from esbonio.server.features.preview_manager.preview import WEBVIEW_JS
+from esbonio.server.features.preview_manager.preview import WEBVIEW_JS_PATH
+from esbonio.server.features.preview_manager.preview import PreviewServer
+from esbonio.server.features.preview_manager.preview import read_page
+from esbonio.sphinx_agent import handlers
+from esbonio.sphinx_agent.app import Sphinx
+
+PAGE = "<html><head></head><body>" + "<p>Hello, world!</p>" * 100 + "</body></html>"
+
+
+@pytest_asyncio.fixture()
+async def preview(tmp_path):
+    """A preview server, serving the contents of ``tmp_path``."""
+
+    (tmp_path / "index.html").write_text(PAGE)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    server = PreviewServer(logging.getLogger(__name__), PreviewConfig(), executor)
+    server.build_uri = Uri.for_file(tmp_path)
+
+    await server
+    yield server
+
+    server.stop()
+    executor.shutdown(wait=False)
+
+
+async def fetch(server: PreviewServer, path: str, **headers):
+    """Make a request to the given server, returning the response's status, headers and
+    body."""
+
+    def do_fetch():
+        url = f"http://localhost:{server.port}{path}"
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers, exc.read()
+
+    return await asyncio.get_running_loop().run_in_executor(None, do_fetch)
+
+
+@pytest.mark.asyncio
+async def test_conditional_request(preview: PreviewServer, tmp_path):
+    """Ensure that the server responds with ``304 Not Modified`` when the client's copy
+    is up to date."""
+
+    status, headers, body = await fetch(preview, "/")
+    assert status == 200
+    assert PAGE.split("</body>")[0] in body.decode()
+
+    etag = headers["ETag"]
+    status, _, body = await fetch(preview, "/index.html", **{"If-None-Match": etag})
+    assert status == 304
+    assert body == b""
+
+    modified = headers["Last-Modified"]
+    status, _, _ = await fetch(
+        preview, "/index.html", **{"If-Modified-Since": modified}
+    )
+    assert status == 304
+
+    # Once the file changes, the client's copy is no longer valid
+    index_html = tmp_path / "index.html"
+    index_html.write_text("<p>Changed</p>")
+
+    stat = index_html.stat()
+    os.utime(index_html, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    status, _, body = await fetch(preview, "/index.html", **{"If-None-Match": etag})
+    assert status == 200
+    assert body.decode().startswith("<p>Changed</p>")
+
+
+@pytest.mark.asyncio
+async def test_compression(preview: PreviewServer):
+    """Ensure that the server compresses content when supported by the client."""
+
+    status, headers, body = await fetch(preview, "/", **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert int(headers["Content-Length"]) == len(body)
+    assert PAGE.split("</body>")[0] in gzip.decompress(body).decode()
+
+    status, headers, body = await fetch(preview, "/")
+    assert status == 200
+    assert headers.get("Content-Encoding") is None
+    assert PAGE.split("</body>")[0] in body.decode()
+
+
+@pytest.mark.asyncio
+async def test_webview_js(preview: PreviewServer):
+    """Ensure that the ``webview.js`` script is injected into html pages and served as
+    a cacheable asset."""
+
+    status, _, body = await fetch(preview, "/")
+    assert status == 200
+
+    html = body.decode()
+    match = re.search(r'<script src="([^"]+)"></script></body>', html)
+    assert match is not None
+
+    src = match.group(1)
+    assert src.startswith(f"{WEBVIEW_JS_PATH}?v=")
+
+    status, headers, body = await fetch(preview, src)
+    assert status == 200
+    assert "immutable" in headers["Cache-Control"]
+    assert body.decode() == WEBVIEW_JS.read_text()
+
+
+@pytest.mark.asyncio
+async def test_webview_js_changed(preview: PreviewServer, tmp_path, monkeypatch):
+    """Ensure that html pages are considered modified when ``webview.js`` changes, so
+    that clients load the new version of the script."""
+
+    webview_js = tmp_path / "webview.js"
+    webview_js.write_text(WEBVIEW_JS.read_text())
+    monkeypatch.setattr(preview_module, "WEBVIEW_JS", webview_js)
+
+    status, headers, body = await fetch(preview, "/")
+    assert status == 200
+
+    etag = headers["ETag"]
+    status, _, _ = await fetch(preview, "/", **{"If-None-Match": etag})
+    assert status == 304
+
+    stat = webview_js.stat()
+    os.utime(webview_js, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    status, headers, new_body = await fetch(preview, "/", **{"If-None-Match": etag})
+    assert status == 200
+    assert headers["ETag"] != etag
+
+    version = f"?v={webview_js.stat().st_mtime_ns:x}"
+    assert version not in body.decode()
+    assert version in new_body.decode()
+
+
+@pytest.mark.asyncio
+async def test_not_found(preview: PreviewServer):
+    """Ensure that missing files are reported correctly."""
+
+    status, _, _ = await fetch(preview, "/missing.html")
+    assert status == 404
+
+
+def test_read_page(tmp_path):
+    """Ensure that we can take snapshots of pages in the build output."""
+
+    index_html = tmp_path / "index.html"
+    index_html.write_text(PAGE)
+
+    page = read_page(str(index_html))
+    assert page is not None
+    assert page.head == ""
+    assert page.body == PAGE.split("<body>")[1].split("</body>")[0]
+
+    # Directories should resolve to their index page
+    assert read_page(str(tmp_path)) == page
+
+    # If the file has not been modified, the previous snapshot should be returned
+    assert read_page(str(index_html), page) is page
+
+    index_html.write_text("<html><head></head><body><p>Changed</p></body></html>")
+    stat = index_html.stat()
+    os.utime(index_html, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    changed = read_page(str(index_html), page)
+    assert changed is not None
+    assert changed != page
+    assert changed.body == "<p>Changed</p>"
+
+    assert read_page(str(tmp_path / "missing.html")) is None
+
+
+@pytest.mark.parametrize(
+    "before, after, expected",
+    [
+        ("<p>One</p>", "<p>Two</p>", True),
+        ("<p>One</p>", "<p>Two</p><script>init()</script>", False),
+        ("<p>One</p><script src='a.js'></script>", "<p>Two</p>", False),
+        ("<p>One</p>", "<p>Two</p><SCRIPT\ntype='module'></SCRIPT>", False),
+        ("<p>One</p>", "<p>A <scripted> example</p>", True),
+        (
+            "<p>One</p><script>init()</script>",
+            "<p>Two</p><script>init()</script>",
+            True,
+        ),
+        (
+            "<p>One</p><script src='a.js'></script>",
+            "<p>Two</p><script src='b.js'></script>",
+            False,
+        ),
+        (
+            '<p>One</p><script type="application/json">{"a": 1}</script>',
+            '<p>Two</p><script type="application/json">{"a": 2}</script>',
+            True,
+        ),
+        (
+            "<p>One</p>",
+            "<p>Two</p><script type=text/javascript>init()</script>",
+            False,
+        ),
+    ],
+)
+def test_page_can_patch(tmp_path, before: str, after: str, expected: bool):
+    """Ensure that pages are only reloaded, rather than patched, when their
+    executable scripts change."""
+
+    index_html = tmp_path / "index.html"
+    index_html.write_text(f"<html><head></head><body>{before}</body></html>")
+    previous = read_page(str(index_html))
+
+    index_html.write_text(f"<html><head></head><body>{after}</body></html>")
+    page = read_page(str(index_html))
+
+    assert previous is not None
+    assert page is not None
+    assert page.can_patch(previous) is expected
+
+
+def test_page_can_patch_head(tmp_path):
+    """Ensure that changes to the ``<head>`` cause the page to be reloaded."""
+
+    index_html = tmp_path / "index.html"
+    index_html.write_text("<html><head></head><body><p>One</p></body></html>")
+    previous = read_page(str(index_html))
+
+    index_html.write_text(
+        "<html><head><link rel='stylesheet' href='a.css'></head>"
+        "<body><p>Two</p></body></html>"
+    )
+    page = read_page(str(index_html))
+
+    assert previous is not None
+    assert page is not None
+    assert page.can_patch(previous) is False
+
+
+def build_project(src_dir: pathlib.Path, out_dir: pathlib.Path):
+    """Build the given Sphinx project, as the sphinx agent would."""
+
+    # Importing the handlers registers the agent's extensions with Sphinx.
+    assert handlers.SphinxHandler is not None
+
+    app = Sphinx(
+        srcdir=str(src_dir),
+        confdir=str(src_dir),
+        outdir=str(out_dir / "html"),
+        doctreedir=str(out_dir / "doctrees"),
+        buildername="html",
+        confoverrides={"html_theme": "alabaster"},
+        status=None,
+        warning=None,
+    )
+    app.build()
+
+
+@pytest.mark.asyncio
+async def test_on_build_patches_sphinx_output(tmp_path):
+    """Ensure that changes to the content of a page built by Sphinx are patched into
+    the view, rather than reloading it."""
+
+    src_dir = tmp_path / "src"
+    src_dir.mkdir()
+    (src_dir / "conf.py").write_text("")
+
+    index_rst = src_dir / "index.rst"
+    index_rst.write_text("Title\n=====\n\nOne\n")
+    build_project(src_dir, tmp_path / "build")
+
+    build_uri = Uri.for_file(tmp_path / "build" / "html")
+    server = mock.Mock(logger=logging.getLogger(__name__))
+    manager = PreviewManager(server, mock.Mock(), mock.Mock())
+    manager.preview = mock.Mock(build_uri=build_uri)
+    manager.webview = mock.Mock()
+    manager.build_uri = build_uri
+    manager.build_path = "index.html"
+    manager.page = manager._read_page()
+
+    assert manager.page is not None
+    assert 'id="esbonio-marker-index"' in manager.page.body
+
+    index_rst.write_text("Title\n=====\n\nTwo\n")
+    build_project(src_dir, tmp_path / "build")
+
+    await manager.on_build(mock.Mock(build_uri=build_uri), None)
+
+    manager.webview.reload.assert_not_called()
+    manager.webview.patch.assert_called_once_with("index.html", manager.page.body)
+    assert "Two" in manager.page.body
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from esbonio.server import ConfigChangeEvent
+from esbonio.server import EsbonioLanguageServer
+from esbonio.server import create_language_server
+from esbonio.server.features.sphinx_manager import ClientState
+from esbonio.server.features.sphinx_manager import SphinxManager
+from esbonio.server.features.sphinx_manager import SphinxManagerConfig
+from esbonio.server.features.sphinx_manager.manager import BuildRecord
+from esbonio.sphinx_agent import types
+
+
+@pytest.fixture
+async def server():
+    """Return a server instance, with the sphinx manager loaded."""
+    server = create_language_server(
+        EsbonioLanguageServer,
+        [
+            "esbonio.server.features.project_manager",
+            "esbonio.server.features.sphinx_manager",
+        ],
+        loop=asyncio.get_running_loop(),
+    )
+    yield server
+
+    manager = server.get_feature(SphinxManager)
+    if manager is not None and manager._housekeeping is not None:
+        manager._housekeeping.cancel()
+
+
+def make_record(idx: int) -> BuildRecord:
+    """Return a build record, using ``idx`` to identify it."""
+    return BuildRecord(
+        id=f"client-{idx}",
+        scope="file:///project",
+        summary=types.BuildSummary(duration=float(idx)),
+        timestamp=float(idx),
+    )
+
+
+def set_build_history(manager: SphinxManager, build_history: int):
+    """Set the number of builds the manager should keep statistics for."""
+    config = SphinxManagerConfig(build_history=build_history)
+    manager.update_configuration(ConfigChangeEvent(scope="", value=config))
+
+
+async def test_record_build(server: EsbonioLanguageServer):
+    """Ensure that the build history only keeps the most recent builds."""
+
+    manager = server.get_feature(SphinxManager)
+    assert manager is not None
+
+    set_build_history(manager, 3)
+    for idx in range(5):
+        manager.record_build(make_record(idx))
+
+    assert [r.id for r in manager.build_history] == [
+        "client-2",
+        "client-3",
+        "client-4",
+    ]
+
+    # Reducing the limit should discard the oldest records.
+    set_build_history(manager, 2)
+    assert [r.id for r in manager.build_history] == ["client-3", "client-4"]
+
+    # While increasing the limit should keep the existing records.
+    set_build_history(manager, 4)
+    manager.record_build(make_record(5))
+    assert [r.id for r in manager.build_history] == [
+        "client-3",
+        "client-4",
+        "client-5",
+    ]
+
+    # A limit of zero disables the build history
+    set_build_history(manager, 0)
+    manager.record_build(make_record(6))
+    assert list(manager.build_history) == []
+
+
+async def test_show_build_stats(server: EsbonioLanguageServer):
+    """Ensure that the ``esbonio.server.showBuildStats`` command reports the build
+    history in the expected format."""
+
+    manager = server.get_feature(SphinxManager)
+    assert manager is not None
+
+    command = server.protocol.fm.commands["esbonio.server.showBuildStats"]
+    assert await command() == []
+
+    manager.record_build(
+        BuildRecord(
+            id="client-1",
+            scope="file:///project",
+            summary=types.BuildSummary(
+                duration=1.5,
+                phases={"read": 1.0, "write": 0.5},
+                docs_read=2,
+                docs_written=3,
+                diagnostics=4,
+                peak_rss_delta=1024,
+                rows_written={"symbols": 10},
+            ),
+            timestamp=100.0,
+        )
+    )
+    manager.record_build(make_record(2))
+
+    assert await command() == [
+        {
+            "id": "client-1",
+            "scope": "file:///project",
+            "timestamp": 100.0,
+            "duration": 1.5,
+            "phases": {"read": 1.0, "write": 0.5},
+            "docsRead": 2,
+            "docsWritten": 3,
+            "diagnostics": 4,
+            "peakRssDelta": 1024,
+            "rowsWritten": {"symbols": 10},
+        },
+        {
+            "id": "client-2",
+            "scope": "file:///project",
+            "timestamp": 2.0,
+            "duration": 2.0,
+            "phases": {},
+            "docsRead": 0,
+            "docsWritten": 0,
+            "diagnostics": 0,
+            "peakRssDelta": None,
+            "rowsWritten": {},
+        },
+    ]
+
+
+async def test_build_stats(server: EsbonioLanguageServer):
+    """Ensure that the ``esbonio.sphinx.buildStats`` command reports the time spent in
+    each listener and transform in the expected format."""
+
+    manager = server.get_feature(SphinxManager)
+    assert manager is not None
+
+    stats = types.BuildStats(
+        listeners=[
+            types.ListenerStats(
+                event="source-read",
+                listener="ext.on_source_read",
+                extension="ext",
+                calls=2,
+                duration=0.5,
+            )
+        ],
+        transforms=[
+            types.TransformStats(
+                transform="ext.Transform", extension="ext", calls=3, duration=0.25
+            )
+        ],
+    )
+    client = mock.Mock(id="client-1", state=ClientState.Running)
+    client.get_build_stats = mock.AsyncMock(return_value=stats)
+    manager.clients["file:///project"] = client
+
+    command = server.protocol.fm.commands["esbonio.sphinx.buildStats"]
+    assert await command() == [
+        {
+            "id": "client-1",
+            "scope": "file:///project",
+            "listeners": [
+                {
+                    "event": "source-read",
+                    "listener": "ext.on_source_read",
+                    "extension": "ext",
+                    "calls": 2,
+                    "duration": 0.5,
+                }
+            ],
+            "transforms": [
+                {
+                    "transform": "ext.Transform",
+                    "extension": "ext",
+                    "calls": 3,
+                    "duration": 0.25,
+                }
+            ],
+        }
+    ]
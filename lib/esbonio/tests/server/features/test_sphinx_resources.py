@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from esbonio.server.features.sphinx_manager.resources import sample_process
+from esbonio.server.features.sphinx_manager.resources import select_idle_clients
+
+
+@pytest.mark.parametrize(
+    "last_used, now, idle_timeout, max_clients, expected",
+    [
+        ({}, 100, 0, 0, []),
+        ({"a": 10, "b": 20}, 100, 0, 0, []),
+        ({"a": 10, "b": 90}, 100, 60, 0, ["a"]),
+        ({"a": 10, "b": 20}, 100, 60, 0, ["a", "b"]),
+        ({"a": 30, "b": 10, "c": 20}, 100, 0, 2, ["b"]),
+        ({"a": 30, "b": 10, "c": 20}, 100, 0, 1, ["b", "c"]),
+        ({"a": 30, "b": 10, "c": 20}, 100, 0, 3, []),
+        # Idle clients count towards the limit
+        ({"a": 95, "b": 10, "c": 90}, 100, 60, 1, ["b", "c"]),
+        ({"a": 95, "b": 10, "c": 90}, 100, 60, 2, ["b"]),
+    ],
+)
+def test_select_idle_clients(
+    last_used: dict[str, float],
+    now: float,
+    idle_timeout: float,
+    max_clients: int,
+    expected: list[str],
+):
+    """Ensure that we select the correct clients to stop."""
+    actual = select_idle_clients(
+        last_used, now, idle_timeout=idle_timeout, max_clients=max_clients
+    )
+    assert actual == expected
+
+
+def test_sample_process():
+    """Ensure that we can sample the resource usage of a process."""
+
+    first = sample_process(os.getpid())
+    if first is None:
+        pytest.skip("Resource sampling not supported on this platform")
+
+    assert first.rss > 0
+    assert first.cpu_percent is None
+
+    # Burn some CPU time.
+    start = time.monotonic()
+    while time.monotonic() - start < 0.1:
+        pass
+
+    second = sample_process(os.getpid(), first)
+    assert second is not None
+    assert second.cpu_time >= first.cpu_time
+    assert second.cpu_percent is not None and second.cpu_percent >= 0
+
+
+def test_sample_process_missing():
+    """Ensure that sampling a process that does not exist returns ``None``."""
+    assert sample_process(2**22 + 1) is None
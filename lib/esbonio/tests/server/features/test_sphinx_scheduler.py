@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from esbonio.server.features.sphinx_manager.scheduler import BuildScheduler
+
+
+def make_build(key: str, log: list[str], release: asyncio.Event):
+    """Return a build function that records when it starts and waits to be released."""
+
+    async def build():
+        log.append(key)
+        await release.wait()
+        return key
+
+    return build
+
+
+@pytest.mark.asyncio
+async def test_max_concurrent():
+    """Ensure that the scheduler limits the number of builds running at once."""
+
+    log: list[str] = []
+    release = asyncio.Event()
+    scheduler = BuildScheduler(max_concurrent=2)
+
+    tasks = [
+        asyncio.create_task(scheduler.schedule(key, make_build(key, log, release)))
+        for key in ["a", "b", "c"]
+    ]
+    await asyncio.sleep(0)
+
+    assert scheduler.running == ["a", "b"]
+    assert scheduler.queued == ["c"]
+
+    release.set()
+    assert await asyncio.gather(*tasks) == ["a", "b", "c"]
+    assert log == ["a", "b", "c"]
+    assert scheduler.running == []
+
+
+@pytest.mark.asyncio
+async def test_coalesce():
+    """Ensure that queued builds for the same key are combined."""
+
+    log: list[str] = []
+    release = asyncio.Event()
+    scheduler = BuildScheduler(max_concurrent=1)
+
+    first = asyncio.create_task(scheduler.schedule("a", make_build("a1", log, release)))
+    await asyncio.sleep(0)
+
+    # While "a" is running, further builds of "a" should be queued and coalesced.
+    second = asyncio.create_task(
+        scheduler.schedule("a", make_build("a2", log, release))
+    )
+    third = asyncio.create_task(scheduler.schedule("a", make_build("a3", log, release)))
+    await asyncio.sleep(0)
+
+    assert scheduler.running == ["a"]
+    assert scheduler.queued == ["a"]
+
+    release.set()
+    assert await asyncio.gather(first, second, third) == ["a1", "a3", "a3"]
+    assert log == ["a1", "a3"]
+
+
+@pytest.mark.asyncio
+async def test_priority():
+    """Ensure that queued builds are started in priority order."""
+
+    log: list[str] = []
+    release = asyncio.Event()
+    focused = "c"
+    scheduler = BuildScheduler(
+        max_concurrent=1, priority=lambda key: 0 if key == focused else 1
+    )
+
+    tasks = [
+        asyncio.create_task(scheduler.schedule(key, make_build(key, log, release)))
+        for key in ["a", "b", "c"]
+    ]
+    await asyncio.sleep(0)
+
+    # "a" was the only build requested when the slot was free
+    assert scheduler.running == ["a"]
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert log == ["a", "c", "b"]
+
+
+@pytest.mark.asyncio
+async def test_build_error():
+    """Ensure that an error in one build does not prevent others from running."""
+
+    scheduler = BuildScheduler(max_concurrent=1)
+
+    async def fail():
+        raise ValueError("Build failed")
+
+    async def succeed():
+        return "ok"
+
+    failed = asyncio.create_task(scheduler.schedule("a", fail))
+    succeeded = asyncio.create_task(scheduler.schedule("b", succeed))
+
+    with pytest.raises(ValueError, match="Build failed"):
+        await failed
+
+    assert await succeeded == "ok"
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+
+from esbonio.server.features.preview_manager.config import PreviewConfig
+from esbonio.server.features.preview_manager.webview import Throttle
+from esbonio.server.features.preview_manager.webview import WebviewServer
+
+
+@pytest.mark.asyncio
+async def test_throttle():
+    """Ensure that the throttle only calls the function with the most recent arguments
+    at most once per interval."""
+
+    calls: list[int] = []
+    throttle = Throttle(calls.append, interval=0.1)
+
+    # The first call should be made immediately
+    throttle(1)
+    assert calls == [1]
+
+    # Subsequent calls within the interval should be coalesced
+    throttle(2)
+    throttle(3)
+    throttle(4)
+    assert calls == [1]
+
+    await asyncio.sleep(0.2)
+    assert calls == [1, 4]
+    assert throttle.sent == 2
+    assert throttle.dropped == 2
+
+
+@pytest.mark.asyncio
+async def test_throttle_cancel():
+    """Ensure that pending calls can be cancelled."""
+
+    calls: list[int] = []
+    throttle = Throttle(calls.append, interval=0.1)
+
+    throttle(1)
+    throttle(2)
+    throttle.cancel()
+
+    await asyncio.sleep(0.2)
+    assert calls == [1]
+    assert throttle.sent == 1
+    assert throttle.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_scroll_stats():
+    """Ensure that the webview server reports the number of scroll messages sent and
+    dropped in each direction."""
+
+    server = WebviewServer(
+        logging.getLogger(__name__), PreviewConfig(), loop=asyncio.get_running_loop()
+    )
+    server.protocol.notify = mock.Mock()  # type: ignore[method-assign]
+    server._connected = True
+
+    assert server.scroll_stats == {
+        "viewSent": 0,
+        "viewDropped": 0,
+        "editorSent": 0,
+        "editorDropped": 0,
+    }
+
+    server.scroll_editor = Throttle(mock.Mock(), 0.1)
+    server.scroll_editor("file:///a.rst", 1)
+
+    for line in range(1, 5):
+        server.scroll("file:///a.rst", line)
+
+    await asyncio.sleep(0.2)
+    assert server.protocol.notify.call_count == 2
+    assert server.scroll_stats == {
+        "viewSent": 2,
+        "viewDropped": 2,
+        "editorSent": 1,
+        "editorDropped": 0,
+    }
+
+    if server._editor_in_control is not None:
+        server._editor_in_control.cancel()
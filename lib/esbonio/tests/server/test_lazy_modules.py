@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import sys
+import types as pytypes
+
+import attrs
+import pytest
+from lsprotocol import types
+from pygls.workspace import Workspace
+
+from esbonio.server import ConfigChangeEvent
+from esbonio.server import EsbonioLanguageServer
+from esbonio.server import LanguageFeature
+from esbonio.server import LazyModule
+from esbonio.server import create_language_server
+from esbonio.server.cli import DEFAULT_MODULES
+from esbonio.server.setup import load_lazy_modules
+
+MODULE = "esbonio_test_lazy_module"
+
+CALLS = ["initialize", "initialized", "config: default"]
+"""The calls a feature should see, when loaded after the server is ready."""
+
+
+@attrs.define
+class LazyConfig:
+    """Configuration for the lazy feature."""
+
+    value: str = attrs.field(default="default")
+
+
+class LazyFeature(LanguageFeature):
+    """A feature that records the lifecycle methods it was called with."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls: list[str] = []
+
+    def initialize(self, params: types.InitializeParams):
+        self.calls.append("initialize")
+
+    def initialized(self, params: types.InitializedParams):
+        self.calls.append("initialized")
+        self.configuration.subscribe(
+            "esbonio.lazy", LazyConfig, self.update_configuration
+        )
+
+    async def update_configuration(self, event: ConfigChangeEvent[LazyConfig]):
+        await asyncio.sleep(0)
+        self.calls.append(f"config: {event.value.value}")
+
+
+@pytest.fixture
+def module(monkeypatch):
+    """A module that records each time it is setup."""
+    module = pytypes.ModuleType(MODULE)
+    module.setups = []  # type: ignore[attr-defined]
+
+    def esbonio_setup(server: EsbonioLanguageServer):
+        feature = LazyFeature(server)
+        server.add_feature(feature)
+        module.setups.append(feature)  # type: ignore[attr-defined]
+
+        @server.command("test.lazyCommand")
+        def lazy_command(ls: EsbonioLanguageServer, *args):
+            return {"args": args[0], "calls": list(feature.calls)}
+
+    module.esbonio_setup = esbonio_setup  # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, MODULE, module)
+
+    return module
+
+
+@pytest.fixture
+async def server(module):
+    """Return a server instance, with the test module declared as a lazy module."""
+    lazy = LazyModule(
+        MODULE,
+        methods=[types.TEXT_DOCUMENT_COMPLETION],
+        commands=["test.lazyCommand"],
+        trigger_characters=["@"],
+    )
+    server = create_language_server(
+        EsbonioLanguageServer, [lazy], loop=asyncio.get_running_loop()
+    )
+    server.protocol._workspace = Workspace(None)
+
+    return server
+
+
+async def test_lazy_module_declared(server: EsbonioLanguageServer, module):
+    """Ensure that a lazy module's features are advertised without loading it."""
+
+    assert module.setups == []
+    assert "test.lazyCommand" in server.protocol.fm.commands
+
+    options = server.protocol.fm.feature_options[types.TEXT_DOCUMENT_COMPLETION]
+    assert "@" in options.trigger_characters
+
+
+async def test_lazy_module_loaded_on_first_use(server: EsbonioLanguageServer, module):
+    """Ensure that a lazy module is loaded the first time one of its commands is
+    called, and that its features are caught up with the rest of the server."""
+
+    server._initialize_params = types.InitializeParams(
+        capabilities=types.ClientCapabilities()
+    )
+    server.ready.set_result(True)
+
+    command = server.protocol.fm.commands["test.lazyCommand"]
+    result = await command([1, 2])
+
+    assert len(module.setups) == 1
+    assert result == {"args": [1, 2], "calls": CALLS}
+
+    # The real command should now be called directly.
+    assert server.protocol.fm.commands["test.lazyCommand"] is not command
+    assert server._lazy_modules == {}
+
+    result = server.protocol.fm.commands["test.lazyCommand"]([3])
+    assert result == {"args": [3], "calls": CALLS}
+    assert len(module.setups) == 1
+
+
+@pytest.mark.parametrize(
+    "method, language, loaded",
+    [
+        (types.TEXT_DOCUMENT_DOCUMENT_SYMBOL, "markdown", False),
+        (types.TEXT_DOCUMENT_COMPLETION, "rst", False),
+        (types.TEXT_DOCUMENT_COMPLETION, "markdown", True),
+        (types.TEXT_DOCUMENT_COMPLETION, None, True),
+    ],
+)
+async def test_load_lazy_modules(
+    module, method: str, language: str | None, loaded: bool
+):
+    """Ensure that lazy modules are only loaded for the methods and languages they
+    declare."""
+    lazy = LazyModule(
+        MODULE, methods=[types.TEXT_DOCUMENT_COMPLETION], languages={"markdown"}
+    )
+    server = create_language_server(
+        EsbonioLanguageServer, [lazy], loop=asyncio.get_running_loop()
+    )
+
+    await load_lazy_modules(server, method, language)
+    assert (len(module.setups) == 1) is loaded
+
+
+async def test_lazy_module_load_failure(
+    server: EsbonioLanguageServer, module, monkeypatch
+):
+    """Ensure that if a lazy module fails to load, loading it is attempted again the
+    next time it is used."""
+
+    server.ready.set_result(True)
+    import_module = importlib.import_module
+
+    def broken_import(name: str):
+        if name == MODULE:
+            raise RuntimeError("Broken module")
+
+        return import_module(name)
+
+    monkeypatch.setattr(importlib, "import_module", broken_import)
+
+    command = server.protocol.fm.commands["test.lazyCommand"]
+    assert await command([1]) is None
+
+    assert module.setups == []
+    assert server.protocol.fm.commands["test.lazyCommand"] is command
+    assert server._lazy_tasks == {}
+    assert MODULE in server._lazy_modules
+
+    monkeypatch.setattr(importlib, "import_module", import_module)
+
+    result = await command([2])
+    assert result == {"args": [2], "calls": CALLS[1:]}
+    assert len(module.setups) == 1
+
+
+@pytest.mark.parametrize(
+    "lazy",
+    [mod for mod in DEFAULT_MODULES if isinstance(mod, LazyModule)],
+    ids=lambda mod: mod.name,
+)
+async def test_default_lazy_modules(lazy: LazyModule):
+    """Ensure that every command registered by a lazy module is declared, so that
+    it is advertised to the client before the module is loaded."""
+    eager = [mod for mod in DEFAULT_MODULES if isinstance(mod, str)]
+    loop = asyncio.get_running_loop()
+
+    server = create_language_server(EsbonioLanguageServer, eager, loop=loop)
+    builtin = set(server.protocol.fm.commands)
+
+    server = create_language_server(
+        EsbonioLanguageServer, [*eager, lazy.name], loop=loop
+    )
+    commands = set(server.protocol.fm.commands) - builtin
+
+    assert commands == set(lazy.commands)
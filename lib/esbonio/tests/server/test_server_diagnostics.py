@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from lsprotocol import types
+
+from esbonio.server import EsbonioLanguageServer
+from esbonio.server import Uri
+from esbonio.server import create_language_server
+from esbonio.server.server import DiagnosticList
+
+
+def diagnostic(message: str, line: int = 0) -> types.Diagnostic:
+    return types.Diagnostic(
+        range=types.Range(
+            start=types.Position(line=line, character=0),
+            end=types.Position(line=line + 1, character=0),
+        ),
+        message=message,
+    )
+
+
+@pytest.fixture
+def server(event_loop):
+    """Return a server instance for testing, recording any published diagnostics."""
+    _server = EsbonioLanguageServer(loop=event_loop)
+    _server.protocol.client_capabilities = types.ClientCapabilities()
+    _server.published = []  # type: ignore[attr-defined]
+    _server.text_document_publish_diagnostics = _server.published.append  # type: ignore
+
+    return _server
+
+
+def published_uris(server) -> list[str]:
+    uris = [params.uri for params in server.published]
+    server.published.clear()
+
+    return uris
+
+
+def test_sync_diagnostics_only_publishes_changes(server: EsbonioLanguageServer):
+    """Ensure that diagnostics are only published when they change."""
+
+    a = Uri.parse("file:///a.rst")
+    b = Uri.parse("file:///b.rst")
+    c = Uri.parse("file:///c.rst")
+
+    server.set_diagnostics("sphinx", a, [diagnostic("one"), diagnostic("two", 2)])
+    server.set_diagnostics("sphinx", b, [diagnostic("three")])
+    server.set_diagnostics("sphinx", c, [])
+    server.sync_diagnostics()
+
+    # Files without diagnostics do not need to be published
+    assert sorted(published_uris(server)) == [str(a), str(b)]
+
+    # Nothing has changed, order should not matter
+    server.set_diagnostics("sphinx", a, [diagnostic("two", 2), diagnostic("one")])
+    server.sync_diagnostics()
+    assert published_uris(server) == []
+
+    # Only the changed file should be published.
+    server.set_diagnostics("sphinx", b, [diagnostic("three", 3)])
+    server.sync_diagnostics()
+    assert published_uris(server) == [str(b)]
+
+    # Clearing diagnostics should be published, but only once.
+    server.clear_diagnostics("sphinx", a)
+    server.sync_diagnostics()
+    assert published_uris(server) == [str(a)]
+
+    server.sync_diagnostics()
+    assert published_uris(server) == []
+
+
+def test_diagnostics_by_source(server: EsbonioLanguageServer):
+    """Ensure that diagnostics from different sources are managed independently."""
+
+    a = Uri.parse("file:///a.rst")
+    b = Uri.parse("file:///b.rst")
+
+    server.set_diagnostics("sphinx", a, [diagnostic("one")])
+    server.add_diagnostics("sphinx", b, diagnostic("two"))
+    server.add_diagnostics("other", a, diagnostic("three"))
+    server.add_diagnostics("other", a, diagnostic("one"))
+
+    # Duplicates across sources should only be reported once.
+    assert sorted(d.message for d in server.get_diagnostics(a)) == ["one", "three"]
+    assert [d.message for d in server.get_diagnostics(b)] == ["two"]
+
+    server.sync_diagnostics()
+    assert sorted(published_uris(server)) == [str(a), str(b)]
+
+    server.clear_diagnostics("sphinx", a)
+    assert sorted(d.message for d in server.get_diagnostics(a)) == ["one", "three"]
+    assert [d.message for d in server.get_diagnostics(b)] == ["two"]
+
+    # The other source still reports the same diagnostics, so nothing has changed.
+    server.sync_diagnostics()
+    assert published_uris(server) == []
+
+    server.clear_diagnostics("other")
+    assert server.get_diagnostics(a) == []
+    assert [d.message for d in server.get_diagnostics(b)] == ["two"]
+
+    # Only the uri that was cleared should be published.
+    server.sync_diagnostics()
+    assert published_uris(server) == [str(a)]
+
+
+def test_diagnostic_list():
+    """Ensure that duplicate diagnostics are ignored."""
+
+    items = DiagnosticList([diagnostic("one"), diagnostic("one")])
+    items.append(diagnostic("one"))
+    items.extend([diagnostic("one", 1), diagnostic("two")])
+
+    assert [(d.message, d.range.start.line) for d in items] == [
+        ("one", 0),
+        ("one", 1),
+        ("two", 0),
+    ]
+
+    with pytest.raises(TypeError):
+        items.append("one")  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_workspace_diagnostic_non_canonical_uri(tmp_path):
+    """Ensure that the previous result ids sent by the client are matched against
+    the diagnostics index by their fully resolved uri."""
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "index.rst").write_text("")
+
+    try:
+        (tmp_path / "link").symlink_to(docs, target_is_directory=True)
+    except OSError:
+        pytest.skip("Unable to create symlinks")
+
+    server = create_language_server(
+        EsbonioLanguageServer, [], loop=asyncio.get_running_loop()
+    )
+    uri = Uri.for_file(docs / "index.rst")
+    server.set_diagnostics("sphinx", uri, [diagnostic("one")])
+
+    handler = server.protocol.fm.features[types.WORKSPACE_DIAGNOSTIC]
+    previous_id = types.PreviousResultId(
+        uri=str(Uri.for_file(tmp_path / "link" / "index.rst")),
+        value=server.get_diagnostics_result_id(uri),
+    )
+    report = await handler(
+        types.WorkspaceDiagnosticParams(previous_result_ids=[previous_id])
+    )
+
+    assert len(report.items) == 1
+    assert report.items[0].uri == str(uri)
+    assert report.items[0].kind == types.DocumentDiagnosticReportKind.Unchanged
+
+
+def test_diagnostics_index_follows_filesystem(server: EsbonioLanguageServer, tmp_path):
+    """Ensure that diagnostics are re-indexed when the uri they are reported against
+    resolves to a different file."""
+
+    for name in ["a", "b"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "index.rst").write_text("")
+
+    link = tmp_path / "link"
+    try:
+        link.symlink_to(tmp_path / "a", target_is_directory=True)
+    except OSError:
+        pytest.skip("Unable to create symlinks")
+
+    a = Uri.for_file(tmp_path / "a" / "index.rst")
+    b = Uri.for_file(tmp_path / "b" / "index.rst")
+    uri = Uri.for_file(link / "index.rst")
+
+    server.set_diagnostics("sphinx", uri, [diagnostic("one")])
+    assert [d.message for d in server.get_diagnostics(a)] == ["one"]
+
+    link.unlink()
+    link.symlink_to(tmp_path / "b", target_is_directory=True)
+    Uri.clear_cache()
+
+    server.set_diagnostics("sphinx", uri, [diagnostic("two")])
+    assert server.get_diagnostics(a) == []
+    assert [d.message for d in server.get_diagnostics(b)] == ["two"]
+    assert a not in server._diagnostics_index
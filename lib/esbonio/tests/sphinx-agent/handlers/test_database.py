@@ -26,39 +26,77 @@ async def test_files_table(client: SubprocessSphinxClient, project: Project):
     actual = {r for r in results if "badfile" not in r[1]}
 
     expected = {
-        (anuri(src, "index.rst"), "index", "index.html"),
-        (anuri(src, "rst", "roles.rst"), "rst/roles", "rst/roles.html"),
-        (anuri(src, "rst", "directives.rst"), "rst/directives", "rst/directives.html"),
+        (anuri(src, "index.rst"), "index", "index.html", None),
+        (anuri(src, "rst", "roles.rst"), "rst/roles", "rst/roles.html", None),
+        (
+            anuri(src, "rst", "directives.rst"),
+            "rst/directives",
+            "rst/directives.html",
+            None,
+        ),
         (
             anuri(src, "rst", "diagnostics.rst"),
             "rst/diagnostics",
             "rst/diagnostics.html",
+            None,
         ),
         (
             anuri(src, "rst", "domains.rst"),
             "rst/domains",
             "rst/domains.html",
+            None,
         ),
         (
             anuri(src, "rst", "domains", "python.rst"),
             "rst/domains/python",
             "rst/domains/python.html",
+            None,
         ),
-        (anuri(src, "rst", "symbols.rst"), "rst/symbols", "rst/symbols.html"),
-        (anuri(src, "myst", "roles.md"), "myst/roles", "myst/roles.html"),
+        (anuri(src, "rst", "symbols.rst"), "rst/symbols", "rst/symbols.html", None),
+        (anuri(src, "myst", "roles.md"), "myst/roles", "myst/roles.html", None),
         (
             anuri(src, "myst", "directives.md"),
             "myst/directives",
             "myst/directives.html",
+            None,
         ),
         (
             anuri(src, "myst", "diagnostics.md"),
             "myst/diagnostics",
             "myst/diagnostics.html",
+            None,
         ),
-        (anuri(src, "myst", "symbols.md"), "myst/symbols", "myst/symbols.html"),
-        (anuri(src, "demo_rst.rst"), "demo_rst", "demo_rst.html"),
-        (anuri(src, "demo_myst.md"), "demo_myst", "demo_myst.html"),
+        (anuri(src, "myst", "symbols.md"), "myst/symbols", "myst/symbols.html", None),
+        (anuri(src, "demo_rst.rst"), "demo_rst", "demo_rst.html", None),
+        (anuri(src, "demo_myst.md"), "demo_myst", "demo_myst.html", None),
     }
 
     assert expected == actual
+
+
+@pytest.mark.asyncio
+async def test_files_table_included(client: SubprocessSphinxClient, project: Project):
+    """Ensure that included files are updated as documents change."""
+
+    src = client.src_uri
+    assert src is not None
+
+    roles = str(src / "rst" / "roles.rst")
+    expected = (anuri(src, "demo_rst.rst"), "demo_rst", "rst/roles.html", "rst/roles")
+    query = "SELECT * FROM files WHERE parent IS NOT NULL"
+
+    await client.build(
+        content_overrides={roles: "Roles\n=====\n\n.. include:: ../demo_rst.rst\n"}
+    )
+
+    db = await project.get_db()
+    cursor = await db.execute(query)
+    assert expected in await cursor.fetchall()
+
+    # The included file should still map to its own page
+    assert await project.get_build_path(src / "demo_rst.rst") == "demo_rst.html"
+
+    await client.build(content_overrides={roles: "Roles\n=====\n"})
+
+    cursor = await db.execute(query)
+    assert expected not in await cursor.fetchall()
@@ -1,5 +1,10 @@
+import asyncio
+import collections
+import json
 import logging
+import os
 import pathlib
+import re
 import sys
 
 import pytest
@@ -16,6 +21,7 @@ from esbonio.server.features.sphinx_manager.client_subprocess import (
     make_test_sphinx_client,
 )
 from esbonio.server.features.sphinx_manager.config import SphinxConfig
+from esbonio.sphinx_agent.tracing import tracer
 
 logger = logging.getLogger(__name__)
 STATIC_DIR = (
@@ -24,8 +30,9 @@ STATIC_DIR = (
 
 
 @pytest.mark.asyncio
-async def test_build_includes_webview_js(client: SubprocessSphinxClient, uri_for):
-    """Ensure that builds include the ``webview.js`` script."""
+async def test_build_excludes_webview_js(client: SubprocessSphinxClient, uri_for):
+    """Ensure that builds do not include the ``webview.js`` script, it is injected by
+    the preview server instead."""
 
     out = client.build_uri
     assert out is not None
@@ -36,9 +43,38 @@ async def test_build_includes_webview_js(client: SubprocessSphinxClient, uri_for
     webview_script = webview_js.read_text()
     assert "editor/scroll" in webview_script
 
-    # Ensure the script is included in the page
+    # Ensure the script is not included in the page
     index_html = pathlib.Path(out / "index.html")
-    assert webview_script in index_html.read_text()
+    assert webview_script not in index_html.read_text()
+
+
+@pytest.mark.asyncio
+async def test_build_source_locations(client: SubprocessSphinxClient):
+    """Ensure that builds include a compact index of source locations."""
+
+    out = client.build_uri
+    src = client.src_uri
+    assert out is not None and src is not None
+
+    index_html = pathlib.Path(out / "index.html").read_text()
+    match = re.search(
+        r'<script type="application/json" id="esbonio-marker-index">(.*?)</script>',
+        index_html,
+    )
+    assert match is not None
+
+    index = json.loads(match.group(1))
+    assert index["uris"] == [str(src / "index.rst")]
+    assert len(index["sources"]) == len(index["lines"])
+
+    # Each marker in the page should have an entry in the index
+    markers = {int(m) for m in re.findall(r"esbonio-marker-(\d+)", index_html)}
+    assert len(markers) > 0
+    assert markers <= set(range(len(index["lines"])))
+
+    # Line numbers should increase through the document
+    assert index["lines"][0] > 0
+    assert all(delta > 0 for delta in index["lines"][1:])
 
 
 @pytest.mark.asyncio
@@ -66,6 +102,152 @@ async def test_build_content_override(client: SubprocessSphinxClient, uri_for):
     print(index_html.read_text())
     assert expected in index_html.read_text()
 
+    # Unchanged overrides should not need to be sent again.
+    await client.build(
+        content_overrides={str(src / "index.rst"): "My Custom Title\n==============="}
+    )
+    assert client._content[str(src / "index.rst")][0] == 1
+    assert expected in index_html.read_text()
+
+    await client.build(
+        content_overrides={str(src / "index.rst"): "My Other Title\n==============="}
+    )
+    assert client._content[str(src / "index.rst")][0] == 2
+    assert "My Other Title" in index_html.read_text()
+
+    # Once the override is removed, the file should be read from disk again.
+    await client.build()
+    assert "Welcome to the demo documentation" in index_html.read_text()
+
+
+@pytest.mark.asyncio
+async def test_build_priority(client: SubprocessSphinxClient):
+    """Ensure that diagnostics are reported as files are read, with prioritised files
+    reported first."""
+
+    src = client.src_uri
+    assert src is not None
+
+    results = []
+    result_received = asyncio.Event()
+
+    @client.feature("sphinx/partialBuildResult")
+    def _on_partial_result(params):
+        results.append(params)
+        result_received.set()
+
+    directives_rst = src / "rst" / "directives.rst"
+    await client.build(
+        content_overrides={
+            str(directives_rst): "Title\n=====\n\n.. not-a-directive::\n",
+            str(src / "rst" / "roles.rst"): "Roles\n=====\n",
+        },
+        priority=[str(directives_rst)],
+    )
+
+    await asyncio.wait_for(result_received.wait(), timeout=5)
+
+    # The prioritised file should be reported on its own, before any others.
+    diagnostics = results[0].diagnostics
+    assert list(diagnostics.keys()) == [str(directives_rst)]
+
+    messages = [d.message for d in diagnostics[str(directives_rst)]]
+    assert any("not-a-directive" in m for m in messages)
+
+    # All other files read during the build should also be reported.
+    reported = {uri for result in results for uri in result.diagnostics.keys()}
+    assert str(src / "rst" / "roles.rst") in reported
+
+
+@pytest.mark.asyncio
+async def test_build_trace(client: SubprocessSphinxClient, monkeypatch):
+    """Ensure that the agent records spans on our behalf when tracing is enabled."""
+
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "events", collections.deque())
+
+    await client.build(force_all=True)
+
+    # Events are sent by the agent after the build response.
+    for _ in range(50):
+        if any(e["pid"] != os.getpid() for e in tracer.events):
+            break
+
+        await asyncio.sleep(0.1)
+    else:
+        pytest.fail("Trace events were not received from the agent")
+
+    spans = {e["name"]: e for e in tracer.events if e["ph"] == "X"}
+    build = spans["SphinxClient.build"]
+
+    # The request handled by the agent should be linked to the client's span
+    assert build["pid"] == os.getpid()
+    assert spans["sphinx/build"]["args"]["parent"] == build["args"]["id"]
+    assert spans["sphinx/build"]["pid"] != os.getpid()
+    assert "event: doctree-read" in spans
+
+    names = {
+        e["args"]["name"] for e in tracer.export()["traceEvents"] if e["ph"] == "M"
+    }
+    assert any(name.startswith("sphinx-agent") for name in names)
+
+
+@pytest.mark.asyncio
+async def test_build_stats(client: SubprocessSphinxClient):
+    """Ensure that the time spent in each listener and transform is recorded."""
+
+    await client.build(force_all=True)
+    stats = await client.get_build_stats()
+
+    # Within the agent, esbonio's modules are imported as ``sphinx_agent.*``
+    listeners = {(s.event, s.listener.split(".")[-1]): s for s in stats.listeners}
+    update_symbols = listeners[("source-read", "update_symbols")]
+    assert update_symbols.extension.endswith("sphinx_agent.handlers.symbols")
+    assert update_symbols.calls > 0
+    assert update_symbols.duration > 0
+
+    transforms = {s.transform.split(".")[-1]: s for s in stats.transforms}
+    source_locations = transforms["SourceLocationTransform"]
+    assert source_locations.extension.endswith("sphinx_agent.handlers.webview")
+    assert source_locations.calls == update_symbols.calls
+
+    durations = [s.duration for s in stats.listeners]
+    assert durations == sorted(durations, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_build_summary(client: SubprocessSphinxClient):
+    """Ensure that each build reports statistics describing it."""
+
+    src = client.src_uri
+    assert src is not None
+
+    content = "Title\n=====\n\n.. not-a-directive::\n"
+    result = await client.build(
+        content_overrides={str(src / "rst" / "directives.rst"): content}
+    )
+
+    summary = result.summary
+    assert summary is not None
+    assert set(summary.phases.keys()) == {
+        "outdated",
+        "read",
+        "resolve",
+        "write",
+        "commit",
+    }
+    assert all(t >= 0 for t in summary.phases.values())
+    assert sum(summary.phases.values()) == pytest.approx(summary.duration, abs=0.01)
+
+    assert summary.docs_read >= 1
+    assert summary.docs_written >= summary.docs_read
+    assert summary.diagnostics >= 1
+    assert summary.rows_written.get("symbols", 0) > 0
+
+    if sys.platform != "win32":
+        assert summary.peak_rss_delta is not None
+        assert summary.peak_rss_delta >= 0
+
 
 @pytest_asyncio.fixture(scope="module", loop_scope="module")
 async def client_build_error(uri_for, tmp_path_factory):
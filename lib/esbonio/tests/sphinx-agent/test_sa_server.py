@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import threading
+from unittest import mock
+
+import pytest
+from pygls.protocol import default_converter
+
+from esbonio.server.features.sphinx_manager.client_subprocess import SphinxAgentProtocol
+from esbonio.sphinx_agent import codecs
+from esbonio.sphinx_agent import types
+from esbonio.sphinx_agent.server import MessageReader
+from esbonio.sphinx_agent.server import dispatch_message
+from esbonio.sphinx_agent.server import main_loop
+from esbonio.sphinx_agent.server import parse_message
+from esbonio.sphinx_agent.server import reject_message
+from esbonio.sphinx_agent.util import as_json
+from esbonio.sphinx_agent.util import format_message
+from esbonio.sphinx_agent.util import get_decoder
+
+
+def frame(data: dict) -> bytes:
+    return format_message(data).encode("utf8")
+
+
+class ChunkedReader(io.RawIOBase):
+    """A stream that only returns a few bytes at a time."""
+
+    def __init__(self, data: bytes, size: int):
+        self.data = data
+        self.size = size
+
+    def readable(self):
+        return True
+
+    def read1(self, n=-1):
+        chunk, self.data = self.data[: self.size], self.data[self.size :]
+        return chunk
+
+
+MESSAGES = [
+    {"jsonrpc": "2.0", "method": "exit", "params": None},
+    {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "sphinx/build",
+        "params": {"priority": ["é" * 100]},
+    },
+    {"jsonrpc": "2.0", "id": 2, "method": "sphinx/build", "params": {}},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_message_reader(chunk_size: int):
+    """Ensure that we can split a stream into messages, no matter how the data
+    arrives."""
+
+    data = b"".join(frame(m) for m in MESSAGES)
+    reader = MessageReader(ChunkedReader(data, chunk_size))  # type: ignore[arg-type]
+
+    assert [json.loads(body) for body in reader] == MESSAGES
+
+
+def test_message_reader_headers():
+    """Ensure that additional or invalid headers are handled."""
+
+    body = json.dumps(MESSAGES[0]).encode("utf8")
+    data = b"".join(
+        [
+            b"X-Unknown: 1\r\n\r\n",
+            b"content-length: %d\r\n" % len(body),
+            b"Content-Type: application/vscode-jsonrpc; charset=utf-8\r\n\r\n",
+            body,
+        ]
+    )
+
+    assert list(MessageReader(io.BytesIO(data))) == [body]
+
+
+def test_main_loop():
+    """Ensure that messages are dispatched in order, in the calling thread."""
+
+    data = b"".join(frame(m) for m in MESSAGES)
+    dispatched: list[tuple[str, threading.Thread]] = []
+
+    def dispatch(message, obj, handler):
+        dispatched.append((message["method"], threading.current_thread()))
+
+    main_loop(io.BytesIO(data), dispatch)
+
+    assert [m for m, _ in dispatched] == [m["method"] for m in MESSAGES]
+    assert all(t is threading.current_thread() for _, t in dispatched)
+
+
+def raw_frame(body: bytes) -> bytes:
+    return b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        # Not valid JSON, but the id can still be recovered.
+        (
+            b'{"jsonrpc": "2.0", "id": 3, "method": "sphinx/build", "params": {',
+            (3, -32700),
+        ),
+        (b'{"jsonrpc": "2.0", "id": "abc", "method": ', ("abc", -32700)),
+        (b'{"jsonrpc": "2.0", "id": 4, "params": {}}', (4, -32600)),
+        (b'{"jsonrpc": "2.0", "id": 5, "method": "sphinx/unknown"}', (5, -32601)),
+        (
+            b'{"jsonrpc": "2.0", "id": 6, "method": "sphinx/build", "params": []}',
+            (6, -32602),
+        ),
+        # Nothing to reply to
+        (b'{"jsonrpc": "2.0", "method": ', None),
+        (b"[1, 2, 3]", None),
+    ],
+)
+def test_main_loop_invalid_message(body: bytes, expected):
+    """Ensure that requests that cannot be decoded are answered with an error,
+    rather than left waiting for a response."""
+
+    # The invalid message should not prevent the following message from being handled
+    data = raw_frame(body) + frame(MESSAGES[0])
+    dispatched: list[str] = []
+
+    def dispatch(message, obj, handler):
+        if handler is reject_message:
+            dispatch_message(message, obj, handler)
+        else:
+            dispatched.append(message["method"])
+
+    with mock.patch("esbonio.sphinx_agent.server.send_error") as send_error:
+        main_loop(io.BytesIO(data), dispatch)
+
+    assert dispatched == ["exit"]
+
+    if expected is None:
+        send_error.assert_not_called()
+        return
+
+    msg_id, code = expected
+    send_error.assert_called_once()
+    assert send_error.call_args.kwargs["id"] == msg_id
+    assert send_error.call_args.kwargs["code"] == code
+
+
+def test_parse_message():
+    """Ensure that messages are decoded into the expected types."""
+
+    message = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "sphinx/build",
+        "params": {
+            "content_overrides": {"file:///a.rst": "a"},
+            "content_deltas": {
+                "file:///b.rst": {
+                    "version": 2,
+                    "base_version": 1,
+                    "changes": [
+                        {
+                            "text": "b",
+                            "range": {
+                                "start": {"line": 1, "character": 0},
+                                "end": {"line": 2, "character": 0},
+                            },
+                        },
+                        {"text": "c", "range": None},
+                    ],
+                }
+            },
+        },
+    }
+    request = parse_message(message, types.BuildRequest)
+
+    assert isinstance(request, types.BuildRequest)
+    assert isinstance(request.params, types.BuildParams)
+    assert request.params.content_overrides == {"file:///a.rst": "a"}
+    assert request.params.content_deltas == {
+        "file:///b.rst": types.ContentDelta(
+            version=2,
+            base_version=1,
+            changes=[
+                types.ContentChange(
+                    text="b",
+                    range=types.Range(
+                        start=types.Position(line=1, character=0),
+                        end=types.Position(line=2, character=0),
+                    ),
+                ),
+                types.ContentChange(text="c"),
+            ],
+        )
+    }
+
+    # Decoders should only be constructed once.
+    assert get_decoder(types.BuildRequest) is get_decoder(types.BuildRequest)
+
+
+def test_as_json():
+    """Ensure that the fast encoder produces the same output as ``dataclasses.asdict``"""
+
+    diagnostic = types.Diagnostic(
+        range=types.Range(
+            start=types.Position(line=1, character=2),
+            end=types.Position(line=3, character=4),
+        ),
+        message="Something went wrong",
+        severity=types.DiagnosticSeverity.Warning,
+    )
+    message = types.PartialBuildResult(
+        params=types.PartialBuildResultParams(
+            diagnostics={"file:///a.rst": [diagnostic]}
+        )
+    )
+
+    for obj in [diagnostic, message]:
+        assert json.loads(as_json(obj)) == dataclasses.asdict(obj)
+
+
+@pytest.mark.parametrize("use_orjson", [False, True])
+def test_as_json_output(monkeypatch, use_orjson: bool):
+    """Ensure that the output of ``as_json`` does not depend on whether ``orjson`` is
+    available."""
+
+    if use_orjson and codecs.orjson is None:
+        pytest.skip("orjson is not available")
+
+    if not use_orjson:
+        monkeypatch.setattr(codecs, "orjson", None)
+
+    location = types.Location(
+        uri="file:///déjà/vu.rst",
+        range=types.Range(
+            start=types.Position(line=1, character=2),
+            end=types.Position(line=3, character=4),
+        ),
+    )
+    data = {"location": location, "tags": {"x"}}
+
+    assert as_json(data) == (
+        '{"location":{"uri":"file:///déjà/vu.rst","range":'
+        '{"start":{"line":1,"character":2},"end":{"line":3,"character":4}}},'
+        '"tags":["x"]}'
+    )
+
+
+@pytest.mark.parametrize("name", codecs.available_codecs())
+def test_codec(name: str):
+    """Ensure that messages survive a roundtrip through each of the available codecs,
+    and that object hooks are applied as they would be by ``json.loads``."""
+    codec = codecs.CODECS[name]
+    message = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {"diagnostics": {"file:///a.rst": [{"message": "Ünïcödé"}]}},
+    }
+
+    result = types.BuildResult()
+    data = codec.dumps(result, default=dataclasses.asdict)
+    assert codec.loads(data) == dataclasses.asdict(result)
+
+    data = codec.dumps(message)
+    assert codec.loads(data) == message
+
+    seen = []
+
+    def hook(obj):
+        seen.append(obj)
+        return len(seen)
+
+    assert codec.loads(data, object_hook=hook) == 4
+    assert seen == [
+        {"message": "Ünïcödé"},
+        {"file:///a.rst": [1]},
+        {"diagnostics": 2},
+        {"jsonrpc": "2.0", "id": 1, "result": 3},
+    ]
+
+
+def test_msgpack_codec():
+    """Ensure that messages survive a roundtrip through the msgpack codec."""
+    pytest.importorskip("msgpack")
+
+    codec = codecs.CODECS["msgpack"]
+    assert isinstance(codec, codecs.MsgpackCodec)
+
+    result = types.BuildResult(
+        diagnostics={
+            "file:///ü.rst": [
+                types.Diagnostic(
+                    range=types.Range(
+                        start=types.Position(line=2**40, character=0),
+                        end=types.Position(line=2**40, character=1),
+                    ),
+                    message="Ünïcödé",
+                    severity=types.DiagnosticSeverity.Warning,
+                )
+            ]
+        }
+    )
+    data = codec.dumps(result, default=dataclasses.asdict)
+    assert codec.loads(data) == dataclasses.asdict(result)
+
+    message = {"jsonrpc": "2.0", "id": 1, "result": {"1": [1.5, None, True]}}
+    assert codec.loads(codec.dumps(message)) == message
+
+
+@pytest.mark.parametrize("name", codecs.available_codecs())
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_agent_protocol_framing(name: str, chunk_size: int):
+    """Ensure that the client can split the data it receives from the agent into
+    messages, no matter how the data arrives."""
+
+    codec = codecs.CODECS[name]
+    protocol = SphinxAgentProtocol(mock.Mock(), default_converter())
+    protocol.codec = codec
+
+    received: list = []
+    protocol._procedure_handler = received.append  # type: ignore[method-assign]
+
+    messages = [
+        {
+            "jsonrpc": "2.0",
+            "method": "window/logMessage",
+            "params": {"type": 3, "message": f"Message {i} ü"},
+        }
+        for i in range(3)
+    ]
+    data = b""
+    for message in messages:
+        body = codec.dumps(message)
+        data += b"Content-Length: %d\r\n" % len(body)
+        data += f"Content-Type: {codec.content_type}\r\n\r\n".encode() + body
+
+    for idx in range(0, len(data), chunk_size):
+        protocol.data_received(data[idx : idx + chunk_size])
+
+    assert [m.params.message for m in received] == [
+        "Message 0 ü",
+        "Message 1 ü",
+        "Message 2 ü",
+    ]
+
+
+def test_codec_negotiation():
+    """Ensure that we fallback to JSON, if there are no other codecs in common."""
+
+    assert codecs.negotiate([]) is codecs.JSON
+    assert codecs.negotiate(["cbor", "json"]) is codecs.JSON
+    assert codecs.negotiate(["cbor"]) is codecs.JSON
+
+    for name in codecs.available_codecs():
+        assert codecs.negotiate(["cbor", name]) is codecs.CODECS[name]
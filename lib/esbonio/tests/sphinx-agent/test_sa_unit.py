@@ -5,16 +5,27 @@ import logging
 import os
 import pathlib
 import sys
+import time
 import typing
 from unittest import mock
 
 import pytest
 from sphinx import version_info as sphinx_version
 
+from esbonio.server.features.sphinx_manager.client_subprocess import make_content_delta
+from esbonio.sphinx_agent import types
 from esbonio.sphinx_agent.config import SphinxConfig
+from esbonio.sphinx_agent.handlers import SphinxHandler
+from esbonio.sphinx_agent.log import _DOCSTRING_CACHE
 from esbonio.sphinx_agent.log import DiagnosticFilter
+from esbonio.sphinx_agent.log import clear_docstring_cache
 from esbonio.sphinx_agent.log import source_to_uri_and_linum
+from esbonio.sphinx_agent.patches import progress
+from esbonio.sphinx_agent.patches import status_iterator
+from esbonio.sphinx_agent.stats import HandlerTimings
+from esbonio.sphinx_agent.tracing import Tracer
 from esbonio.sphinx_agent.types import Uri
+from esbonio.sphinx_agent.util import apply_changes
 
 if typing.TYPE_CHECKING:
     from typing import Any
@@ -578,3 +589,254 @@ def test_source_to_uri_linum(location: str, expected: tuple[str, int | None]):
         actual = source_to_uri_and_linum(location)
 
     assert actual == expected
+
+
+def test_docstring_linum_cache():
+    """Ensure that the location of a docstring is only looked up once."""
+
+    location = (
+        f"{PY_PATH}:docstring of esbonio.sphinx_agent.log.clear_docstring_cache:{{}}"
+    )
+    clear_docstring_cache()
+
+    mockpath = f"{DiagnosticFilter.__module__}.inspect.getsourcelines"
+    with mock.patch(mockpath, return_value=([""], 40)) as getsourcelines:
+        assert source_to_uri_and_linum(location.format(1)) == (
+            Uri.for_file(PY_PATH),
+            40,
+        )
+        assert source_to_uri_and_linum(location.format(5)) == (
+            Uri.for_file(PY_PATH),
+            44,
+        )
+
+    getsourcelines.assert_called_once()
+
+
+def test_docstring_linum_cache_invalidation():
+    """Ensure that the location of a docstring is looked up again when its module is
+    modified, replacing the previous entry in the cache."""
+
+    target = "esbonio.sphinx_agent.log.clear_docstring_cache"
+    location = f"{PY_PATH}:docstring of {target}:1"
+    clear_docstring_cache()
+    _DOCSTRING_CACHE.clear()
+
+    mockpath = f"{DiagnosticFilter.__module__}.inspect.getsourcelines"
+    mtimepath = f"{DiagnosticFilter.__module__}._get_module_mtime"
+    with (
+        mock.patch(mockpath, return_value=([""], 40)) as getsourcelines,
+        mock.patch(mtimepath) as get_mtime,
+    ):
+        for mtime in [1.0, 2.0, 3.0, 3.0]:
+            get_mtime.return_value = mtime
+            source_to_uri_and_linum(location)
+
+    assert getsourcelines.call_count == 3
+    assert _DOCSTRING_CACHE[target][0] == 3.0
+    assert len(_DOCSTRING_CACHE) == 1
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("", "Title\n=====\n"),
+        ("Title\n=====\n", ""),
+        ("Title\n=====\n", "Title\n=====\n"),
+        ("a\nb\nc\n", "a\nB\nc\n"),
+        ("a\nb\nc\n", "z\na\nb\nc\n"),
+        ("a\nb\nc\n", "a\nb\nc\nd\n"),
+        ("a\nb\nc", "a\nb\nc\n"),
+        ("a\nb\nc\n", "a\nc\n"),
+        ("a\nb\na\nb\n", "a\nb\n"),
+        ("a\r\nb\r\n", "a\r\nx\r\nb\r\n"),
+    ],
+)
+def test_content_delta(old: str, new: str):
+    """Ensure that the agent is able to reconstruct the content of a document from the
+    changes sent by the client."""
+
+    delta = make_content_delta(None, old)
+    assert delta.version == 1
+    assert apply_changes("", delta.changes) == old
+
+    delta = make_content_delta((1, old), new)
+    assert apply_changes(old, delta.changes) == new
+
+    if old == new:
+        assert delta.version == 1
+        assert delta.changes == []
+    else:
+        assert delta.version == 2
+        assert delta.base_version == 1
+        assert all(c.range is not None for c in delta.changes)
+
+
+def test_update_content():
+    """Ensure that files are only marked as changed when their content changes."""
+
+    handler = SphinxHandler()
+    uri = Uri.parse("file:///a.rst")
+    text = "a\nb\nc\n"
+
+    def update(**kwargs) -> set[Uri]:
+        handler._changed_content = set()
+        handler._update_content(types.BuildParams(**kwargs))
+        return handler._changed_content
+
+    delta = make_content_delta(None, text)
+    assert update(content_deltas={str(uri): delta}) == {uri}
+
+    # Changes that result in the same text
+    change = types.ContentChange(
+        text="b",
+        range=types.Range(
+            start=types.Position(line=1, character=0),
+            end=types.Position(line=1, character=1),
+        ),
+    )
+    delta = types.ContentDelta(version=2, base_version=1, changes=[change])
+    assert update(content_deltas={str(uri): delta}) == set()
+
+    # An equal, but distinct string
+    assert update(content_overrides={str(uri): "".join(["a\nb", "\nc\n"])}) == set()
+
+    assert update(content_overrides={str(uri): "a\nB\nc\n"}) == {uri}
+    assert update() == {uri}
+
+
+@pytest.mark.parametrize(
+    "interval, expected",
+    [
+        (0, [0, *range(1, 101)]),
+        (60, [0, 100]),
+    ],
+)
+def test_status_iterator(monkeypatch, interval: float, expected: list[int]):
+    """Ensure that progress is reported for each item, subject to the rate limit."""
+
+    messages: list[Any] = []
+    monkeypatch.setattr(
+        "esbonio.sphinx_agent.patches.send_message",
+        lambda message, flush: messages.append((message.params, flush)),
+    )
+    monkeypatch.setattr(progress, "interval", interval)
+
+    items = list(status_iterator(range(100), "reading sources... "))
+    assert items == list(range(100))
+
+    assert [m.percentage for m, _ in messages] == expected
+    assert messages[0][0].message == "reading sources... "
+    assert messages[-1][0].message == "reading sources... 100/100"
+
+    # Progress reports should be batched with other messages
+    assert not any(flush for _, flush in messages)
+
+
+def test_tracer():
+    """Ensure that the tracer records nested spans and propagates trace context."""
+    tracer = Tracer(process_name="test")
+
+    # Nothing should be recorded while tracing is disabled
+    with tracer.span("disabled"):
+        assert tracer.context() is None
+
+    assert len(tracer.events) == 0
+
+    tracer.enabled = True
+    before = time.time_ns() / 1000
+    with tracer.span("outer", value=1) as args:
+        args["extra"] = 2
+        with tracer.span("inner"):
+            context = tracer.context()
+
+    spans = {e["name"]: e for e in tracer.events if e["ph"] == "X"}
+    outer, inner = spans["outer"], spans["inner"]
+
+    assert outer["args"]["parent"] is None
+    assert outer["args"]["value"] == 1
+    assert outer["args"]["extra"] == 2
+    assert inner["args"]["parent"] == outer["args"]["id"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["dur"] <= outer["dur"]
+
+    # Timestamps should be taken from the wall clock, so that events recorded by
+    # different processes line up.
+    assert before <= outer["ts"] <= time.time_ns() / 1000
+
+    # Spans recorded on behalf of a remote process should be linked to the span
+    # that sent the request.
+    remote = Tracer(process_name="remote")
+    assert context is not None
+    assert context["parent"] == inner["args"]["id"]
+
+    with remote.remote_span(context, "sphinx/build"), remote.span("nested"):
+        pass
+
+    assert remote.enabled is False
+
+    events = remote.drain()
+    assert len(remote.events) == 0
+    assert events[0] == {
+        "name": "process_name",
+        "ph": "M",
+        "pid": os.getpid(),
+        "args": {"name": "remote"},
+    }
+
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert spans["sphinx/build"]["args"]["parent"] == inner["args"]["id"]
+    assert spans["nested"]["args"]["parent"] == spans["sphinx/build"]["args"]["id"]
+
+    flows = [e for e in [*tracer.events, *events] if e["ph"] in {"s", "f"}]
+    assert [e["ph"] for e in flows] == ["s", "f"]
+    assert flows[0]["id"] == flows[1]["id"] == context["flow"]
+
+    tracer.add_events(events)
+    trace = tracer.export()
+    assert trace["traceEvents"][0]["args"] == {"name": "test"}
+    assert len(trace["traceEvents"]) > len(events)
+
+
+def test_handler_timings():
+    """Ensure that the time spent in listeners and transforms is recorded."""
+    timings = HandlerTimings()
+
+    def listener(app, value):
+        return value
+
+    class Transform:
+        def apply(self, **kwargs):
+            return kwargs
+
+    class ChildTransform(Transform):
+        pass
+
+    wrapped = timings.time_listener("source-read", listener, "ext")
+    timings.time_transform(Transform, None)
+    timings.time_transform(Transform, None)
+    timings.time_transform(ChildTransform, "child")
+
+    assert wrapped(None, 1) == 1
+    assert wrapped(None, 2) == 2
+    assert Transform().apply(a=1) == {"a": 1}
+    assert ChildTransform().apply() == {}
+
+    stats = timings.to_stats()
+    assert [(s.event, s.extension, s.calls) for s in stats.listeners] == [
+        ("source-read", "ext", 2)
+    ]
+    assert stats.listeners[0].listener.endswith(
+        "test_handler_timings.<locals>.listener"
+    )
+
+    # Inherited methods should only be counted against the transform that was applied
+    transforms = {s.transform.split(".")[-1]: s for s in stats.transforms}
+    assert transforms["Transform"].calls == 1
+    assert transforms["Transform"].extension == __name__
+    assert transforms["ChildTransform"].calls == 1
+    assert transforms["ChildTransform"].extension == "child"
+
+    timings.reset()
+    assert timings.to_stats().listeners == []
+    assert timings.to_stats().transforms == []
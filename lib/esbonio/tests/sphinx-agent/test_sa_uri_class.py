@@ -2,8 +2,10 @@
 # https://github.com/microsoft/vscode/blob/5653420433692dc4269ad39adbc143e3438af179/src/vs/base/test/common/uri.test.ts
 from __future__ import annotations
 
+import copy
 import os.path
 import pathlib
+import pickle
 from typing import Any
 
 import pytest
@@ -694,3 +696,42 @@ def test_uri_join_path_error(base: str, extra: str):
         _ = Uri.parse(base) / extra
 
     assert "has no path" in str(e)
+
+
+def test_uri_pickle():
+    """Ensure that uris can be pickled and copied."""
+
+    uri = Uri.parse("file:///path/to/file.txt")
+    assert pickle.loads(pickle.dumps(uri)) == uri
+    assert copy.deepcopy(uri) == uri
+
+
+def test_uri_cache():
+    """Ensure that parsed and created uris are reused."""
+
+    assert Uri.parse("file:///a/b.txt") is Uri.parse("file:///a/b.txt")
+    assert Uri.for_file("/a/b.txt") is Uri.for_file(pathlib.Path("/a/b.txt"))
+
+
+@pytest.mark.skipif(IS_WIN, reason="Symlinks require admin rights on Windows")
+def test_uri_resolve_cache(tmp_path: pathlib.Path):
+    """Ensure that resolved uris are cached until the cache is cleared."""
+
+    target_a = tmp_path / "a"
+    target_a.mkdir()
+
+    target_b = tmp_path / "b"
+    target_b.mkdir()
+
+    link = tmp_path / "link"
+    link.symlink_to(target_a)
+
+    uri = Uri.for_file(link / "index.rst")
+    assert uri.resolve() == Uri.for_file(target_a / "index.rst")
+
+    link.unlink()
+    link.symlink_to(target_b)
+    assert uri.resolve() == Uri.for_file(target_a / "index.rst")
+
+    Uri.clear_cache()
+    assert uri.resolve() == Uri.for_file(target_b / "index.rst")